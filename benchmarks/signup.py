@@ -0,0 +1,82 @@
+"""
+Signup benchmark.
+
+Seeds 10k, 100k and 1M users, then signs up new users with the old create_user, which
+loaded every user to find out whether the table was empty, and with
+repository.users.create_user, which probes it with EXISTS. Reports the signup latency
+and signups per second at each size.
+
+Run from the project root:
+
+    python -m benchmarks.signup --sizes 10000 100000 1000000 --signups 50
+"""
+
+import argparse
+import asyncio
+import time
+
+from libgravatar import Gravatar
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.models.models import Base, User
+from src.repository.users import create_user
+from src.schemas.user import UserModel
+
+SEED_BATCH = 50000
+
+
+async def legacy_create_user(body: UserModel, db: AsyncSession) -> User:
+    # The create_user of before, reading the whole users table on every signup
+    new_user = User(**body.dict(), avatar=Gravatar(body.email).get_image())
+    result = await db.execute(select(User))
+    users = result.scalars().all()
+    if not users:
+        new_user.role = "admin"
+    db.add(new_user)
+    await db.commit()
+    await db.refresh(new_user)
+    return new_user
+
+
+async def seed(engine, users: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        for start in range(0, users, SEED_BATCH):
+            await conn.execute(insert(User), [
+                {"username": f"seed{i}", "email": f"seed{i}@example.com", "password": "x"}
+                for i in range(start, min(start + SEED_BATCH, users))])
+
+
+async def run(signup, users: int, signups: int) -> float:
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    await seed(engine, users)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    started = time.perf_counter()
+    for i in range(signups):
+        async with session_factory() as db:
+            await signup(UserModel(username=f"new{i:05}", email=f"new{i}@example.com", password="secret"), db)
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return elapsed / signups
+
+
+async def main(sizes, signups: int, legacy_signups: int) -> None:
+    print(f"{'users':>10}{'':<4}{'ms/signup':>12}{'signups/s':>12}")
+    for users in sizes:
+        for label, signup, count in (("before", legacy_create_user, legacy_signups),
+                                     ("exists", create_user, signups)):
+            seconds = await run(signup, users, count)
+            print(f"{users:>10} {label:<7}{seconds * 1000:>10.2f}{1 / seconds:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000],
+                        help="numbers of seeded users")
+    parser.add_argument("--signups", type=int, default=50, help="signups measured per size")
+    parser.add_argument("--legacy-signups", type=int, default=1,
+                        help="signups measured per size with the old create_user, which is much slower")
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.signups, args.legacy_signups))
@@ -0,0 +1,90 @@
+"""
+Tag upsert benchmark.
+
+Saves images with five tags each, resolving the tags the old way (one SELECT and one
+commit per tag) and with repository.tags.upsert_tags (one INSERT ... ON CONFLICT plus
+one IN select, committed with the image). Reports database round trips per image and
+the wall time with a simulated network latency per round trip.
+
+Run from the project root:
+
+    python -m benchmarks.tag_upsert --images 200 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.models.models import Base, Image, Tag, User
+from src.repository.tags import upsert_tags
+
+
+async def legacy_tags(names, db: AsyncSession):
+    # The per-tag loop create_image and update_image used before
+    tags = []
+    for tag_name in names:
+        result = await db.execute(select(Tag).filter(Tag.name == tag_name))
+        tag = result.scalars().first()
+        if not tag:
+            tag = Tag(name=tag_name)
+            db.add(tag)
+            await db.commit()
+        tags.append(tag)
+    return tags
+
+
+async def run(resolve, images: int, latency: float) -> dict:
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with session_factory() as db:
+        user = User(username="bench", email="bench@example.com", password="x")
+        db.add(user)
+        await db.commit()
+
+    counts = {"statements": 0, "commits": 0}
+
+    def on_statement(*args):
+        counts["statements"] += 1
+        time.sleep(latency)
+
+    def on_commit(*args):
+        counts["commits"] += 1
+        time.sleep(latency)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", on_statement)
+    event.listen(engine.sync_engine, "commit", on_commit)
+    started = time.perf_counter()
+    for i in range(images):
+        # Two tags every image shares, three that are new
+        names = ["popular", "trending", f"a{i}", f"b{i}", f"c{i}"]
+        async with session_factory() as db:
+            tags = await resolve(names, db)
+            db.add(Image(image=f"https://example.com/{i}.png", user_id=user.id, tags=tags))
+            await db.commit()
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return {"round_trips": (counts["statements"] + counts["commits"]) / images,
+            "commits": counts["commits"] / images, "ms": elapsed / images * 1000}
+
+
+async def main(images: int, latency_ms: float) -> None:
+    latency = latency_ms / 1000
+    print(f"{images} images, 5 tags each, {latency_ms} ms per round trip")
+    print(f"{'':<12}{'round trips':>14}{'commits':>10}{'ms/image':>12}")
+    for label, resolve in (("per-tag", legacy_tags), ("upsert", upsert_tags)):
+        result = await run(resolve, images, latency)
+        print(f"{label:<12}{result['round_trips']:>14.1f}{result['commits']:>10.1f}{result['ms']:>12.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5, help="simulated latency per round trip, in ms")
+    args = parser.parse_args()
+    asyncio.run(main(args.images, args.latency))
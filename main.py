@@ -4,20 +4,26 @@ from ipaddress import ip_address
 from typing import Callable
 from pathlib import Path
 
-import redis.asyncio as redis
 from fastapi import FastAPI, Request, status, Depends, HTTPException
 from fastapi_limiter import FastAPILimiter
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from sqlalchemy import text
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # from src.routes import contacts, auth, users
 from src.routes import tags, images
 from src.conf.config import settings
 from src.database.db import get_db
-
-from src.routes import auth, user_option, images, comments
+from src.database.instrumentation import QueryTimingMiddleware
+from src.services.blocking import RequestTaskMiddleware, loop_monitor
+from src.services.cache import redis_client, close_redis, invalidation_listener
+from src.services.metrics import MetricsMiddleware
+from src.services.passwords import password_hasher
+from src.services.revocation import revocation_list
+from src.services.storage import storage_client
+
+from src.routes import auth, user_option, images, comments, jobs, search, debug
 from src.routes.transform_image_routes import router as cl_image_router
 import src.conf.cloudinary_config
 
@@ -30,6 +36,9 @@ app.include_router(images.router, prefix="/api")
 # app.include_router(cl_image_router, prefix="/images", tags=["images"])
 app.include_router(comments.router, prefix="/api")
 app.include_router(tags.router, prefix="/api")
+app.include_router(jobs.router, prefix="/api")
+app.include_router(search.router, prefix="/api")
+app.include_router(debug.router, prefix="/api")
 
 
 banned_ips = [
@@ -46,6 +55,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Statement counts and database time of every request, in the Server-Timing header
+app.add_middleware(QueryTimingMiddleware)
+# Routes of the tasks caught by the loop monitor and the sampling profiler
+app.add_middleware(RequestTaskMiddleware)
+# Prometheus metrics at /metrics; outermost, so the latency includes the other middleware
+app.add_middleware(MetricsMiddleware)
 
 
 # app.include_router(auth.router)
@@ -64,15 +79,34 @@ async def startup():
     :return: A future object, which is a coroutine
     :doc-author: Trelent
     """
-    r = await redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0, password=settings.redis_password)
-    await FastAPILimiter.init(r)
+    await FastAPILimiter.init(redis_client)
+    invalidation_listener.start()
+    revocation_list.start()
+    if settings.loop_monitor_enabled:
+        loop_monitor.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """
+    The shutdown function is called when the application stops.
+    It closes the pooled Cloudinary HTTP client and the shared Redis pool so keep-alive connections are released.
+
+    :return: None
+    """
+    await storage_client.close()
+    await invalidation_listener.stop()
+    await revocation_list.stop()
+    await loop_monitor.stop()
+    await close_redis()
+    password_hasher.shutdown()
 
 
 @app.get("/healthchecker")
-def healthchecker(db: Session = Depends(get_db)):
+async def healthchecker(db: AsyncSession = Depends(get_db)):
     try:
         # Make request
-        result = db.execute(text("SELECT 1")).fetchone()
+        result = (await db.execute(text("SELECT 1"))).fetchone()
         if result is None:
             raise HTTPException(status_code=500, detail="Database is not configured correctly")
         return {"message": "Welcome to FastAPI!"}
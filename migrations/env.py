@@ -24,6 +24,20 @@ if config.config_file_name is not None:
 target_metadata = Base.metadata
 config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL)
 
+# The search_vector columns of images and comments and their GIN indexes exist only in the
+# migrations: TSVECTOR columns cannot be declared on models that also run on SQLite. Autogenerate
+# would see them as missing from the models and drop them.
+DATABASE_ONLY_OBJECTS = {
+    ("column", "search_vector"),
+    ("index", "ix_images_search_vector"),
+    ("index", "ix_comments_search_vector"),
+}
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    return not (reflected and compare_to is None and (type_, name) in DATABASE_ONLY_OBJECTS)
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -46,6 +60,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -69,7 +84,7 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
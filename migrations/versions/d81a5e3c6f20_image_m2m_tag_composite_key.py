@@ -0,0 +1,42 @@
+"""image_m2m_tag composite key
+
+Revision ID: d81a5e3c6f20
+Revises: b4f0c2d9e713
+Create Date: 2026-10-18 15:21:09.584417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81a5e3c6f20'
+down_revision: Union[str, None] = 'b4f0c2d9e713'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Rows that can't be part of the new primary key: dangling links and duplicate pairs
+    op.execute("DELETE FROM image_m2m_tag WHERE image_id IS NULL OR tag_id IS NULL")
+    op.execute("""
+        DELETE FROM image_m2m_tag a USING image_m2m_tag b
+        WHERE a.image_id = b.image_id AND a.tag_id = b.tag_id AND a.id > b.id
+    """)
+    op.drop_constraint('image_m2m_tag_pkey', 'image_m2m_tag', type_='primary')
+    op.drop_column('image_m2m_tag', 'id')
+    op.alter_column('image_m2m_tag', 'image_id', existing_type=sa.Integer(), nullable=False)
+    op.alter_column('image_m2m_tag', 'tag_id', existing_type=sa.Integer(), nullable=False)
+    op.create_primary_key('image_m2m_tag_pkey', 'image_m2m_tag', ['image_id', 'tag_id'])
+    op.create_index('ix_image_m2m_tag_tag_id_image_id', 'image_m2m_tag', ['tag_id', 'image_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_image_m2m_tag_tag_id_image_id', table_name='image_m2m_tag')
+    op.drop_constraint('image_m2m_tag_pkey', 'image_m2m_tag', type_='primary')
+    op.alter_column('image_m2m_tag', 'tag_id', existing_type=sa.Integer(), nullable=True)
+    op.alter_column('image_m2m_tag', 'image_id', existing_type=sa.Integer(), nullable=True)
+    op.add_column('image_m2m_tag', sa.Column('id', sa.Integer(), sa.Identity(), nullable=False))
+    op.create_primary_key('image_m2m_tag_pkey', 'image_m2m_tag', ['id'])
@@ -0,0 +1,39 @@
+"""add search vectors
+
+Revision ID: e5b7c1a9d442
+Revises: d81a5e3c6f20
+Create Date: 2026-10-18 16:03:52.771204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b7c1a9d442'
+down_revision: Union[str, None] = 'd81a5e3c6f20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Generated columns are kept current by PostgreSQL itself, on every insert and update
+    op.add_column('images', sa.Column('search_vector', postgresql.TSVECTOR(),
+                                      sa.Computed("to_tsvector('simple', coalesce(description, ''))", persisted=True),
+                                      nullable=True))
+    op.add_column('comments', sa.Column('search_vector', postgresql.TSVECTOR(),
+                                        sa.Computed("to_tsvector('simple', coalesce(comment, ''))", persisted=True),
+                                        nullable=True))
+    op.create_index('ix_images_search_vector', 'images', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_comments_search_vector', 'comments', ['search_vector'], unique=False,
+                    postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_comments_search_vector', table_name='comments', postgresql_using='gin')
+    op.drop_index('ix_images_search_vector', table_name='images', postgresql_using='gin')
+    op.drop_column('comments', 'search_vector')
+    op.drop_column('images', 'search_vector')
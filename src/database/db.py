@@ -1,6 +1,11 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from src.conf.config import settings
+from src.database.instrumentation import sql_instrumentation
+from src.services.metrics import db_pool_checkout_wait, metrics
 
 SQLALCHEMY_DATABASE_URL = settings.sqlalchemy_database_url
 engine = create_engine(SQLALCHEMY_DATABASE_URL)
@@ -8,10 +13,79 @@ engine = create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def async_database_url(url: str) -> str:
+    """
+    Converts a synchronous database URL into its asyncio counterpart.
+
+    PostgreSQL URLs are switched to the asyncpg driver and SQLite URLs to aiosqlite,
+    so the same SQLALCHEMY_DATABASE_URL setting serves both Alembic and the application.
+
+    :param url: The synchronous SQLAlchemy database URL.
+    :type url: str
+    :return: The database URL with an async driver.
+    :rtype: str
+    """
+    sa_url = make_url(url)
+    backend = sa_url.get_backend_name()
+    if backend == "postgresql":
+        sa_url = sa_url.set(drivername="postgresql+asyncpg")
+    elif backend == "sqlite":
+        sa_url = sa_url.set(drivername="sqlite+aiosqlite")
+    return sa_url.render_as_string(hide_password=False)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Connection pool observing how long each checkout waits for a connection, including opening new ones.
+    """
+
+    def _do_get(self):
+        with db_pool_checkout_wait.time():
+            return super()._do_get()
+
+
+def pool_options(url: str) -> dict:
+    """
+    Uses TimedQueuePool where the dialect would use a queue pool. SQLite uses a null or static pool
+    instead, where checkouts never wait.
+
+    :param url: The async database URL.
+    :type url: str
+    :return: The pool keyword arguments of create_async_engine.
+    :rtype: dict
+    """
+    sa_url = make_url(url)
+    if issubclass(sa_url.get_dialect().get_pool_class(sa_url), AsyncAdaptedQueuePool):
+        return {"poolclass": TimedQueuePool}
+    return {}
+
+
+SQLALCHEMY_ASYNC_DATABASE_URL = async_database_url(SQLALCHEMY_DATABASE_URL)
+async_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL, **pool_options(SQLALCHEMY_ASYNC_DATABASE_URL))
+sql_instrumentation.attach(async_engine)
+
+
+def pool_samples():
+    pool = async_engine.pool
+    if isinstance(pool, QueuePool):
+        yield "db_pool_size", {}, pool.size()
+        yield "db_pool_checked_out", {}, pool.checkedout()
+        yield "db_pool_overflow", {}, pool.overflow()
+
+
+def sql_route_samples():
+    for route, totals in sql_instrumentation.stats().items():
+        for key, value in totals.items():
+            yield f"sql_route_{key}", {"route": route}, value
+
+
+metrics.collector("db_pool", "Database connection pool usage", pool_samples)
+metrics.collector("sql_route", "SQL statements per route, see GET /api/debug/queries", sql_route_samples)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""
+SQL instrumentation module.
+
+Engine events count the statements each request runs and the time they take. Statements
+are also grouped by shape, i.e. their SQL text, which leaves the parameters out: a lazy
+load running once per row of a previous result, the N+1 pattern, shows up as one shape
+repeated many times. Each response gets a Server-Timing header with the request's database
+time, and the totals are aggregated per route.
+"""
+
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RepeatedStatementError(Exception):
+    """
+    Raised in strict mode when a request repeats one statement shape more than the threshold.
+    """
+
+
+class QueryStats:
+    """
+    The statements run while one request is tracked.
+    """
+
+    def __init__(self):
+        self.statements = 0
+        self.duration = 0.0
+        self.shapes: Counter = Counter()
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """
+        :param threshold: How many times a shape may run.
+        :type threshold: int
+        :return: The shapes that ran more than threshold times, with their counts.
+        :rtype: Dict[str, int]
+        """
+        return {shape: count for shape, count in self.shapes.items() if count > threshold}
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.2f};desc="{self.statements} queries"'
+
+
+class SQLInstrumentation:
+    """
+    Per-request statement counts and database time, with an N+1 detector.
+    """
+
+    def __init__(self, threshold: int = settings.sql_repeat_threshold, strict: bool = settings.sql_repeat_strict):
+        """
+        :param threshold: How many times one statement shape may run in a request before it is reported.
+        :type threshold: int
+        :param strict: Raise RepeatedStatementError instead of logging a warning, e.g. in tests.
+        :type strict: bool
+        """
+        self.threshold = threshold
+        self.strict = strict
+        self.routes: Dict[str, dict] = {}
+        self._current: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+    def attach(self, engine: Union[Engine, AsyncEngine]) -> None:
+        """
+        Listen to the statements of an engine.
+
+        :param engine: The engine.
+        :type engine: Engine | AsyncEngine
+        """
+        if isinstance(engine, AsyncEngine):
+            engine = engine.sync_engine
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    @contextmanager
+    def track(self) -> Iterator[QueryStats]:
+        """
+        Count the statements run in this context, including by the tasks and threads it starts.
+
+        :return: The statistics, updated as statements run.
+        :rtype: QueryStats
+        """
+        stats = QueryStats()
+        token = self._current.set(stats)
+        try:
+            yield stats
+        finally:
+            self._current.reset(token)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = self._current.get()
+        if stats is None:
+            return
+        stats.statements += 1
+        stats.shapes[statement] += 1
+        if stats.shapes[statement] == self.threshold + 1:
+            message = f"Statement repeated more than {self.threshold} times in one request: {statement}"
+            if self.strict:
+                raise RepeatedStatementError(message)
+            logger.warning(message)
+        conn.info.setdefault("sql_instrumentation_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        stats = self._current.get()
+        started = conn.info.get("sql_instrumentation_started")
+        if stats is None or not started:
+            return
+        stats.duration += time.perf_counter() - started.pop()
+
+    def record(self, route: str, stats: QueryStats) -> None:
+        """
+        Add the statements of a finished request to the totals of its route.
+
+        :param route: The route, e.g. GET /api/images/{image_id}.
+        :type route: str
+        :param stats: The statistics of the request.
+        :type stats: QueryStats
+        """
+        totals = self.routes.setdefault(route, {"requests": 0, "statements": 0, "db_seconds": 0.0,
+                                                "max_statements": 0, "repeated_requests": 0})
+        totals["requests"] += 1
+        totals["statements"] += stats.statements
+        totals["db_seconds"] += stats.duration
+        totals["max_statements"] = max(totals["max_statements"], stats.statements)
+        if stats.repeated(self.threshold):
+            totals["repeated_requests"] += 1
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Per-route metrics.
+
+        :return: For each route, the number of requests, statements and seconds spent in the database, the most
+            statements of one request, and how many requests repeated a statement shape over the threshold.
+        :rtype: Dict[str, dict]
+        """
+        return {route: dict(totals) for route, totals in self.routes.items()}
+
+    def reset(self) -> None:
+        self.routes = {}
+
+
+def route_path(scope: Scope) -> str:
+    # The path template keeps one entry per route rather than per URL
+    return getattr(scope.get("route"), "path", None) or "unmatched"
+
+
+def route_name(scope: Scope) -> str:
+    path = route_path(scope)
+    return f"{scope['method']} {path}" if path != "unmatched" else path
+
+
+class QueryTimingMiddleware:
+    """
+    ASGI middleware tracking the statements of every HTTP request.
+    """
+
+    def __init__(self, app: ASGIApp, instrumentation: Optional[SQLInstrumentation] = None):
+        self.app = app
+        self.instrumentation = instrumentation or sql_instrumentation
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with self.instrumentation.track() as stats:
+            async def send_with_timing(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    MutableHeaders(scope=message).append("Server-Timing", stats.server_timing())
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                self.instrumentation.record(route_name(scope), stats)
+
+
+sql_instrumentation = SQLInstrumentation()
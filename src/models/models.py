@@ -1,6 +1,9 @@
 import enum
 
-from sqlalchemy import Boolean, Column, Integer, String, func, Table, Enum
+import uuid
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, Integer, String, func, Table, Enum, JSON, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql.schema import ForeignKey
 from sqlalchemy.sql.sqltypes import DateTime
@@ -11,23 +14,26 @@ class Base(DeclarativeBase):
     pass
 
 
+# The primary key serves lookups by image, the reverse index lookups by tag
 image_m2m_tag = Table(
     "image_m2m_tag",
     Base.metadata,
-    Column("id", Integer, primary_key=True),
-    Column("image_id", Integer, ForeignKey("images.id", ondelete="CASCADE")),
-    Column("tag_id", Integer, ForeignKey("tags.id", ondelete="CASCADE")),
+    Column("image_id", Integer, ForeignKey("images.id", ondelete="CASCADE"), primary_key=True),
+    Column("tag_id", Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True),
+    Index("ix_image_m2m_tag_tag_id_image_id", "tag_id", "image_id"),
 )
 
 
 class Image(Base):
+    # On PostgreSQL the table also has a generated search_vector column, queried by repository.search
     __tablename__ = "images"
+    __table_args__ = (Index("ix_images_user_id_id", "user_id", "id"),)
     id = Column(Integer, primary_key=True)
     image = Column(String(255), nullable=False)
     edited_image = Column(String(255), nullable=True)
     description = Column(String(100), nullable=True)
     user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), nullable=True)
-    user = relationship('User', backref="images", lazy="joined")
+    user = relationship('User', backref="images")
     comments = relationship('Comment', backref="images")
     tags = relationship("Tag", secondary=image_m2m_tag, backref="images", passive_deletes=True)
     qr_code = Column(String(255), nullable=True)
@@ -64,9 +70,41 @@ class Tag(Base):
 
 
 class Comment(Base, Datestamp):
+    # On PostgreSQL the table also has a generated search_vector column, queried by repository.search
     __tablename__ = "comments"
+    __table_args__ = (Index("ix_comments_image_id_id", "image_id", "id"),)
     id = Column(Integer, primary_key=True)
     comment = Column(String(255), nullable=False)
-    user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), nullable=True)
+    user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), nullable=True, index=True)
     user = relationship('User', backref="comments", lazy="joined")
-    image_id = Column('image_id', ForeignKey('images.id', ondelete='CASCADE'), nullable=True)
\ No newline at end of file
+    image_id = Column('image_id', ForeignKey('images.id', ondelete='CASCADE'), nullable=True)
+
+
+class JobStatus(enum.Enum):
+    queued: str = "queued"
+    running: str = "running"
+    succeeded: str = "succeeded"
+    failed: str = "failed"
+
+
+class Job(Base, Datestamp):
+    __tablename__ = "jobs"
+    __table_args__ = (Index("ix_jobs_status_run_at", "status", "run_at"),)
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column('status', Enum(JobStatus), default=JobStatus.queued, nullable=False)
+    result = Column(JSON, nullable=True)
+    error = Column(String(255), nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    run_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_until = Column(DateTime, nullable=True)
+    user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), nullable=True, index=True)
+
+
+class RefreshTokenFamily(Base, Datestamp):
+    __tablename__ = "refresh_token_families"
+    id = Column(String(32), primary_key=True)
+    user_id = Column('user_id', ForeignKey('users.id', ondelete='CASCADE'), nullable=False, index=True)
+    current_jti = Column(String(32), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
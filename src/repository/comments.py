@@ -1,36 +1,43 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.models.models import User,Comment
 from src.schemas.comments import CommentBase
-from typing import List
-from sqlalchemy import and_
+from typing import List, Optional, Tuple
+from sqlalchemy import and_, select
+from src.repository.pagination import paginate
 
-async def get_comments(image_id: int,db: Session) -> List[Comment]:
+async def get_comments(image_id: int, cursor: Optional[str], limit: int,
+                       db: AsyncSession) -> Tuple[List[Comment], Optional[str]]:
     """
-    Retrieves a list of comments for a specific image.
+    Retrieves a page of comments for a specific image, oldest first.
 
     :param image_id: The ID of the image to retrieve comments for.
     :type image_id: int
+    :param cursor: The cursor returned with the previous page, or None for the first page.
+    :type cursor: str | None
+    :param limit: The maximum number of comments to return.
+    :type limit: int
     :param db: The database session.
-    :type db: Session
-    :return: A list of comments for the specified image.
-    :rtype: List[Comment]
+    :type db: AsyncSession
+    :return: A list of comments for the specified image and the cursor of the next page, or None on the last page.
+    :rtype: Tuple[List[Comment], str | None]
     """
-    return db.query(Comment).filter(Comment.image_id == image_id).all()
+    return await paginate(select(Comment).filter(Comment.image_id == image_id), Comment.id, cursor, limit, db)
 
-async def get_comment(image_id: int, db: Session) -> Comment:
+async def get_comment(image_id: int, db: AsyncSession) -> Comment:
     """
     Retrieves a single comment for a specific image.
 
     :param image_id: The ID of the image to retrieve a comment for.
     :type image_id: int
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The first comment for the specified image, or None if it does not exist.
     :rtype: Comment | None
     """
-    return db.query(Comment).filter(Comment.image_id == image_id).first()
+    result = await db.execute(select(Comment).filter(Comment.image_id == image_id))
+    return result.scalars().first()
 
-async def create_comment(image_id: int, comment:CommentBase, db: Session, user_id: int) -> Comment:
+async def create_comment(image_id: int, comment:CommentBase, db: AsyncSession, user_id: int) -> Comment:
     """
     Creates a new comment for a specific image.
 
@@ -39,7 +46,7 @@ async def create_comment(image_id: int, comment:CommentBase, db: Session, user_i
     :param comment: The data for the comment to create.
     :type comment: CommentBase
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :param user_id: The ID of the user creating the comment.
     :type user_id: int
     :return: The newly created comment.
@@ -49,11 +56,11 @@ async def create_comment(image_id: int, comment:CommentBase, db: Session, user_i
                          user_id=user_id, 
                          image_id=image_id)
     db.add(db_comment)
-    db.commit()
-    db.refresh(db_comment)
+    await db.commit()
+    await db.refresh(db_comment)
     return db_comment
 
-async def update_comment(comment_id: int, body: CommentBase, db: Session, user_id:int) -> Comment | None:
+async def update_comment(comment_id: int, body: CommentBase, db: AsyncSession, user_id:int) -> Comment | None:
     """
     Updates a comment with the specified ID for a specific user.
 
@@ -62,32 +69,34 @@ async def update_comment(comment_id: int, body: CommentBase, db: Session, user_i
     :param body: The updated data for the comment.
     :type body: CommentBase
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :param user_id: The ID of the user updating the comment.
     :type user_id: int
     :return: The updated comment, or None if it does not exist.
     :rtype: Comment | None
     """
-    comment = db.query(Comment).filter(and_(Comment.id == comment_id, Comment.user_id == user_id)).first()
+    result = await db.execute(select(Comment).filter(and_(Comment.id == comment_id, Comment.user_id == user_id)))
+    comment = result.scalars().first()
     if comment: 
         comment.comment = body.comment
-        db.commit()
+        await db.commit()
 
     return comment
 
-async def delete_comment(comment_id: int, db: Session) -> Comment | None:
+async def delete_comment(comment_id: int, db: AsyncSession) -> Comment | None:
     """
     Deletes a comment with the specified ID.
 
     :param comment_id: The ID of the comment to delete.
     :type comment_id: int
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The deleted comment, or None if it does not exist.
     :rtype: Comment | None
     """
-    comment = db.query(Comment).filter(and_(Comment.id == comment_id)).first()
+    result = await db.execute(select(Comment).filter(and_(Comment.id == comment_id)))
+    comment = result.scalars().first()
     if comment:
-        db.delete(comment)
-        db.commit()
+        await db.delete(comment)
+        await db.commit()
     return comment
\ No newline at end of file
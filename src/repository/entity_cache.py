@@ -0,0 +1,40 @@
+"""
+Two-tier caches of the entities looked up by ID in the repository layer.
+
+Cached entities are transient copies of their columns, for reading only. Every repository
+function that changes one of them invalidates it after committing.
+"""
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.models import Image, Tag
+from src.services.cache import ModelCodec, TieredCache
+from src.services.metrics import metrics
+
+image_codec = ModelCodec(Image)
+tag_codec = ModelCodec(Tag)
+
+image_cache = TieredCache(f"image:v{image_codec.version}:", image_codec.dumps, image_codec.loads)
+tag_cache = TieredCache(f"tag:v{tag_codec.version}:", tag_codec.dumps, tag_codec.loads)
+metrics.add_stats("cache", image_cache.stats, cache="image")
+metrics.add_stats("cache", tag_cache.stats, cache="tag")
+
+
+async def get_image(image_id: int, db: AsyncSession) -> Image | None:
+    """
+    Retrieves a single image by its ID, regardless of its owner, through the image cache.
+    The returned image is for reading only and has no relationships loaded.
+
+    :param image_id: The ID of the image to retrieve.
+    :type image_id: int
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The image with the specified ID, or None if it does not exist.
+    :rtype: Image | None
+    """
+    image = await image_cache.get(image_id)
+    if image is None:
+        image = await db.get(Image, image_id)
+        if image is not None:
+            await image_cache.set(image_id, image)
+    return image
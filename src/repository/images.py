@@ -1,54 +1,73 @@
-from typing import List
+from typing import List, Optional, Tuple
 
-import cloudinary
 import uuid
 
 from fastapi import HTTPException
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, exists, select, union
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 from starlette import status
 
-from src.models.models import Image, User, Tag, Role
+from src.models.models import Image, User, Tag, Role, Job, image_m2m_tag
+from src.repository import jobs as repository_jobs
+from src.repository import tags as repository_tags
+from src.repository.entity_cache import get_image, image_cache
+from src.repository.pagination import decode_cursor, encode_cursor, paginate
+from src.repository.tag_dictionary import tag_dictionary
+from src.repository.transform_images import transform_url_cache
 from src.schemas.images import ImageUpdateSchema
-from cloudinary.utils import cloudinary_url
+from src.services.storage import storage_client, public_id_from_url
 
+DESTROY_ASSETS_JOB = "destroy_assets"
+MAX_SEARCH_TAGS = 10
+# Relationships serialized with image lists, loaded with one IN query per relationship instead of one per image.
+# ImageResponse does not include comments, so they are not loaded.
+IMAGE_LIST_OPTIONS = (selectinload(Image.tags),)
 
 
-async def get_all_images(skip: int, limit: int, db: Session) -> List[Image]:
+async def get_all_images(cursor: Optional[str], limit: int, db: AsyncSession) -> Tuple[List[Image], Optional[str]]:
     """
-    Retrieves a list of all images with specified pagination parameters.
+    Retrieves a page of all images, ordered by ID.
 
-    :param skip: The number of images to skip.
-    :type skip: int
+    :param cursor: The cursor returned with the previous page, or None for the first page.
+    :type cursor: str | None
     :param limit: The maximum number of images to return.
     :type limit: int
     :param db: The database session.
-    :type db: Session
-    :return: A list of images.
-    :rtype: List[Image]
+    :type db: AsyncSession
+    :return: A list of images and the cursor of the next page, or None on the last page.
+    :rtype: Tuple[List[Image], str | None]
     """
-    return db.query(Image).offset(skip).limit(limit).all()
+    return await paginate(select(Image).options(*IMAGE_LIST_OPTIONS), Image.id, cursor, limit, db)
 
 
-async def get_images_by_user(user_id: int, db: Session) -> List[Image]:
+async def get_images_by_user(user_id: int, cursor: Optional[str], limit: int,
+                             db: AsyncSession) -> Tuple[List[Image], Optional[str]]:
     """
-    Retrieves a list of images for a specific user.
+    Retrieves a page of images for a specific user, ordered by ID.
 
     :param user_id: The ID of the user to retrieve images for.
     :type user_id: int
+    :param cursor: The cursor returned with the previous page, or None for the first page.
+    :type cursor: str | None
+    :param limit: The maximum number of images to return.
+    :type limit: int
     :param db: The database session.
-    :type db: Session
-    :return: A list of images belonging to the user.
-    :rtype: List[Image]
+    :type db: AsyncSession
+    :return: A list of images belonging to the user and the cursor of the next page, or None on the last page.
+    :rtype: Tuple[List[Image], str | None]
+    :raises HTTPException: If the user does not exist.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User NOT FOUND")
 
-    return db.query(Image).filter(Image.user_id == user.id).all()
+    query = select(Image).options(*IMAGE_LIST_OPTIONS).filter(Image.user_id == user.id)
+    return await paginate(query, Image.id, cursor, limit, db)
 
 
-async def get_images_by_id(image_id: int, user: User, db: Session) -> Image:
+async def get_images_by_id(image_id: int, user: User, db: AsyncSession) -> Image:
     """
     Retrieves a single image with the specified ID for a specific user.
 
@@ -57,14 +76,81 @@ async def get_images_by_id(image_id: int, user: User, db: Session) -> Image:
     :param user: The user to retrieve the image for.
     :type user: User
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The image with the specified ID, or None if it does not exist.
     :rtype: Image | None
     """
-    return db.query(Image).filter(and_(Image.id == image_id, Image.user_id == user.id)).all()
+    result = await db.execute(
+        select(Image).options(*IMAGE_LIST_OPTIONS).filter(and_(Image.id == image_id, Image.user_id == user.id))
+    )
+    return result.scalars().all()
+
+
+async def search_images_by_tags(names: List[str], match_all: bool, cursor: Optional[str], limit: int,
+                                db: AsyncSession) -> Tuple[List[Image], Optional[str]]:
+    """
+    Retrieves a page of the images having all, or any, of the given tags, ordered by ID.
+
+    Names are resolved through the tag dictionary, and the matching image IDs are read from
+    the (tag_id, image_id) index of image_m2m_tag without touching the tags table. With all,
+    one tag's index range is walked from the cursor and the other tags are probed with EXISTS;
+    with any, each tag contributes at most one page of its range to a UNION. Either way a page
+    reads a bounded number of index entries, however popular the tags are.
+
+    :param names: The tag names.
+    :type names: List[str]
+    :param match_all: True to require every tag, False to require at least one.
+    :type match_all: bool
+    :param cursor: The cursor returned with the previous page, or None for the first page.
+    :type cursor: str | None
+    :param limit: The maximum number of images to return.
+    :type limit: int
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: A list of images and the cursor of the next page, or None on the last page.
+    :rtype: Tuple[List[Image], str | None]
+    :raises HTTPException: If no tag or too many tags are given.
+    """
+    names = repository_tags.normalize_tag_names(names)
+    if not names or len(names) > MAX_SEARCH_TAGS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Search for 1 to {MAX_SEARCH_TAGS} tags.")
+    await tag_dictionary.ensure_loaded(db)
+    tag_ids = [tag_dictionary.get(name) for name in names]
+    if match_all and None in tag_ids:
+        return [], None
+    tag_ids = [tag_id for tag_id in tag_ids if tag_id is not None]
+    if not tag_ids:
+        return [], None
+
+    last_id = decode_cursor(cursor) if cursor is not None else 0
+    links = image_m2m_tag
+    if match_all:
+        first, *others = tag_ids
+        query = select(links.c.image_id).where(links.c.tag_id == first, links.c.image_id > last_id)
+        for tag_id in others:
+            other = links.alias()
+            query = query.where(exists().where(other.c.image_id == links.c.image_id, other.c.tag_id == tag_id))
+        query = query.order_by(links.c.image_id).limit(limit + 1)
+    else:
+        ranges = [select(links.c.image_id).where(links.c.tag_id == tag_id, links.c.image_id > last_id)
+                  .order_by(links.c.image_id).limit(limit + 1).subquery() for tag_id in tag_ids]
+        matches = union(*(select(tag_range.c.image_id) for tag_range in ranges)).subquery()
+        query = select(matches.c.image_id).order_by(matches.c.image_id).limit(limit + 1)
+    image_ids = list((await db.execute(query)).scalars().all())
+
+    next_cursor = None
+    if len(image_ids) > limit:
+        image_ids = image_ids[:limit]
+        next_cursor = encode_cursor(image_ids[-1])
+    if not image_ids:
+        return [], None
+    result = await db.execute(select(Image).where(Image.id.in_(image_ids)).options(*IMAGE_LIST_OPTIONS)
+                              .order_by(Image.id))
+    return list(result.scalars().all()), next_cursor
 
 
-async def create_image(image, description, user: User, all_tags: str|None, db: Session) -> Image:
+async def create_image(image, description, user: User, all_tags: str|None, db: AsyncSession) -> Image:
     """
     Creates a new image for a specific user with provided tags and description.
 
@@ -77,79 +163,88 @@ async def create_image(image, description, user: User, all_tags: str|None, db: S
     :param all_tags: A comma-separated string of tag names.
     :type all_tags: str
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The newly created image.
     :rtype: Image
     :raises HTTPException: If more than 5 tags are provided.
     """
-    tags = []
-    if all_tags:
-        list_tags = all_tags.split(", ")
-        if len(list_tags) > 5:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="You can add up to 5 tags only.")
-
-        for tag_name in list_tags:
-            tag = db.query(Tag).filter(Tag.name == tag_name).first()
-            if not tag:
-                tag = Tag(name=tag_name)
-                db.add(tag)
-                db.commit()
-            tags.append(tag)
+    list_tags = all_tags.split(", ") if all_tags else []
+    if len(list_tags) > 5:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="You can add up to 5 tags only.")
     im_uuid = uuid.uuid4()
     public_id = f"{im_uuid}"
-    url, ot = cloudinary_url(public_id)
-    image_url = cloudinary.uploader.upload(image.file, public_id=public_id, url = url, overwrite=True)
-    image = Image(
-        image=image_url['url'],
-        user_id=user.id,
-        description=description,
-        tags=tags
-    )
+    image_url = await storage_client.upload(await image.read(), public_id=public_id, overwrite=True)
+    # Read before the commit, as a rollback expires the user
+    user_id = user.id
+    image = None
+
+    async def assign(tags):
+        # A new image on a retry, as the first one is still linked to the tags that failed
+        nonlocal image
+        image = Image(
+            image=image_url['url'],
+            user_id=user_id,
+            description=description,
+            tags=tags
+        )
+        db.add(image)
 
-    db.add(image)
-    db.commit()
-    db.refresh(image)
+    # The tags, the image and its m2m rows are saved in one transaction
+    await repository_tags.commit_tags(list_tags, db, assign)
+    await db.refresh(image, ["tags"])
     return image
 
 
-async def remove_image(image_id: int, user: User, db: Session) -> Image | None:
+async def remove_image(image_id: int, user: User, db: AsyncSession) -> Job | None:
     """
     Removes a single image with the specified ID. If the user is an admin, any image can be removed;
     otherwise, only images belonging to the user can be removed.
 
+    The database row is deleted right away; its Cloudinary assets are deleted by a background job
+    queued in the same transaction.
+
     :param image_id: The ID of the image to remove.
     :type image_id: int
     :param user: The user attempting to remove the image.
     :type user: User
     :param db: The database session.
-    :type db: Session
-    :return: The removed image, or None if it does not exist.
-    :rtype: Image | None
+    :type db: AsyncSession
+    :return: The job deleting the image assets, or None if the image does not exist.
+    :rtype: Job | None
     """
     if user.role == Role.admin:
-        image = db.query(Image).filter(Image.id == image_id).first()
+        result = await db.execute(select(Image).filter(Image.id == image_id))
     else:
-        image = db.query(Image).filter(and_(Image.id == image_id, Image.user_id == user.id)).first()
-
-
-    if image:
-        public_id = image.image.split("/")[-1].split(".")[0]
-        print(f'1 {public_id}')
-        cloudinary.uploader.destroy(public_id)
-        if image.edited_image:
-            public_id = image.edited_image.split("/")[-1].split(".")[0]
-            print(f'2 {public_id}')
-            cloudinary.uploader.destroy(public_id)
-        if image.qr_code:
-            public_id = image.qr_code.split("/")[-1].split(".")[0]
-            print(f'3 {public_id}')
-            cloudinary.uploader.destroy(public_id)
-        db.delete(image)
-        db.commit()
-    return image
+        result = await db.execute(select(Image).filter(and_(Image.id == image_id, Image.user_id == user.id)))
+    image = result.scalars().first()
+
+    if image is None:
+        return None
+    urls = [url for url in (image.image, image.edited_image, image.qr_code) if url]
+    public_ids = [public_id for public_id in map(public_id_from_url, urls) if public_id]
+    job = await repository_jobs.enqueue_job(DESTROY_ASSETS_JOB, {"public_ids": public_ids}, user.id, db, commit=False)
+    await db.delete(image)
+    await db.commit()
+    transform_url_cache.invalidate(image_id)
+    await image_cache.invalidate(image_id)
+    return job
+
 
+async def destroy_image_assets(payload: dict, db: AsyncSession) -> dict:
+    """
+    Job handler that deletes the Cloudinary assets of a removed image in one bulk request.
 
-async def update_image(image_id: int, body: ImageUpdateSchema, user: User, db: Session) -> Image | None:
+    :param payload: The job payload created by remove_image.
+    :type payload: dict
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The mapping of public ID to deletion status.
+    :rtype: dict
+    """
+    return await storage_client.destroy_many(payload["public_ids"])
+
+
+async def update_image(image_id: int, body: ImageUpdateSchema, user: User, db: AsyncSession) -> Image | None:
     """
     Updates a single image with the specified ID for a specific user, including updating the tags.
 
@@ -162,36 +257,36 @@ async def update_image(image_id: int, body: ImageUpdateSchema, user: User, db: S
     :param all_tags: A comma-separated string of tag names.
     :type all_tags: str
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The updated image, or None if it does not exist.
     :rtype: Image | None
     :raises HTTPException: If more than 5 tags are provided.
     """
+    query = select(Image).options(selectinload(Image.tags))
     if user.role == Role.admin:
-        exist_image = db.query(Image).filter(Image.id == image_id).first()
+        result = await db.execute(query.filter(Image.id == image_id))
     else:
-        exist_image = db.query(Image).filter(and_(Image.id == image_id, Image.user_id == user.id)).first()
+        result = await db.execute(query.filter(and_(Image.id == image_id, Image.user_id == user.id)))
+    exist_image = result.scalars().first()
     if exist_image is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
     try:
        if exist_image:
-            tags = []
             list_tags = body.tags
             if len(list_tags) > 5:
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="You can add up to 5 tags only.")
-            for tag_name in list_tags:
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                if not tag:
-                    tag = Tag(name=tag_name)
-                    db.add(tag)
-                    db.commit()
-                tags.append(tag)
-
-            exist_image.qr_code = body.qr_code
-            exist_image.description = body.description
-            exist_image.edited_image = body.edited_image
-            exist_image.tags = tags
-            db.commit()
+
+            async def assign(tags):
+                if "tags" in sa_inspect(exist_image).unloaded:
+                    # Expired by the rollback before a retry
+                    await db.refresh(exist_image, ["tags"])
+                exist_image.qr_code = body.qr_code
+                exist_image.description = body.description
+                exist_image.edited_image = body.edited_image
+                exist_image.tags = tags
+
+            await repository_tags.commit_tags(list_tags, db, assign)
+            await image_cache.invalidate(image_id)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Can't update image, {e}")
     return exist_image
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Job repository module.
+
+This module contains the functions to interact with the Job model, which backs the
+durable background job queue: enqueueing a job, claiming the next runnable job for a
+worker, and recording its outcome.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.models.models import Job, JobStatus, User, Role
+
+
+async def enqueue_job(kind: str, payload: dict, user_id: int | None, db: AsyncSession, commit: bool = True,
+                      job_id: str | None = None) -> Job:
+    """
+    Adds a new job to the queue.
+
+    :param kind: The kind of the job, used to pick its handler.
+    :type kind: str
+    :param payload: The JSON-serializable arguments for the handler.
+    :type payload: dict
+    :param user_id: The ID of the user the job belongs to.
+    :type user_id: int | None
+    :param db: The database session.
+    :type db: AsyncSession
+    :param commit: Whether to commit now, or leave it to the caller's unit of work.
+    :type commit: bool
+    :param job_id: The ID of the job, when the payload needs to know it; a new one is generated if None.
+    :type job_id: str | None
+    :return: The queued job.
+    :rtype: Job
+    """
+    job = Job(id=job_id or str(uuid.uuid4()), kind=kind, payload=payload, user_id=user_id,
+              status=JobStatus.queued, attempts=0, run_at=datetime.utcnow())
+    db.add(job)
+    if commit:
+        await db.commit()
+    else:
+        await db.flush()
+    return job
+
+
+async def get_job(job_id: str, user: User, db: AsyncSession) -> Job | None:
+    """
+    Retrieves a job by its ID. Admins can see any job, other users only their own.
+
+    :param job_id: The ID of the job.
+    :type job_id: str
+    :param user: The user requesting the job.
+    :type user: User
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The job, or None if it does not exist or belongs to someone else.
+    :rtype: Job | None
+    """
+    job = await db.get(Job, job_id)
+    if job is None or (user.role != Role.admin and job.user_id != user.id):
+        return None
+    return job
+
+
+async def claim_job(db: AsyncSession) -> Job | None:
+    """
+    Claims the next runnable job: a queued job that is due, or a running job whose lease
+    has expired because its worker died. An expired job that already used all of its
+    job_max_attempts is marked as failed instead, so a job that kills or hangs its worker
+    is not run forever. Rows are locked with SKIP LOCKED, so concurrent workers never
+    claim the same job.
+
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The claimed job, or None if the queue is empty.
+    :rtype: Job | None
+    """
+    while True:
+        now = datetime.utcnow()
+        result = await db.execute(
+            select(Job)
+            .filter(or_(and_(Job.status == JobStatus.queued, Job.run_at <= now),
+                        and_(Job.status == JobStatus.running, Job.locked_until < now)))
+            .order_by(Job.run_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        job = result.scalars().first()
+        if job is None:
+            return None
+        if job.status == JobStatus.running and job.attempts >= settings.job_max_attempts:
+            job.status = JobStatus.failed
+            job.error = f"Lease expired on attempt {job.attempts}"
+            job.locked_until = None
+            await db.commit()
+            continue
+        job.status = JobStatus.running
+        job.attempts += 1
+        job.locked_until = now + timedelta(seconds=settings.job_lease_seconds)
+        await db.commit()
+        return job
+
+
+async def complete_job(job: Job, result: dict | None, db: AsyncSession) -> Job:
+    """
+    Marks a job as succeeded and stores its result.
+
+    :param job: The job that finished.
+    :type job: Job
+    :param result: The JSON-serializable result of the handler.
+    :type result: dict | None
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The updated job.
+    :rtype: Job
+    """
+    job.status = JobStatus.succeeded
+    job.result = result
+    job.error = None
+    job.locked_until = None
+    await db.commit()
+    return job
+
+
+async def fail_job(job: Job, error: str, db: AsyncSession) -> Job:
+    """
+    Records a failed attempt. The job is retried with exponential backoff until it
+    reaches job_max_attempts, then it is marked as failed.
+
+    :param job: The job that failed.
+    :type job: Job
+    :param error: A description of the error.
+    :type error: str
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The updated job.
+    :rtype: Job
+    """
+    job.error = error[:255]
+    job.locked_until = None
+    if job.attempts >= settings.job_max_attempts:
+        job.status = JobStatus.failed
+    else:
+        job.status = JobStatus.queued
+        job.run_at = datetime.utcnow() + timedelta(seconds=2 ** job.attempts)
+    await db.commit()
+    return job
@@ -0,0 +1,99 @@
+import base64
+import binascii
+import json
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+from starlette import status
+
+
+def encode_keyset(values: dict) -> str:
+    """
+    Encodes the sort key of the last row of a page into an opaque cursor.
+
+    :param values: The sort key columns of the last row returned, e.g. {"rank": 0.5, "id": 7}.
+    :type values: dict
+    :return: The URL-safe cursor.
+    :rtype: str
+    """
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_keyset(cursor: str, types: Dict[str, tuple]) -> dict:
+    """
+    Decodes a cursor created by encode_keyset.
+
+    :param cursor: The cursor sent by the client.
+    :type cursor: str
+    :param types: The expected keys and the accepted types of each value.
+    :type types: Dict[str, tuple]
+    :return: The sort key of the last row of the previous page.
+    :rtype: dict
+    :raises HTTPException: If the cursor is malformed.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError, TypeError):
+        values = None
+    if not isinstance(values, dict) or set(values) != set(types) or not all(
+            isinstance(values[key], accepted) and not isinstance(values[key], bool)
+            for key, accepted in types.items()):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
+
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Encodes the key of the last row of a page into an opaque cursor.
+
+    :param last_id: The ID of the last row returned.
+    :type last_id: int
+    :return: The URL-safe cursor.
+    :rtype: str
+    """
+    return encode_keyset({"id": last_id})
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Decodes a cursor created by encode_cursor.
+
+    :param cursor: The cursor sent by the client.
+    :type cursor: str
+    :return: The ID of the last row of the previous page.
+    :rtype: int
+    :raises HTTPException: If the cursor is malformed.
+    """
+    return decode_keyset(cursor, {"id": (int,)})["id"]
+
+
+async def paginate(query: Select, key: InstrumentedAttribute, cursor: Optional[str], limit: int,
+                   db: AsyncSession) -> Tuple[List, Optional[str]]:
+    """
+    Runs a query one keyset page at a time: rows are ordered by key and the page starts after the cursor,
+    so every page costs one index range scan no matter how deep it is.
+
+    :param query: The select statement, without ordering or limits.
+    :type query: Select
+    :param key: The unique, indexed column to page on, usually the primary key.
+    :type key: InstrumentedAttribute
+    :param cursor: The cursor returned with the previous page, or None for the first page.
+    :type cursor: str | None
+    :param limit: The maximum number of rows to return.
+    :type limit: int
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The rows of the page and the cursor of the next page, or None on the last page.
+    :rtype: Tuple[List, str | None]
+    """
+    if cursor is not None:
+        query = query.filter(key > decode_cursor(cursor))
+    result = await db.execute(query.order_by(key).limit(limit + 1))
+    rows = list(result.scalars().all())
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(getattr(rows[-1], key.key))
+    return rows, None
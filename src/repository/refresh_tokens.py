@@ -0,0 +1,101 @@
+"""
+Refresh token repository module.
+
+This module contains the functions to interact with the RefreshTokenFamily model. The
+table is the fallback store for refresh token families: it is only written while Redis
+is unavailable, so logins and refreshes never touch the users table.
+"""
+
+import enum
+from datetime import datetime
+
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.models import RefreshTokenFamily
+
+
+class Rotation(enum.IntEnum):
+    """
+    The outcome of presenting a refresh token, matching the codes returned by the Redis script.
+    """
+    reused = -1
+    unknown = 0
+    rotated = 1
+
+
+async def create_family(family_id: str, user_id: int, jti: str, expires_at: datetime,
+                        db: AsyncSession) -> RefreshTokenFamily:
+    """
+    Stores a new token family, started by a login on one device.
+
+    :param family_id: The ID of the family.
+    :type family_id: str
+    :param user_id: The ID of the user the family belongs to.
+    :type user_id: int
+    :param jti: The ID of the family's current refresh token.
+    :type jti: str
+    :param expires_at: When the family expires unless it is rotated.
+    :type expires_at: datetime
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The stored family.
+    :rtype: RefreshTokenFamily
+    """
+    family = RefreshTokenFamily(id=family_id, user_id=user_id, current_jti=jti, expires_at=expires_at)
+    db.add(family)
+    await db.commit()
+    return family
+
+
+async def rotate_family(family_id: str, jti: str, new_jti: str, expires_at: datetime,
+                        db: AsyncSession) -> Rotation:
+    """
+    Replaces the current token of a family with a compare-and-set UPDATE. Presenting a token
+    that was already rotated revokes the whole family.
+
+    :param family_id: The ID of the family.
+    :type family_id: str
+    :param jti: The ID of the presented refresh token.
+    :type jti: str
+    :param new_jti: The ID of the refresh token replacing it.
+    :type new_jti: str
+    :param expires_at: The new expiry of the family.
+    :type expires_at: datetime
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: rotated on success, reused if the token was already rotated, unknown if the family does not exist.
+    :rtype: Rotation
+    """
+    now = datetime.utcnow()
+    result = await db.execute(
+        update(RefreshTokenFamily)
+        .where(RefreshTokenFamily.id == family_id, RefreshTokenFamily.current_jti == jti,
+               RefreshTokenFamily.expires_at > now)
+        .values(current_jti=new_jti, expires_at=expires_at)
+    )
+    if result.rowcount:
+        await db.commit()
+        return Rotation.rotated
+    family = await db.get(RefreshTokenFamily, family_id)
+    if family is None:
+        return Rotation.unknown
+    await db.delete(family)
+    await db.commit()
+    return Rotation.unknown if family.expires_at <= now else Rotation.reused
+
+
+async def delete_family(family_id: str, db: AsyncSession) -> bool:
+    """
+    Deletes a token family, revoking its refresh token.
+
+    :param family_id: The ID of the family.
+    :type family_id: str
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: True if the family existed.
+    :rtype: bool
+    """
+    result = await db.execute(delete(RefreshTokenFamily).where(RefreshTokenFamily.id == family_id))
+    await db.commit()
+    return bool(result.rowcount)
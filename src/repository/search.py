@@ -0,0 +1,92 @@
+"""
+Search repository module.
+
+This module contains the full-text search over image descriptions and comments. Results
+are ranked, best first, and paginated on (rank, kind, id) with keyset cursors.
+"""
+
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, func, literal, literal_column, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.models import Comment, Image
+from src.repository.pagination import decode_keyset, encode_keyset
+from src.repository.search_index import SearchHit, search_index
+
+# Text search configuration of the generated search_vector columns
+TEXT_SEARCH_CONFIG = "simple"
+CURSOR_TYPES = {"rank": (int, float), "kind": (str,), "id": (int,)}
+
+
+def after_cursor(hit: SearchHit, cursor: dict) -> bool:
+    if hit.rank != cursor["rank"]:
+        return hit.rank < cursor["rank"]
+    return (hit.kind, hit.id) > (cursor["kind"], cursor["id"])
+
+
+def postgres_search_query(query: str, cursor: Optional[dict], limit: int):
+    """
+    Builds the ranked search over the GIN-indexed search_vector columns.
+
+    :param query: The words to search for.
+    :type query: str
+    :param cursor: The decoded cursor, or None for the first page.
+    :type cursor: dict | None
+    :param limit: The number of rows to fetch.
+    :type limit: int
+    :return: The select statement.
+    :rtype: Select
+    """
+    ts_query = func.plainto_tsquery(TEXT_SEARCH_CONFIG, query)
+    image_vector = literal_column("images.search_vector")
+    comment_vector = literal_column("comments.search_vector")
+    hits = union_all(
+        select(literal("image").label("kind"), Image.id.label("id"), Image.id.label("image_id"),
+               Image.description.label("text"), func.ts_rank(image_vector, ts_query).label("rank"))
+        .where(image_vector.op("@@")(ts_query)),
+        select(literal("comment").label("kind"), Comment.id.label("id"), Comment.image_id.label("image_id"),
+               Comment.comment.label("text"), func.ts_rank(comment_vector, ts_query).label("rank"))
+        .where(comment_vector.op("@@")(ts_query)),
+    ).subquery()
+    statement = select(hits)
+    if cursor is not None:
+        statement = statement.where(or_(
+            hits.c.rank < cursor["rank"],
+            and_(hits.c.rank == cursor["rank"],
+                 or_(hits.c.kind > cursor["kind"], and_(hits.c.kind == cursor["kind"], hits.c.id > cursor["id"]))),
+        ))
+    return statement.order_by(hits.c.rank.desc(), hits.c.kind, hits.c.id).limit(limit)
+
+
+async def search(query: str, cursor: Optional[str], limit: int, db: AsyncSession
+                 ) -> Tuple[List[SearchHit], Optional[str]]:
+    """
+    Searches image descriptions and comments for all the words of a query.
+
+    :param query: The words to search for.
+    :type query: str
+    :param cursor: The cursor returned with the previous page, or None for the first page.
+    :type cursor: str | None
+    :param limit: The maximum number of results to return.
+    :type limit: int
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The results of the page, best first, and the cursor of the next page, or None on the last page.
+    :rtype: Tuple[List[SearchHit], str | None]
+    """
+    after = decode_keyset(cursor, CURSOR_TYPES) if cursor is not None else None
+    if db.get_bind().dialect.name == "postgresql":
+        rows = (await db.execute(postgres_search_query(query, after, limit + 1))).all()
+        hits = [SearchHit(row.kind, row.id, row.image_id, row.text, row.rank) for row in rows]
+    else:
+        await search_index.ensure_loaded(db)
+        hits = search_index.search(query)
+        if after is not None:
+            hits = [hit for hit in hits if after_cursor(hit, after)]
+        hits = hits[:limit + 1]
+    if len(hits) > limit:
+        hits = hits[:limit]
+        last = hits[-1]
+        return hits, encode_keyset({"rank": last.rank, "kind": last.kind, "id": last.id})
+    return hits, None
@@ -0,0 +1,195 @@
+"""
+Search index module.
+
+On PostgreSQL, full-text search runs on the generated search_vector columns of images
+and comments. Other databases, i.e. SQLite in development and tests, get an in-process
+inverted index instead: a posting list of documents per term, built with one query on
+first use and then maintained incrementally from the ORM writes of every session, applied
+when they are committed.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from src.models.models import Comment, Image
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Split text into lowercase words, like the simple text search configuration of PostgreSQL.
+
+    :param text: The text.
+    :type text: str | None
+    :return: The words, in order.
+    :rtype: List[str]
+    """
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+class SearchHit(NamedTuple):
+    kind: str
+    id: int
+    image_id: Optional[int]
+    text: str
+    rank: float
+
+
+class Document(NamedTuple):
+    image_id: Optional[int]
+    text: str
+    terms: Counter
+
+
+class InvertedIndex:
+    """
+    Term to document postings for image descriptions and comments.
+
+    Documents are keyed by (kind, id), kind being image or comment. Search matches documents
+    containing every query word and ranks them by the TF-IDF of those words.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[Tuple[str, int], int]] = {}
+        self.documents: Dict[Tuple[str, int], Document] = {}
+        self.loaded = False
+
+    def clear(self) -> None:
+        self.postings = {}
+        self.documents = {}
+        self.loaded = False
+
+    async def load(self, db: AsyncSession) -> None:
+        """
+        Index every image description and comment, with one query per table.
+
+        :param db: The database session.
+        :type db: AsyncSession
+        """
+        self.postings = {}
+        self.documents = {}
+        for image_id, description in (await db.execute(select(Image.id, Image.description))).all():
+            self.add("image", image_id, image_id, description)
+        for comment_id, image_id, comment in (await db.execute(
+                select(Comment.id, Comment.image_id, Comment.comment))).all():
+            self.add("comment", comment_id, image_id, comment)
+        self.loaded = True
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        if not self.loaded:
+            await self.load(db)
+
+    def add(self, kind: str, doc_id: int, image_id: Optional[int], text: Optional[str]) -> None:
+        """
+        Index a document, replacing its previous version.
+        """
+        self.remove(kind, doc_id)
+        terms = Counter(tokenize(text))
+        if not terms:
+            return
+        key = (kind, doc_id)
+        self.documents[key] = Document(image_id, text, terms)
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[key] = frequency
+
+    def remove(self, kind: str, doc_id: int) -> None:
+        key = (kind, doc_id)
+        document = self.documents.pop(key, None)
+        if document is None:
+            return
+        for term in document.terms:
+            posting = self.postings[term]
+            del posting[key]
+            if not posting:
+                del self.postings[term]
+
+    def remove_image_comments(self, image_id: int) -> None:
+        """
+        Drop the comments of a deleted image, which the database deletes or the ORM detaches along with it.
+        """
+        for kind, doc_id in [key for key, document in self.documents.items()
+                             if key[0] == "comment" and document.image_id == image_id]:
+            self.remove(kind, doc_id)
+
+    def search(self, query: str) -> List[SearchHit]:
+        """
+        :param query: The words to search for.
+        :type query: str
+        :return: The documents containing every word, best first, then by kind and ID.
+        :rtype: List[SearchHit]
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        postings = sorted((self.postings.get(term, {}) for term in terms), key=len)
+        keys = set(postings[0]).intersection(*postings[1:])
+        total = len(self.documents)
+        hits = []
+        for key in keys:
+            document = self.documents[key]
+            length = sum(document.terms.values())
+            rank = sum(document.terms[term] / length * math.log(1 + total / len(self.postings[term]))
+                       for term in terms)
+            hits.append(SearchHit(key[0], key[1], document.image_id, document.text, rank))
+        hits.sort(key=lambda hit: (-hit.rank, hit.kind, hit.id))
+        return hits
+
+    def track(self, session: Session) -> None:
+        """
+        Record the indexed entities written by a flush, to apply once they are committed.
+
+        :param session: The flushed session.
+        :type session: Session
+        """
+        if not self.loaded:
+            return
+        changes = session.info.setdefault("search_index_changes", [])
+        deleted_images = set()
+        for entity in session.deleted:
+            if isinstance(entity, Image):
+                deleted_images.add(entity.id)
+                changes.append(("image", entity.id, None, None))
+                changes.append(("image_comments", entity.id, None, None))
+            elif isinstance(entity, Comment):
+                changes.append(("comment", entity.id, None, None))
+        for entity in (*session.new, *session.dirty):
+            if isinstance(entity, Image):
+                changes.append(("image", entity.id, entity.id, entity.description))
+            elif isinstance(entity, Comment):
+                if deleted_images.intersection(inspect(entity).attrs.image_id.history.deleted):
+                    # Detached from an image deleted in this flush
+                    changes.append(("comment", entity.id, None, None))
+                else:
+                    changes.append(("comment", entity.id, entity.image_id, entity.comment))
+
+    def apply(self, session: Session) -> None:
+        for kind, doc_id, image_id, text in session.info.pop("search_index_changes", []):
+            if kind == "image_comments":
+                self.remove_image_comments(doc_id)
+            else:
+                self.add(kind, doc_id, image_id, text)
+
+
+search_index = InvertedIndex()
+
+
+@event.listens_for(Session, "after_flush")
+def _track_search_index(session, flush_context):
+    search_index.track(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_search_index(session):
+    search_index.apply(session)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_search_index(session, previous_transaction):
+    session.info.pop("search_index_changes", None)
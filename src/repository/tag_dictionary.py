@@ -0,0 +1,162 @@
+"""
+Tag dictionary module.
+
+Tags are few, small and read constantly, so every worker keeps all of them in memory:
+a name to ID map for resolving tag names without queries, and a sorted array of
+casefolded names for prefix suggestions by binary search. The dictionary is loaded on
+first use, changes are broadcast to the other workers as invalidation events, and it
+is reloaded whenever those events may have been missed.
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from src.models.models import Tag
+from src.services.cache import invalidation_listener, publish_invalidation
+
+# Invalidation keys of tag events: tagdict:+<id>:<name> when a tag is created, tagdict:-<id>:<name> when it is deleted
+EVENT_PREFIX = "tagdict:"
+
+
+class TagDictionary:
+    """
+    Per-worker map of every tag name to its ID, with a prefix index.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._index: List[Tuple[str, str]] = []
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def clear(self) -> None:
+        """
+        Forget every tag; the dictionary is reloaded on next use.
+        """
+        self._ids = {}
+        self._index = []
+        self.loaded = False
+
+    async def load(self, db: AsyncSession) -> None:
+        """
+        Load every tag with one query.
+
+        :param db: The database session.
+        :type db: AsyncSession
+        """
+        rows = (await db.execute(select(Tag.name, Tag.id))).all()
+        self._ids = {name: tag_id for name, tag_id in rows}
+        self._index = sorted((name.casefold(), name) for name in self._ids)
+        self.loaded = True
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        if not self.loaded:
+            await self.load(db)
+
+    def get(self, name: str) -> Optional[int]:
+        """
+        :param name: The tag name.
+        :type name: str
+        :return: The ID of the tag, or None if it is unknown.
+        :rtype: int | None
+        """
+        return self._ids.get(name)
+
+    def add(self, name: str, tag_id: int) -> None:
+        if name not in self._ids:
+            insort(self._index, (name.casefold(), name))
+        self._ids[name] = tag_id
+
+    def discard(self, name: str) -> None:
+        if self._ids.pop(name, None) is not None:
+            del self._index[bisect_left(self._index, (name.casefold(), name))]
+
+    def suggest(self, prefix: str, limit: int) -> List[dict]:
+        """
+        Find the tags starting with a prefix, ignoring case, in O(log n + limit).
+
+        :param prefix: The beginning of the tag name.
+        :type prefix: str
+        :param limit: The maximum number of tags to return.
+        :type limit: int
+        :return: The id and name of the matching tags, in alphabetical order.
+        :rtype: List[dict]
+        """
+        key = prefix.casefold()
+        suggestions = []
+        position = bisect_left(self._index, (key,))
+        while position < len(self._index) and len(suggestions) < limit:
+            folded, name = self._index[position]
+            if not folded.startswith(key):
+                break
+            suggestions.append({"id": self._ids[name], "name": name})
+            position += 1
+        return suggestions
+
+    def attach(self, name: str, db: AsyncSession) -> Tag:
+        """
+        Get a known tag as a persistent entity of the session, without loading it.
+
+        :param name: The name of a tag in the dictionary.
+        :type name: str
+        :param db: The database session.
+        :type db: AsyncSession
+        :return: The tag, usable in relationships.
+        :rtype: Tag
+        """
+        tag_id = self._ids[name]
+        tag = db.identity_map.get(db.identity_key(Tag, tag_id))
+        if tag is None:
+            tag = Tag(id=tag_id, name=name)
+            make_transient_to_detached(tag)
+            db.add(tag)
+        return tag
+
+    async def remember(self, tags: Iterable[Tag]) -> None:
+        """
+        Add committed tags and tell the other workers about the new ones.
+
+        :param tags: The tags.
+        :type tags: Iterable[Tag]
+        """
+        new = [tag for tag in tags if self._ids.get(tag.name) != tag.id]
+        for tag in new:
+            self.add(tag.name, tag.id)
+        await publish_invalidation(*(f"{EVENT_PREFIX}+{tag.id}:{tag.name}" for tag in new))
+
+    async def forget(self, tag: Tag) -> None:
+        """
+        Remove a deleted tag here and on the other workers.
+
+        :param tag: The deleted tag.
+        :type tag: Tag
+        """
+        self.discard(tag.name)
+        await publish_invalidation(f"{EVENT_PREFIX}-{tag.id}:{tag.name}")
+
+    def handle(self, key: Optional[str]) -> None:
+        """
+        Invalidation handler applying the tag events of other workers.
+
+        :param key: The invalidation key, or None if events may have been missed.
+        :type key: str | None
+        """
+        if key is None:
+            self.loaded = False
+        elif key.startswith(EVENT_PREFIX):
+            event, rest = key[len(EVENT_PREFIX)], key[len(EVENT_PREFIX) + 1:]
+            tag_id, name = rest.split(":", 1)
+            if event == "+":
+                self.add(name, int(tag_id))
+            else:
+                self.discard(name)
+
+
+tag_dictionary = TagDictionary()
+invalidation_listener.add_handler(tag_dictionary.handle)
@@ -1,42 +1,174 @@
-from typing import List
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.models.models import Tag, User, Role
+from src.repository.entity_cache import tag_cache
+from src.repository.pagination import paginate
+from src.repository.tag_dictionary import tag_dictionary
 
 
-async def get_tags(skip: int, limit: int, db: Session, user: User
-                   ) -> List[Tag] | None:
+# Dialects whose INSERT supports ON CONFLICT DO NOTHING ... RETURNING
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def normalize_tag_names(names: Iterable[str]) -> List[str]:
+    """
+    :param names: Tag names as entered.
+    :type names: Iterable[str]
+    :return: The names without surrounding whitespace, blanks and duplicates, in their original order.
+    :rtype: List[str]
     """
-    Retrieves a list of tags for a specific user.
+    return list(dict.fromkeys(name.strip() for name in names if name and name.strip()))
 
-    :param user: The user to retrieve tags for.
-    :type user: User
+
+async def upsert_tags(names: Iterable[str], db: AsyncSession) -> List[Tag]:
+    """
+    Resolves tag names to tags, creating the missing ones, in at most two statements: one bulk
+    INSERT ... ON CONFLICT DO NOTHING RETURNING for the new tags and one IN select for the
+    tags that already existed. Concurrent uploads of the same new tag do not conflict.
+
+    Nothing is committed, so the tags are saved in the caller's unit of work.
+
+    :param names: The tag names. Duplicates and surrounding whitespace are ignored.
+    :type names: Iterable[str]
     :param db: The database session.
-    :type db: Session
-    :return: A list of tags.
-    :rtype: List[Tag]| None
+    :type db: AsyncSession
+    :return: The tags, in the order of their names.
+    :rtype: List[Tag]
     """
-    tags =db.query(Tag).offset(skip).limit(limit).all()
+    names = normalize_tag_names(names)
+    if not names:
+        return []
+    insert = UPSERT_INSERTS[db.get_bind().dialect.name]
+    statement = (insert(Tag).values([{"name": name} for name in names])
+                 .on_conflict_do_nothing(index_elements=[Tag.name])
+                 .returning(Tag))
+    tags = {tag.name: tag for tag in await db.scalars(statement)}
+    existing = [name for name in names if name not in tags]
+    if existing:
+        tags.update((tag.name, tag) for tag in await db.scalars(select(Tag).where(Tag.name.in_(existing))))
+    return [tags[name] for name in names]
+
+
+async def resolve_tags(names: Iterable[str], db: AsyncSession) -> List[Tag]:
+    """
+    Resolves tag names to tags through the tag dictionary. Known tags cost no query;
+    unknown ones are created with upsert_tags. Nothing is committed, so call
+    tag_dictionary.remember with the tags after the caller's commit.
+
+    :param names: The tag names.
+    :type names: Iterable[str]
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The tags, in the order of their names.
+    :rtype: List[Tag]
+    """
+    names = normalize_tag_names(names)
+    if not names:
+        return []
+    await tag_dictionary.ensure_loaded(db)
+    created = {tag.name: tag for tag in
+               await upsert_tags([name for name in names if tag_dictionary.get(name) is None], db)}
+    return [created[name] if name in created else tag_dictionary.attach(name, db) for name in names]
+
+
+async def commit_tags(names: Iterable[str], db: AsyncSession,
+                      assign: Callable[[List[Tag]], Awaitable[None]]) -> List[Tag]:
+    """
+    Resolves tag names, lets assign link the tags to the entities of the caller's unit of work,
+    commits it, then remembers the tags in the tag dictionary.
+
+    The dictionary misses the deletion of a tag if its event is lost, e.g. while Redis is unavailable,
+    and the commit then fails on the foreign key of the deleted tag. The dictionary is reloaded on
+    next use and the unit of work is retried once with every tag upserted, which recreates it.
+
+    :param names: The tag names.
+    :type names: Iterable[str]
+    :param db: The database session.
+    :type db: AsyncSession
+    :param assign: Links the tags to the entities to save; called again, after a rollback, on a retry.
+    :type assign: Callable[[List[Tag]], Awaitable[None]]
+    :return: The committed tags, in the order of their names.
+    :rtype: List[Tag]
+    """
+    names = normalize_tag_names(names)
+    tags = await resolve_tags(names, db)
+    await assign(tags)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        tag_dictionary.clear()
+        # Forget the tags of the failed attempt, including the deleted ones
+        for entity in [entity for entity in db.identity_map.values() if isinstance(entity, Tag)]:
+            db.expunge(entity)
+        tags = await upsert_tags(names, db)
+        await assign(tags)
+        await db.commit()
+    await tag_dictionary.remember(tags)
     return tags
 
 
-# async def get_tag(tag_id: int, db: Session,user: User
-#                   ) -> Tag| None:
-#     """
-#     Retrieves a single tag by its ID.
+async def suggest_tags(prefix: str, limit: int, db: AsyncSession) -> List[dict]:
+    """
+    Suggests tags starting with a prefix, from the in-memory tag dictionary.
+
+    :param prefix: The beginning of the tag name, matched ignoring case.
+    :type prefix: str
+    :param limit: The maximum number of tags to return.
+    :type limit: int
+    :param db: The database session, used only to load the dictionary.
+    :type db: AsyncSession
+    :return: The id and name of the matching tags, in alphabetical order.
+    :rtype: List[dict]
+    """
+    await tag_dictionary.ensure_loaded(db)
+    return tag_dictionary.suggest(prefix, limit)
+
+
+async def get_tags(cursor: Optional[str], limit: int, db: AsyncSession, user: User
+                   ) -> Tuple[List[Tag], Optional[str]]:
+    """
+    Retrieves a page of tags, ordered by ID.
+
+    :param cursor: The cursor returned with the previous page, or None for the first page.
+    :type cursor: str | None
+    :param limit: The maximum number of tags to return.
+    :type limit: int
+    :param db: The database session.
+    :type db: AsyncSession
+    :param user: The user to retrieve tags for.
+    :type user: User
+    :return: A list of tags and the cursor of the next page, or None on the last page.
+    :rtype: Tuple[List[Tag], str | None]
+    """
+    return await paginate(select(Tag), Tag.id, cursor, limit, db)
+
+
+async def get_tag(tag_id: int, db: AsyncSession,user: User
+                  ) -> Tag| None:
+    """
+    Retrieves a single tag by its ID through the tag cache. The returned tag is for reading only.
 
-#     :param tag_id: The ID of the tag to retrieve.
-#     :type tag_id: int
-#     :param db: The database session.
-#     :type db: Session
-#     :return: The tag with the specified ID, or None if it does not exist.
-#     :rtype: Tag | None
-#     """
-#     tag = db.query(Tag).filter(Tag.id == tag_id).first()
-#     return tag
+    :param tag_id: The ID of the tag to retrieve.
+    :type tag_id: int
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The tag with the specified ID, or None if it does not exist.
+    :rtype: Tag | None
+    """
+    tag = await tag_cache.get(tag_id)
+    if tag is None:
+        tag = await db.get(Tag, tag_id)
+        if tag is not None:
+            await tag_cache.set(tag_id, tag)
+    return tag
 
 
-async def remove_tag(tag_id: int, db: Session,user: User
+async def remove_tag(tag_id: int, db: AsyncSession,user: User
                      ) -> Tag | None:
     """
     Deletes a tag with the specified ID for a specific user.
@@ -46,14 +178,16 @@ async def remove_tag(tag_id: int, db: Session,user: User
     :param user: The user to delete the tag for.
     :type user: User
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The deleted tag, or None if it does not exist.
     :rtype: Tag | None
     """
-    tag = db.query(Tag).filter(Tag.id == tag_id).first()
+    tag = await db.get(Tag, tag_id)
 
     if tag:
-        db.delete(tag)
-        db.commit()
+        await db.delete(tag)
+        await db.commit()
+        await tag_cache.invalidate(tag_id)
+        await tag_dictionary.forget(tag)
 
     return tag
@@ -1,60 +1,180 @@
-import cloudinary
-import qrcode
 import uuid
 
-from typing import Dict, Optional
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 from fastapi import HTTPException, status
-from pathlib import Path
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from cloudinary.utils import cloudinary_url
-from src.conf.config import cloudinary_start
-from cloudinary.uploader import upload
-from sqlalchemy.orm import Session
-from src.models.models import Image, User
+from src.conf.config import settings
+from src.models.models import Image, User, Job
+from src.repository import jobs as repository_jobs
+from src.repository.entity_cache import get_image, image_cache
+from src.services.cache import invalidation_listener
+from src.services.metrics import metrics
+from src.services.qr_codes import qr_code_cache
+from src.services.storage import storage_client, parse_delivery_url
 
+TRANSFORM_JOB = "transform_image"
+CASE_INSENSITIVE_PARAMS = {"crop", "gravity", "fetch_format", "quality"}
 
-def make_qr_code(edited_image_url: str, image_id: int, username: str):
+CanonicalTransformation = Tuple[Tuple[str, object], ...]
+
+
+def canonical_transformation(transformations: dict) -> CanonicalTransformation:
     """
-    The make_qr_code function takes in the edited image url and the image id.
-    It then creates a QR code using qrcode, saves it as a png file, uploads it to cloudinary
-    and returns its secure url.
-    
-    :param edited_image_url: Path: Pass the path of the edited image to the function
-    :param image_id: int: Name the qr code file
-    :param db: Session: Pass in the database session to the function
-    :return: A dictionary, which is not a valid url
-    :doc-author: Trelent
-    """
-    import qrcode
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
-    )
-
-    qr.add_data(edited_image_url)
-    qr.make(fit=True)
-
-    img = qr.make_image(fill_color="black", back_color="white")
-    
-    qr_code_file = "qr_code.png"
-    img.save(qr_code_file)
+    Normalizes transformation parameters, so equivalent requests share one cache entry and one URL.
+
+    Parameters:
+    - transformations (dict): The transformation parameters, None values meaning "not set".
+
+    Returns:
+    - CanonicalTransformation: The set parameters as (name, value) pairs sorted by name, with strings stripped
+      and enum-like values lowercased.
+    """
+    canonical = {}
+    for key, value in transformations.items():
+        if isinstance(value, str):
+            value = value.strip()
+            if key in CASE_INSENSITIVE_PARAMS:
+                value = value.lower()
+        if value is None or value == "":
+            continue
+        canonical[key] = value
+    return tuple(sorted(canonical.items()))
+
+
+class TransformURLCache:
+    """
+    Per-worker LRU of derived delivery URLs keyed by (image id, canonical transformation).
+
+    The URLs of an image are dropped on every worker when its image cache entry is invalidated,
+    e.g. when the image is deleted.
+    """
+
+    def __init__(self, max_entries: int = settings.transform_cache_size, image_prefix: str = image_cache.prefix):
+        """
+        :param max_entries: How many URLs the cache holds.
+        :type max_entries: int
+        :param image_prefix: The key prefix of the image cache, whose invalidations apply to this cache.
+        :type image_prefix: str
+        """
+        self.max_entries = max_entries
+        self.image_prefix = image_prefix
+        self._lru: OrderedDict[Tuple[int, CanonicalTransformation], str] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, image_id: int, spec: CanonicalTransformation) -> str | None:
+        key = (image_id, spec)
+        url = self._lru.get(key)
+        if url is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._lru.move_to_end(key)
+        return url
+
+    def set(self, image_id: int, spec: CanonicalTransformation, url: str) -> None:
+        key = (image_id, spec)
+        self._lru[key] = url
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def invalidate(self, image_id: int) -> None:
+        """
+        Drops every cached URL of an image, e.g. after it is deleted.
+
+        :param image_id: The ID of the image.
+        :type image_id: int
+        """
+        for key in [key for key in self._lru if key[0] == image_id]:
+            del self._lru[key]
+
+    def handle(self, key: Optional[str]) -> None:
+        """
+        Invalidation handler dropping the URLs of images invalidated by other workers.
+
+        :param key: The invalidation key, or None if invalidations may have been missed.
+        :type key: str | None
+        """
+        if key is None:
+            self._lru.clear()
+        elif key.startswith(self.image_prefix) and key[len(self.image_prefix):].isdigit():
+            self.invalidate(int(key[len(self.image_prefix):]))
+
+    def stats(self) -> dict:
+        """
+        Hit/miss metrics.
+
+        :return: The number of hits, misses and cached URLs, and the hit ratio.
+        :rtype: dict
+        """
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._lru),
+                "hit_ratio": self.hits / lookups if lookups else 0.0}
+
+
+transform_url_cache = TransformURLCache()
+metrics.add_stats("cache", transform_url_cache.stats, cache="transform_url")
+invalidation_listener.add_handler(transform_url_cache.handle)
+
+
+async def transformed_image_url(image_id: int, db: AsyncSession, **transformations) -> str:
+    """
+    Computes the delivery URL of a transformed image locally, without uploading anything to Cloudinary.
+    Cloudinary derives the asset on first delivery, so identical requests map to one URL and one derived asset.
+
+    Any user may derive URLs of any image, as with the originals listed by GET /images: the derived URL
+    only adds transformation parameters to the public delivery URL of the original, and nothing is stored.
+
+    Parameters:
+    - image_id (int): The ID of the image to transform.
+    - db (AsyncSession): The SQLAlchemy session object, only used on a miss of both the URL and the image cache.
+    - transformations: The transformation parameters accepted by transform_image_url.
 
-    cloudinary_start()
-    upload_qr_code = cloudinary.uploader.upload(
-        qr_code_file,
-        public_id=f"Qr_Code/{username}/qr_code_{image_id}",
-        overwrite=True,
-        invalidate=True,
-    )
+    Returns:
+    - str: The delivery URL of the transformed image.
+
+    Raises:
+    - HTTPException: If the image is not found in the database or is not stored in Cloudinary.
+    """
+    spec = canonical_transformation(transformations)
+    url = transform_url_cache.get(image_id, spec)
+    if url is not None:
+        return url
+
+    image = await get_image(image_id, db)
+    if not image:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    parts = parse_delivery_url(image.image)
+    if parts is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Image is not stored in Cloudinary")
+
+    url, _ = cloudinary_url(parts["public_id"], transformation=[dict(spec)], version=parts["version"],
+                            format=parts["format"], secure=True, cloud_name=settings.cloudinary_name)
+    transform_url_cache.set(image_id, spec, url)
+    return url
 
-    return upload_qr_code["secure_url"]
+
+async def make_qr_code(edited_image_url: str, image_id: int) -> str:
+    """
+    The make_qr_code function takes in the edited image url and the image id.
+    It renders the QR code in memory into the QR code cache and returns the URL it is served from,
+    so the code is never written to disk or uploaded to cloudinary.
+
+    :param edited_image_url: str: The URL encoded in the QR code
+    :param image_id: int: The ID of the image the QR code belongs to
+    :return: The path of the QR code endpoint of the image
+    """
+    await qr_code_cache.get(edited_image_url, "png")
+    return f"/api/images/{image_id}/qr"
 
 
 async def transform_image_url(
-        image_id: str,
-        db: Session,
+        image_id: int,
+        db: AsyncSession,
         user: User,
         width: Optional[int] = None,
         height: Optional[int] = None,
@@ -63,7 +183,8 @@ async def transform_image_url(
         quality: Optional[str] = None,
         fetch_format: Optional[str] = None,
         effect: Optional[str] = None,
-        angle: Optional[int] = None
+        angle: Optional[int] = None,
+        asset_id: Optional[str] = None
     ) -> str:
     """
     Transforms the image with the specified parameters and updates the edited image URL in the database.
@@ -78,10 +199,12 @@ async def transform_image_url(
     - fetch_format (Optional[str]): The fetch format for the transformed image.
     - effect (Optional[str]): The effect to apply to the transformed image.
     - angle (Optional[int]): The angle of rotation for the transformation.
-    - db (Session): The SQLAlchemy session object.
+    - asset_id (Optional[str]): The last part of the public ID of the transformed image, so that retries
+      overwrite the same asset; a new one is generated if None.
+    - db (AsyncSession): The SQLAlchemy session object.
 
     Returns:
-    - str: The URL of the transformed image.
+    - str: The URL the QR code of the transformed image is served from.
 
     Raises:
     - HTTPException: If the image is not found in the database or if the image upload to Cloudinary fails.
@@ -101,14 +224,14 @@ async def transform_image_url(
     tr = []
     tr.append(transformations)
 
-    image = db.query(Image).filter(Image.id == image_id).first()
+    result = await db.execute(select(Image).filter(Image.id == image_id))
+    image = result.scalars().first()
     if not image:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
 
-    im_uuid = uuid.uuid4()
-    public_id = f"Images/{user.username}/{im_uuid}"
+    public_id = f"Images/{user.username}/{asset_id or uuid.uuid4()}"
 
-    image_url = cloudinary.uploader.upload(image.image, public_id=public_id, transformation=tr)
+    image_url = await storage_client.upload(image.image, public_id=public_id, overwrite=True, transformation=tr)
     print(image_url['secure_url'])
 
     if 'url' not in image_url:
@@ -116,30 +239,76 @@ async def transform_image_url(
     
     image.edited_image = image_url['secure_url']
 
-    image.qr_code = make_qr_code(image_url['secure_url'], im_uuid, user.username)
+    image.qr_code = await make_qr_code(image_url['secure_url'], image.id)
     print(image.qr_code)
 
-    db.commit()
-    db.refresh(image)
+    await db.commit()
+    await db.refresh(image)
+    await image_cache.invalidate(image.id)
     
     return image.qr_code
 
-async def update_image(image_id: int, edited_image_url: str, db: Session, user_id: int) -> Image:
+
+async def enqueue_transform(image_id: int, db: AsyncSession, user: User, **transformations) -> Job:
+    """
+    Queues a transformation of the image, so the request does not wait for Cloudinary.
+
+    Parameters:
+    - image_id (int): The ID of the image to transform.
+    - db (AsyncSession): The SQLAlchemy session object.
+    - user (User): The user requesting the transformation.
+    - transformations: The transformation parameters accepted by transform_image_url.
+
+    Returns:
+    - Job: The queued transform job.
+
+    Raises:
+    - HTTPException: If the image is not found in the database.
+    """
+    result = await db.execute(select(Image.id).filter(Image.id == image_id))
+    if result.scalar() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    # The job id names the transformed asset, so every attempt uploads to the same public ID
+    job_id = str(uuid.uuid4())
+    payload = {"image_id": image_id, "user_id": user.id, "transformations": transformations, "job_id": job_id}
+    return await repository_jobs.enqueue_job(TRANSFORM_JOB, payload, user.id, db, job_id=job_id)
+
+
+async def run_transform_job(payload: dict, db: AsyncSession) -> dict:
+    """
+    Job handler that performs a queued transformation.
+
+    Parameters:
+    - payload (dict): The job payload created by enqueue_transform.
+    - db (AsyncSession): The SQLAlchemy session object.
+
+    Returns:
+    - dict: The URLs of the transformed image and of its QR code, stored as the job result.
+    """
+    user = await db.get(User, payload["user_id"])
+    qr_code = await transform_image_url(payload["image_id"], db, user, **payload["transformations"],
+                                        asset_id=payload.get("job_id"))
+    image = await db.get(Image, payload["image_id"])
+    return {"transformed_url": image.edited_image, "qr_code": qr_code}
+
+async def update_image(image_id: int, edited_image_url: str, db: AsyncSession, user_id: int) -> Image:
     """
     Updates the edited image URL of an existing image.
 
     Parameters:
     - image_id (int): The ID of the image to update.
     - edited_image_url (str): The new edited image URL.
-    - db (Session): The SQLAlchemy session object.
+    - db (AsyncSession): The SQLAlchemy session object.
     - user_id (int): The ID of the user who owns the image.
 
     Returns:
     - Image: The updated image object, or None if not found.
     """
-    image = db.query(Image).filter(Image.id == image_id, Image.user_id == user_id).first()
+    result = await db.execute(select(Image).filter(Image.id == image_id, Image.user_id == user_id))
+    image = result.scalars().first()
     if image:
         image.edited_image = edited_image_url
-        db.commit()
-        db.refresh(image)
+        await db.commit()
+        await db.refresh(image)
+        await image_cache.invalidate(image.id)
     return image
\ No newline at end of file
@@ -3,39 +3,67 @@
 User repository module.
 
 This module contains the functions to interact with the UserDB model in the database.
-It includes functions to get a user by email, create a new user, update a user's token,
+It includes functions to get a user by email, create a new user, update a user's password,
 confirm a user's email, and update a user's avatar.
 """
 
 from src.models.models import User
-from sqlalchemy.orm import Session
+from sqlalchemy import exists, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.schemas.user import UserModel
 from libgravatar import Gravatar 
+from src.services.revocation import revocation_epochs
+from src.services.user_snapshot import user_cache
 
+# Key of the PostgreSQL advisory lock serializing signups while there are no users yet
+BOOTSTRAP_LOCK_KEY = 0x50677261
 
 
-async def get_user_by_email(email: str, db: Session) -> User:
+async def is_first_user(db: AsyncSession) -> bool:
+    """
+    Checks whether the user about to be created is the first one, who becomes admin.
+
+    Users are probed with EXISTS, which stops at the first row. Only while the table is empty,
+    PostgreSQL takes a transaction-level advisory lock and probes again, so that two concurrent
+    first signups can't both become admin. The lock is released when the signup commits.
+
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: True if there are no users yet.
+    :rtype: bool
+    """
+    probe = select(exists().select_from(User))
+    if await db.scalar(probe):
+        return False
+    if db.get_bind().dialect.name == "postgresql":
+        await db.execute(select(func.pg_advisory_xact_lock(BOOTSTRAP_LOCK_KEY)))
+        return not await db.scalar(probe)
+    return True
+
+
+async def get_user_by_email(email: str, db: AsyncSession) -> User:
     """
     Retrieves a user from the database by their email.
 
     :param email: The email of the user to retrieve.
     :type email: str
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The user with the specified email, or None if the user does not exist.
     :rtype: UserDB | None
     """
-    return db.query(User).filter(User.email == email).first()
+    result = await db.execute(select(User).filter(User.email == email))
+    return result.scalars().first()
 
 
-async def create_user(body: UserModel, db: Session) -> User:
+async def create_user(body: UserModel, db: AsyncSession) -> User:
     """
     Creates a new user in the database.
 
     :param body: The data for the new user.
     :type body: UserModel
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The newly created user.
     :rtype: UserDB
     """
@@ -46,43 +74,43 @@ async def create_user(body: UserModel, db: Session) -> User:
     except Exception as e:
         print(e)
     new_user = User(**body.dict(), avatar=avatar)
-    users = db.query(User).all()
-    if not users:
+    if await is_first_user(db):
         new_user.role = "admin"
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 
-async def update_token(user: User, token: str | None, db: Session) -> None:
+async def update_password(user: User, password_hash: str, db: AsyncSession) -> None:
     """
-    Updates the refresh token for a user.
+    Replaces the password hash of a user, e.g. with one made with the current bcrypt cost.
 
-    :param user: The user to update the token for.
-    :type user: UserDB
-    :param token: The new refresh token.
-    :type token: str | None
+    :param user: The user to update the password for.
+    :type user: User
+    :param password_hash: The new password hash.
+    :type password_hash: str
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     """
-    user.refresh_token = token
-    db.commit()
+    user.password = password_hash
+    await db.commit()
 
-async def confirmed_email(email: str, db: Session) -> None:
+async def confirmed_email(email: str, db: AsyncSession) -> None:
     """
     Marks a user's email as confirmed.
 
     :param email: The email of the user to confirm.
     :type email: str
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     """
     user = await get_user_by_email(email, db)
     user.confirmed = True
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(email)
 
-# async def update_avatar(email: str, avatar_path: str, db: Session) -> UserDB:
+# async def update_avatar(email: str, avatar_path: str, db: AsyncSession) -> UserDB:
 #     print(email)
 #     user = db.query(UserDB).filter(UserDB.email == email).first()
 #     print(user)
@@ -91,7 +119,7 @@ async def confirmed_email(email: str, db: Session) -> None:
 #     db.refresh(user)
 #     return user
 
-async def update_avatar(email, url: str, db: Session) -> User:
+async def update_avatar(email, url: str, db: AsyncSession) -> User:
     """
     Updates the avatar for a user with the given email.
     Using the service Cloudinary
@@ -104,31 +132,35 @@ async def update_avatar(email, url: str, db: Session) -> User:
     :param url: The new URL of the avatar image.
     :type url: str
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The updated user object.
     :rtype: UserDB
     """
     user = await get_user_by_email(email, db)
     user.avatar = url
-    db.commit()
+    await db.commit()
+    await user_cache.invalidate(email)
     return user
 
 
-async def update_user_role(email: str, new_role: str, db: Session) -> User:
+async def update_user_role(email: str, new_role: str, db: AsyncSession) -> User:
     """
     The update_user_role function updates the role of a user in the database.
         Args:
             email (str): The email address of the user to update.
             new_role (str): The new role for this user.
-            db (Session, optional): SQLAlchemy Session instance; defaults to None.
+            db (AsyncSession, optional): SQLAlchemy AsyncSession instance; defaults to None.
     
     :param email: str: Identify the user
     :param new_role: str: Update the role of a user
-    :param db: Session: Pass the database session to the function
+    :param db: AsyncSession: Pass the database session to the function
     :return: The updated user object
     """
     user = await get_user_by_email(email, db)
     user.role = new_role
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    await user_cache.invalidate(email)
+    # Access tokens carrying the old role in their claims are no longer accepted
+    await revocation_epochs.bump(user.id)
     return user
\ No newline at end of file
@@ -18,18 +18,20 @@ It includes routes for user signup, login, requesting email confirmation,
 refreshing tokens, confirming email, updating avatar, and retrieving the current user's information.
 """
 
+from typing import Optional
+
 import cloudinary
-import cloudinary.uploader
 from fastapi import APIRouter, HTTPException, Depends, status, Security, BackgroundTasks, Request, UploadFile, File
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.database.db import get_db
-from src.schemas.user import UserModel, UserResponse, TokenModel, RequestEmail, UserDb
+from src.schemas.user import UserModel, UserResponse, TokenModel, RequestEmail, UserDb, LogoutModel, TokenRevokeModel
 from src.repository import users as repository_users
 from src.conf.config import settings
 from src.services.auth import auth_service
 from src.services.email import send_email
+from src.services.storage import storage_client
 from src.models.models import User
 
 # Initialize the router with a prefix and tags for grouping related routes
@@ -37,7 +39,7 @@ router = APIRouter(prefix='/auth', tags=["auth"])
 security = HTTPBearer()
 
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def signup(body: UserModel, background_tasks: BackgroundTasks, request: Request, db: Session = Depends(get_db)):
+async def signup(body: UserModel, background_tasks: BackgroundTasks, request: Request, db: AsyncSession = Depends(get_db)):
     """
     Sign up a new user.
 
@@ -48,7 +50,7 @@ async def signup(body: UserModel, background_tasks: BackgroundTasks, request: Re
     :param request: The HTTP request.
     :type request: Request
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The newly created user and a confirmation message.
     :rtype: dict
     :raises HTTPException: If the user already exists.
@@ -56,20 +58,20 @@ async def signup(body: UserModel, background_tasks: BackgroundTasks, request: Re
     exist_user = await repository_users.get_user_by_email(body.email, db)
     if exist_user:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Account already exists")
-    body.password = auth_service.get_password_hash(body.password)
+    body.password = await auth_service.get_password_hash(body.password)
     new_user = await repository_users.create_user(body, db)
     background_tasks.add_task(send_email, new_user.email, new_user.username, request.base_url)
     return {"user": new_user, "detail": "User successfully created. Check your email for confirmation."}
 
 @router.post("/login", response_model=TokenModel)
-async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(body: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     """
     Log in a user.
 
     :param body: The OAuth2 password request form.
     :type body: OAuth2PasswordRequestForm
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The access and refresh tokens.
     :rtype: TokenModel
     :raises HTTPException: If the email is invalid, the email is not confirmed, or the password is invalid.
@@ -79,17 +81,20 @@ async def login(body: OAuth2PasswordRequestForm = Depends(), db: Session = Depen
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email")
     if not user.confirmed:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email not confirmed")
-    if not auth_service.verify_password(body.password, user.password):
+    valid, new_hash = await auth_service.hasher.verify_and_update(body.password, user.password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid password")
+    if new_hash:
+        # The configured bcrypt cost changed since this password was hashed
+        await repository_users.update_password(user, new_hash, db)
     # Generate JWT
-    access_token = await auth_service.create_access_token(data={"sub": user.email})
-    refresh_token = await auth_service.create_refresh_token(data={"sub": user.email})
-    await repository_users.update_token(user, refresh_token, db)
+    access_token = await auth_service.create_access_token(data=auth_service.access_token_data(user))
+    refresh_token = await auth_service.issue_refresh_token(user, db)
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 @router.post('/request_email')
 async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, request: Request,
-                        db: Session = Depends(get_db)):
+                        db: AsyncSession = Depends(get_db)):
     """
     Request a new email confirmation.
 
@@ -100,7 +105,7 @@ async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, r
     :param request: The HTTP request.
     :type request: Request
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: A confirmation message.
     :rtype: dict
     """
@@ -113,40 +118,79 @@ async def request_email(body: RequestEmail, background_tasks: BackgroundTasks, r
     return {"message": "Check your email for confirmation."}
 
 @router.get('/refresh_token', response_model=TokenModel)
-async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: Session = Depends(get_db)):
+async def refresh_token(credentials: HTTPAuthorizationCredentials = Security(security), db: AsyncSession = Depends(get_db)):
     """
     Refresh the access token.
 
     :param credentials: The HTTP authorization credentials.
     :type credentials: HTTPAuthorizationCredentials
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The new access and refresh tokens.
     :rtype: TokenModel
     :raises HTTPException: If the refresh token is invalid.
     """
-    token = credentials.credentials
-    email = await auth_service.decode_refresh_token(token)
-    user = await repository_users.get_user_by_email(email, db)
-    if user.refresh_token != token:
-        await repository_users.update_token(user, None, db)
+    email, refresh_token = await auth_service.rotate_refresh_token(credentials.credentials, db)
+    user = await auth_service.load_user(email, db)
+    if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
 
-    access_token = await auth_service.create_access_token(data={"sub": email})
-    refresh_token = await auth_service.create_refresh_token(data={"sub": email})
-    await repository_users.update_token(user, refresh_token, db)
+    access_token = await auth_service.create_access_token(data=auth_service.access_token_data(user))
     return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
 
 
+@router.post('/logout')
+async def logout(body: Optional[LogoutModel] = None, token: str = Depends(auth_service.oauth2_scheme),
+                 current_user: User = Depends(auth_service.get_current_user), db: AsyncSession = Depends(get_db)):
+    """
+    Log out the current device: revoke the access token, and the refresh token if one is given.
+
+    :param body: The refresh token of the device.
+    :type body: LogoutModel | None
+    :param token: The access token of the request.
+    :type token: str
+    :param current_user: The currently authenticated user.
+    :type current_user: UserSnapshot
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: A confirmation message.
+    :rtype: dict
+    """
+    if body is not None and body.refresh_token:
+        await auth_service.revoke_token(body.refresh_token, current_user, db)
+    await auth_service.revoke_token(token, current_user, db)
+    return {"message": "Logged out"}
+
+
+@router.post('/revoke')
+async def revoke_token(body: TokenRevokeModel, current_user: User = Depends(auth_service.get_current_user),
+                       db: AsyncSession = Depends(get_db)):
+    """
+    Revoke an access or refresh token, e.g. a stolen one. Admins can revoke any user's tokens.
+
+    :param body: The token to revoke.
+    :type body: TokenRevokeModel
+    :param current_user: The currently authenticated user.
+    :type current_user: UserSnapshot
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: A confirmation message.
+    :rtype: dict
+    :raises HTTPException: If the token is invalid or belongs to another user.
+    """
+    await auth_service.revoke_token(body.token, current_user, db)
+    return {"message": "Token revoked"}
+
+
 @router.get('/confirmed_email/{token}')
-async def confirmed_email(token: str, db: Session = Depends(get_db)):
+async def confirmed_email(token: str, db: AsyncSession = Depends(get_db)):
     """
     Confirm the user's email.
 
     :param token: The confirmation token.
     :type token: str
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: A confirmation message.
     :rtype: dict
     :raises HTTPException: If the verification fails.
@@ -163,7 +207,7 @@ async def confirmed_email(token: str, db: Session = Depends(get_db)):
 @router.post("/avatar")
 async def update_avatar( file: UploadFile = File(...),
                         current_user: UserDb = Depends(auth_service.get_current_user),
-                        db: Session = Depends(get_db),
+                        db: AsyncSession = Depends(get_db),
                     ):
     """
     Update the user's avatar.
@@ -173,7 +217,7 @@ async def update_avatar( file: UploadFile = File(...),
     :param current_user: The currently authenticated user.
     :type current_user: UserDb
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: A confirmation message and the updated user.
     :rtype: dict
     """
@@ -181,21 +225,24 @@ async def update_avatar( file: UploadFile = File(...),
     return {"message": "Avatar updated successfully", "user": user}
 
 @router.get("/me/", response_model=UserDb)
-async def read_users_me(current_user: User = Depends(auth_service.get_current_user)):
+async def read_users_me(current_user: User = Depends(auth_service.get_current_user),
+                        db: AsyncSession = Depends(get_db)):
     """
     Retrieve the current user's information.
 
     :param current_user: The currently authenticated user.
-    :type current_user: UserDB
+    :type current_user: UserSnapshot
+    :param db: The database session.
+    :type db: AsyncSession
     :return: The current user's information.
     :rtype: UserDb
     """
-    return current_user
+    return await repository_users.get_user_by_email(current_user.email, db)
 
 
 @router.patch('/avatar', response_model=UserDb)
 async def update_avatar_user(file: UploadFile = File(), current_user: User = Depends(auth_service.get_current_user),
-                             db: Session = Depends(get_db)):
+                             db: AsyncSession = Depends(get_db)):
     """
     Update the user's avatar using Cloudinary.
     Using the service Cloudinary
@@ -205,7 +252,7 @@ async def update_avatar_user(file: UploadFile = File(), current_user: User = Dep
     :param current_user: The currently authenticated user.
     :type current_user: UserDB
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The updated user.
     :rtype: UserDb
     """
@@ -216,7 +263,7 @@ async def update_avatar_user(file: UploadFile = File(), current_user: User = Dep
         secure=True
     )
 
-    r = cloudinary.uploader.upload(file.file, public_id=f'ContactsApp/{current_user.username}', overwrite=True)
+    r = await storage_client.upload(await file.read(), public_id=f'ContactsApp/{current_user.username}', overwrite=True)
     src_url = cloudinary.CloudinaryImage(f'ContactsApp/{current_user.username}')\
                         .build_url(width=250, height=250, crop='fill', version=r.get('version'))
     user = await repository_users.update_avatar(current_user.email, src_url, db)
@@ -224,7 +271,7 @@ async def update_avatar_user(file: UploadFile = File(), current_user: User = Dep
 
 
 @router.post("/change_role", response_model=dict)
-async def change_user_role(admin_email: str, user_email: str, new_role: Role, db: Session = Depends(get_db)):
+async def change_user_role(admin_email: str, user_email: str, new_role: Role, db: AsyncSession = Depends(get_db)):
     """
     The change_user_role function changes the role of a user.
         Args:
@@ -235,7 +282,7 @@ async def change_user_role(admin_email: str, user_email: str, new_role: Role, db
     :param admin_email: str: Identify the admin who is trying to change a user's role
     :param user_email: str: Identify the user whose role is to be changed
     :param new_role: Role: Specify the new role of the user
-    :param db: Session: Access the database
+    :param db: AsyncSession: Access the database
     :return: A dictionary
     """
     try:
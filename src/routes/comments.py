@@ -1,29 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.schemas.comments import CommentBase, CommentResponse
+from src.schemas.pagination import Page
 from src.repository import comments
 from src.services.auth import auth_service
 from src.models.models import User,Role
 from src.database.db import get_db
-from typing import List
+from typing import List, Optional
 
 router = APIRouter(prefix='/images',tags=['comments'])
 
-@router.get('/{image_id}/comments/',response_model=List[CommentResponse])
-async def get_comments(image_id: int, db: Session = Depends(get_db)): #,current_user: User = Depends(auth_service.get_current_user)):
+@router.get('/{image_id}/comments/',response_model=Page[CommentResponse])
+async def get_comments(image_id: int, cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=100),
+                       db: AsyncSession = Depends(get_db)): #,current_user: User = Depends(auth_service.get_current_user)):
     """
-    The get_comments function returns all comments for a given image_id.
+    The get_comments function returns the comments for a given image_id, one page at a time.
         
     
     :param image_id: int: Get the comments for a specific image
-    :param db: Session: Pass the database session to the function
-    :return: A list of comments
+    :param cursor: Optional[str]: The next_cursor of the previous page, or None for the first page
+    :param limit: int: The maximum number of comments to return
+    :param db: AsyncSession: Pass the database session to the function
+    :return: A page of comments
     """
-    all_comments = await comments.get_comments(image_id, db)#current_user.id)
-    return all_comments
+    all_comments, next_cursor = await comments.get_comments(image_id, cursor, limit, db)#current_user.id)
+    return {"items": all_comments, "next_cursor": next_cursor}
 
 @router.post('/{image_id}/comments/', response_model=CommentResponse)
-async def create_comment(image_id: int, body: CommentBase, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+async def create_comment(image_id: int, body: CommentBase, db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
     """
     The create_comment function creates a new comment for the image with the given id.
         The body of the request should be in JSON format and contain:
@@ -31,14 +35,14 @@ async def create_comment(image_id: int, body: CommentBase, db: Session = Depends
     
     :param image_id: int: Specify the image that the comment is being made on
     :param body: CommentBase: Pass the comment body to the function
-    :param db: Session: Pass the database session to the function
+    :param db: AsyncSession: Pass the database session to the function
     :param current_user: User: Get the user that is currently logged in
     :return: A comment object
     """
     return await comments.create_comment(image_id, body, db, current_user.id)
 
 @router.patch('/comments/{comment_id}/', response_model=CommentResponse)
-async def update_comm(comment_id: int, body: CommentBase, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+async def update_comm(comment_id: int, body: CommentBase, db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
     """
     The update_comm function updates a comment in the database.
         Args:
@@ -49,7 +53,7 @@ async def update_comm(comment_id: int, body: CommentBase, db: Session = Depends(
     
     :param comment_id: int: Identify the comment that is being updated
     :param body: CommentBase: Pass the comment object to the update_comment function
-    :param db: Session: Pass in the database session from the dependency injection
+    :param db: AsyncSession: Pass in the database session from the dependency injection
     :param current_user: User: Get the current user from the auth_service
     :return: A comment object
     """
@@ -59,13 +63,13 @@ async def update_comm(comment_id: int, body: CommentBase, db: Session = Depends(
     return comment
 
 @router.delete('/comments/{comment_id}/', response_model=CommentResponse)
-async def delete_comment(comment_id: int, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+async def delete_comment(comment_id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
     """
     The delete_comment function deletes a comment from the database.
         The function takes in an integer representing the id of the comment to be deleted, and returns a boolean value indicating whether or not it was successful.
     
     :param comment_id: int: Specify the comment id of the comment to be deleted
-    :param db: Session: Pass the database connection to the function
+    :param db: AsyncSession: Pass the database connection to the function
     :param current_user: User: Get the current user from the database
     :return: A boolean, which is a bit of an odd choice
     """
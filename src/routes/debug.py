@@ -0,0 +1,66 @@
+from typing import Dict, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+
+from src.conf.config import settings
+from src.database.instrumentation import sql_instrumentation
+from src.models.models import Role, User
+from src.services.blocking import loop_monitor
+from src.services.profiler import render_collapsed, sampling_profiler
+from src.services.roles import RoleAccess
+
+router = APIRouter(prefix='/debug', tags=["debug"])
+
+access_admin = RoleAccess([Role.admin])
+
+
+@router.get("/queries")
+async def query_stats(current_user: User = Depends(access_admin)) -> Dict[str, dict]:
+    """
+    Reports the SQL statements run per route since this worker started. Admins only.
+
+    :param current_user: The current authenticated admin.
+    :type current_user: User
+    :return: For each route, its requests, statements, database time, most statements in one request,
+        and requests that repeated a statement more than sql_repeat_threshold times.
+    :rtype: Dict[str, dict]
+    """
+    return sql_instrumentation.stats()
+
+
+@router.get("/blocking")
+async def blocking_calls(current_user: User = Depends(access_admin)) -> dict:
+    """
+    Reports the calls that blocked the event loop of this worker for longer than loop_block_threshold,
+    with their route and stack, latest first. Admins only; the monitor runs with loop_monitor_enabled.
+
+    :param current_user: The current authenticated admin.
+    :type current_user: User
+    :return: The monitor's settings and lag metrics, and the captured blocking calls.
+    :rtype: dict
+    """
+    return loop_monitor.report()
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile(seconds: float = Query(10, gt=0, le=settings.profiler_max_seconds), route: Optional[str] = None,
+                  all_threads: bool = False, current_user: User = Depends(access_admin)):
+    """
+    Samples the stacks of this worker for a few seconds and returns them in the collapsed stack format,
+    ready for flamegraph.pl or speedscope. Admins only; one profile runs at a time per worker.
+
+    :param seconds: How long to sample.
+    :type seconds: float
+    :param route: Only profile requests to this route, given as its path template, e.g. /api/images/.
+    :type route: str | None
+    :param all_threads: Also sample the thread pool, e.g. sync endpoints and password hashing.
+    :type all_threads: bool
+    :param current_user: The current authenticated admin.
+    :type current_user: User
+    :return: One line per distinct stack, frames from the root down separated by semicolons, then its samples.
+    :rtype: PlainTextResponse
+    """
+    stacks = await sampling_profiler.profile(seconds, route, all_threads)
+    return PlainTextResponse(render_collapsed(stacks),
+                             headers={"Content-Disposition": 'attachment; filename="profile.folded"'})
@@ -1,15 +1,18 @@
-from typing import List, Optional
+from typing import List, Optional, Union
 import cloudinary
-from sqlalchemy.orm import Session
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Form
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Form, Query, Request, Response
 
 from src.conf.config import settings
 from src.database.db import get_db
 from src.models.models import User
 from src.repository import images as repository_images
-from src.repository.transform_images import transform_image_url, update_image
-from src.schemas.images import ImageResponse, ImageUpdateSchema
+from src.repository.transform_images import enqueue_transform, transformed_image_url, update_image
+from src.schemas.images import ImageResponse, ImageUpdateSchema, TransformResponse
+from src.schemas.jobs import JobResponse
+from src.schemas.pagination import Page
 from src.services.auth import auth_service
+from src.services.qr_codes import qr_code_cache, QR_MEDIA_TYPES
 
 
 router = APIRouter(tags=["images"])
@@ -22,45 +25,74 @@ cloudinary.config(
     )
 
 
-@router.get("/images", response_model=List[ImageResponse])
-async def get_all_images(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/images", response_model=Page[ImageResponse])
+async def get_all_images(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=100),
+                         db: AsyncSession = Depends(get_db)):
     """
-    Retrieves all images with optional pagination.
+    Retrieves all images, one page at a time.
 
-    :param skip: The number of images to skip.
-    :type skip: int
+    :param cursor: The next_cursor of the previous page, or None for the first page.
+    :type cursor: str | None
     :param limit: The maximum number of images to return.
     :type limit: int
     :param db: The database session.
-    :type db: Session
-    :return: A list of images.
-    :rtype: List[ImageResponse]
+    :type db: AsyncSession
+    :return: A page of images.
+    :rtype: Page[ImageResponse]
     """
-    images = await repository_images.get_all_images(skip, limit, db)
-    return images
+    images, next_cursor = await repository_images.get_all_images(cursor, limit, db)
+    return {"items": images, "next_cursor": next_cursor}
 
 
-@router.get("/images/user/{user_id}", response_model=List[ImageResponse])
-async def get_images_by_user(user_id: int, db: Session = Depends(get_db)):
+@router.get("/images/user/{user_id}", response_model=Page[ImageResponse])
+async def get_images_by_user(user_id: int, cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=100),
+                             db: AsyncSession = Depends(get_db)):
     """
-    Retrieves all images for a specific user.
+    Retrieves the images of a specific user, one page at a time.
 
     :param user_id: The ID of the user.
     :type user_id: int
+    :param cursor: The next_cursor of the previous page, or None for the first page.
+    :type cursor: str | None
+    :param limit: The maximum number of images to return.
+    :type limit: int
     :param db: The database session.
-    :type db: Session
-    :return: A list of images for the specified user.
-    :rtype: List[ImageResponse]
+    :type db: AsyncSession
+    :return: A page of images for the specified user.
+    :rtype: Page[ImageResponse]
     """
+    images, next_cursor = await repository_images.get_images_by_user(user_id, cursor, limit, db)
+    return {"items": images, "next_cursor": next_cursor}
 
-    images = await repository_images.get_images_by_user(user_id, db)
-    if images is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="NOT FOUND")
-    return images
+
+@router.get("/images/search", response_model=Page[ImageResponse])
+async def search_images(tags: str = Query(..., min_length=1, description="Comma-separated tag names"),
+                        mode: str = Query("all", pattern="^(all|any)$"),
+                        cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=100),
+                        db: AsyncSession = Depends(get_db)):
+    """
+    Searches images by tags, one page at a time.
+
+    :param tags: The comma-separated tag names.
+    :type tags: str
+    :param mode: all to return images having every tag, any for images having at least one.
+    :type mode: str
+    :param cursor: The next_cursor of the previous page, or None for the first page.
+    :type cursor: str | None
+    :param limit: The maximum number of images to return.
+    :type limit: int
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: A page of images.
+    :rtype: Page[ImageResponse]
+    """
+    images, next_cursor = await repository_images.search_images_by_tags(tags.split(","), mode == "all",
+                                                                         cursor, limit, db)
+    return {"items": images, "next_cursor": next_cursor}
 
 
 @router.get("/images/{image_id}", response_model=List[ImageResponse])
-async def get_images_by_id(image_id: int, db: Session = Depends(get_db),
+async def get_images_by_id(image_id: int, db: AsyncSession = Depends(get_db),
                       current_user: User = Depends(auth_service.get_current_user)):
     """
     Retrieves a specific image by ID.
@@ -68,7 +100,7 @@ async def get_images_by_id(image_id: int, db: Session = Depends(get_db),
     :param image_id: The ID of the image.
     :type image_id: int
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :param current_user: The current authenticated user.
     :type current_user: User
     :return: The image with the specified ID.
@@ -80,12 +112,42 @@ async def get_images_by_id(image_id: int, db: Session = Depends(get_db),
     return image
 
 
+@router.get("/images/{image_id}/qr", response_class=Response,
+            responses={200: {"content": {media_type: {} for media_type in QR_MEDIA_TYPES.values()}}})
+async def get_qr_code(image_id: int, request: Request,
+                      fmt: str = Query("png", alias="format", pattern="^(png|svg)$"),
+                      db: AsyncSession = Depends(get_db)):
+    """
+    Serves the QR code of a transformed image straight from the QR code cache.
+
+    :param image_id: The ID of the image.
+    :type image_id: int
+    :param request: The HTTP request, used for If-None-Match.
+    :type request: Request
+    :param fmt: The image format, png or svg.
+    :type fmt: str
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The QR code image.
+    :rtype: Response
+    """
+    image = await repository_images.get_image(image_id, db)
+    if image is None or not image.edited_image:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="QR code not found")
+    etag = f'"{qr_code_cache.key(image.edited_image, fmt)}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    _, content = await qr_code_cache.get(image.edited_image, fmt)
+    return Response(content=content, media_type=QR_MEDIA_TYPES[fmt], headers=headers)
+
+
 @router.post("/images", response_model=ImageResponse, status_code=status.HTTP_201_CREATED)
 async def create_image(
         image: UploadFile = File(),
         description: str | None = Form(None, description="Add description to your image"),
         tags: str | None = Form(None, description="Add tags to your image"),
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_db),
         current_user: User = Depends(auth_service.get_current_user)
         ):
     """
@@ -98,7 +160,7 @@ async def create_image(
     :param tags: The tags associated with the image.
     :type tags: str
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :param current_user: The current authenticated user.
     :type current_user: User
     :return: The newly created image.
@@ -109,7 +171,7 @@ async def create_image(
 
 
 @router.put("/images/{image_id}", response_model=ImageResponse)
-async def update_image(body: ImageUpdateSchema, image_id: int, db: Session = Depends(get_db),
+async def update_image(body: ImageUpdateSchema, image_id: int, db: AsyncSession = Depends(get_db),
                        current_user: User = Depends(auth_service.get_current_user)
                        ):
     """
@@ -120,7 +182,7 @@ async def update_image(body: ImageUpdateSchema, image_id: int, db: Session = Dep
     :param image_id: The ID of the image to update.
     :type image_id: int
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :param current_user: The current authenticated user.
     :type current_user: User
     :return: The updated image.
@@ -132,31 +194,34 @@ async def update_image(body: ImageUpdateSchema, image_id: int, db: Session = Dep
     return image
 
 
-@router.delete("/images/{image_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def remove_image(image_id: int, db: Session = Depends(get_db),
+@router.delete("/images/{image_id}", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def remove_image(image_id: int, db: AsyncSession = Depends(get_db),
                        current_user: User = Depends(auth_service.get_current_user)
                        ):
     """
-    Removes an image by ID.
+    Removes an image by ID. Its Cloudinary assets are deleted by a background job.
 
     :param image_id: The ID of the image to remove.
     :type image_id: int
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :param current_user: The current authenticated user.
     :type current_user: User
-    :return: The removed image.
-    :rtype: ImageResponse
+    :return: The job deleting the image assets.
+    :rtype: JobResponse
     """
-    image = await repository_images.remove_image(image_id, current_user, db)
-    if image is None:
+    job = await repository_images.remove_image(image_id, current_user, db)
+    if job is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
-    return {"message": f"Image ID:{image_id} successfully deleted."}
+    return job
 
 
-@router.post("/images/{image_id}/transform")
+@router.post("/images/{image_id}/transform", response_model=Union[TransformResponse, JobResponse],
+             status_code=status.HTTP_202_ACCEPTED)
 async def transform_image(
-    image_id: str,
+    image_id: int,
+    response: Response,
+    mode: str = Query("upload", pattern="^(upload|url)$"),
     width: Optional[int] = None,
     height: Optional[int] = None,
     crop: Optional[str] = None,
@@ -165,14 +230,19 @@ async def transform_image(
     fetch_format: Optional[str] = None,
     effect: Optional[str] = None,
     angle: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(auth_service.get_current_user)
 ):
     """
-    Transform an image using Cloudinary and update the edited image URL in the database.
+    Queue a Cloudinary transformation of an image. A background job uploads the transformed image,
+    generates its QR code and updates the edited image URL in the database; poll /api/jobs/{job_id} for the result.
+
+    With mode=url nothing is uploaded: the delivery URL of the transformation is derived locally from the
+    original image and returned right away with status 200.
 
     Parameters:
-    - public_id (str): The public ID of the image in Cloudinary.
+    - image_id (int): The ID of the image to transform.
+    - mode (str): "upload" to queue an upload job, "url" to derive the delivery URL.
     - width (int, optional): The width to resize the image to.
     - height (int, optional): The height to resize the image to.
     - crop (str, optional): The crop mode for the image transformation.
@@ -181,13 +251,13 @@ async def transform_image(
     - fetch_format (str, optional): The fetch format for the image transformation.
     - effect (str, optional): The effect to apply to the image.
     - angle (int, optional): The angle to rotate the image.
-    - db (Session): The SQLAlchemy session object.
+    - db (AsyncSession): The SQLAlchemy session object.
 
     Returns:
-    - str: The URL of the transformed image.
+    - TransformResponse | JobResponse: The transformed image URL, or the queued transform job.
 
     Raises:
-    - HTTPException: If the image is not found in the database or if the image upload to Cloudinary fails.
+    - HTTPException: If the image is not found in the database.
     """
     transformations = {
         "width": width,
@@ -203,6 +273,7 @@ async def transform_image(
     # Remove None values from the transformations dictionary
     transformations = {k: v for k, v in transformations.items() if v is not None}
 
-    transformed_url = await transform_image_url(image_id, db, current_user, **transformations)
-
-    return {"transformed_url": transformed_url}
\ No newline at end of file
+    if mode == "url":
+        response.status_code = status.HTTP_200_OK
+        return {"transformed_url": await transformed_image_url(image_id, db, **transformations)}
+    return await enqueue_transform(image_id, db, current_user, **transformations)
\ No newline at end of file
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException, Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.db import get_db
+from src.models.models import User
+from src.repository import jobs as repository_jobs
+from src.schemas.jobs import JobResponse
+from src.services.auth import auth_service
+
+router = APIRouter(prefix='/jobs', tags=["jobs"])
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, db: AsyncSession = Depends(get_db),
+                  current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Retrieves the status of a background job, and its result once it has finished.
+
+    :param job_id: The ID of the job.
+    :type job_id: str
+    :param db: The database session.
+    :type db: AsyncSession
+    :param current_user: The current authenticated user.
+    :type current_user: User
+    :return: The job.
+    :rtype: JobResponse
+    """
+    job = await repository_jobs.get_job(job_id, current_user, db)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
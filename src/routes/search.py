@@ -0,0 +1,32 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.db import get_db
+from src.repository import search as repository_search
+from src.schemas.pagination import Page
+from src.schemas.search import SearchResult
+
+router = APIRouter(prefix='/search', tags=["search"])
+
+
+@router.get("/", response_model=Page[SearchResult])
+async def search(q: str = Query(..., min_length=1, max_length=200), cursor: Optional[str] = None,
+                 limit: int = Query(20, ge=1, le=100), db: AsyncSession = Depends(get_db)):
+    """
+    Searches image descriptions and comments, best matches first, one page at a time.
+
+    :param q: The words to search for; results contain all of them.
+    :type q: str
+    :param cursor: The next_cursor of the previous page, or None for the first page.
+    :type cursor: str | None
+    :param limit: The maximum number of results to return.
+    :type limit: int
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: A page of results, each an image description or a comment.
+    :rtype: Page[SearchResult]
+    """
+    hits, next_cursor = await repository_search.search(q, cursor, limit, db)
+    return {"items": [hit._asdict() for hit in hits], "next_cursor": next_cursor}
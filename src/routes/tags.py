@@ -1,10 +1,11 @@
-from typing import List
+from typing import List, Optional
 from src.models.models import User,Role
 from src.services.auth import auth_service
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.services.roles import RoleAccess
 from src.database.db import get_db
+from src.schemas.pagination import Page
 from src.schemas.tags import TagModel, TagResponse
 from src.repository import tags as repository_tags
 
@@ -12,33 +13,53 @@ router = APIRouter(prefix='/tags', tags=["tags"])
 
 access_to_route_all = RoleAccess([Role.admin, Role.moderator])
 
-@router.get("/", response_model=List[TagResponse])
-async def read_tags(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+@router.get("/", response_model=Page[TagResponse])
+async def read_tags(cursor: Optional[str] = None, limit: int = Query(100, ge=1, le=100),
+                    db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
     """
-    Retrieves a list of tags with pagination.
+    Retrieves tags, one page at a time.
 
-    :param skip: The number of tags to skip.
-    :type skip: int
+    :param cursor: The next_cursor of the previous page, or None for the first page.
+    :type cursor: str | None
     :param limit: The maximum number of tags to return.
     :type limit: int
     :param db: The database session.
-    :type db: Session
-    :return: A list of tags.
+    :type db: AsyncSession
+    :return: A page of tags.
+    :rtype: Page[TagResponse]
+    """
+    tags, next_cursor = await repository_tags.get_tags(cursor, limit, db, current_user)
+    return {"items": tags, "next_cursor": next_cursor}
+
+
+@router.get("/suggest", response_model=List[TagResponse])
+async def suggest_tags(prefix: str = Query(..., min_length=1, max_length=25), limit: int = Query(10, ge=1, le=50),
+                       db: AsyncSession = Depends(get_db),
+                       current_user: User = Depends(auth_service.get_current_user)):
+    """
+    Suggests tags starting with a prefix, for autocompletion. Served from memory.
+
+    :param prefix: The beginning of the tag name, matched ignoring case.
+    :type prefix: str
+    :param limit: The maximum number of tags to return.
+    :type limit: int
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: The matching tags, in alphabetical order.
     :rtype: List[TagResponse]
     """
-    tags = await repository_tags.get_tags(skip, limit, db, current_user)
-    return tags
+    return await repository_tags.suggest_tags(prefix, limit, db)
 
 
 # @router.get("/{tag_id}", response_model=TagResponse)
-# async def read_tag(tag_id: int, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+# async def read_tag(tag_id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
 #     """
 #     Retrieves a tag by its ID.
 
 #     :param tag_id: The ID of the tag to retrieve.
 #     :type tag_id: int
 #     :param db: The database session.
-#     :type db: Session
+#     :type db: AsyncSession
 #     :return: The tag with the specified ID, or raises a 404 error if not found.
 #     :rtype: TagResponse
 #     """
@@ -49,18 +70,18 @@ async def read_tags(skip: int = 0, limit: int = 100, db: Session = Depends(get_d
 
 
 @router.delete("/{tag_id}", response_model=TagResponse)
-async def remove_tag(tag_id: int, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+async def remove_tag(tag_id: int, db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
     """
     Deletes a tag by its ID.
 
     :param tag_id: The ID of the tag to delete.
     :type tag_id: int
     :param db: The database session.
-    :type db: Session
+    :type db: AsyncSession
     :return: The deleted tag, or raises a 404 error if not found.
     :rtype: TagResponse
     """
-    tag = await repository_tags.remove_tag(tag_id, current_user, db)
+    tag = await repository_tags.remove_tag(tag_id, db, current_user)
     if tag is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found")
 
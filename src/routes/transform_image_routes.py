@@ -1,17 +1,18 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 from src.database.db import get_db
-from src.repository.transform_images import transform_image_url, update_image
+from src.repository.transform_images import enqueue_transform, update_image
+from src.schemas.jobs import JobResponse
 from src.models.models import Image, User
 from src.services.auth import auth_service
 
 router = APIRouter()
 
-@router.post("/transform")
+@router.post("/transform", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
 async def transform_image(
-    image_id: str,
+    image_id: int,
     width: Optional[int] = None,
     height: Optional[int] = None,
     crop: Optional[str] = None,
@@ -20,11 +21,11 @@ async def transform_image(
     fetch_format: Optional[str] = None,
     effect: Optional[str] = None,
     angle: Optional[int] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(auth_service.get_current_user)
 ):
     """
-    Transform an image using Cloudinary and update the edited image URL in the database.
+    Queue a Cloudinary transformation of an image. A background job updates the edited image URL in the database.
 
     Parameters:
     - public_id (str): The public ID of the image in Cloudinary.
@@ -36,13 +37,13 @@ async def transform_image(
     - fetch_format (str, optional): The fetch format for the image transformation.
     - effect (str, optional): The effect to apply to the image.
     - angle (int, optional): The angle to rotate the image.
-    - db (Session): The SQLAlchemy session object.
+    - db (AsyncSession): The SQLAlchemy session object.
 
     Returns:
-    - str: The URL of the transformed image.
+    - JobResponse: The queued transform job.
 
     Raises:
-    - HTTPException: If the image is not found in the database or if the image upload to Cloudinary fails.
+    - HTTPException: If the image is not found in the database.
     """
     transformations = {
         "width": width,
@@ -58,13 +59,11 @@ async def transform_image(
     # Remove None values from the transformations dictionary
     transformations = {k: v for k, v in transformations.items() if v is not None}
 
-    transformed_url = await transform_image_url(image_id, db, current_user, **transformations)
-
-    return {"transformed_url": transformed_url}
+    return await enqueue_transform(image_id, db, current_user, **transformations)
 
 
 @router.put("/update/{image_id}")
-async def edit_image(image_id: int, edited_image_url: str, user_id: int, db: Session = Depends(get_db)):
+async def edit_image(image_id: int, edited_image_url: str, user_id: int, db: AsyncSession = Depends(get_db)):
     """
     Update the edited image URL of an existing image.
 
@@ -72,7 +71,7 @@ async def edit_image(image_id: int, edited_image_url: str, user_id: int, db: Ses
     - image_id (int): The ID of the image to update.
     - edited_image_url (str): The new edited image URL.
     - user_id (int): The ID of the user who owns the image.
-    - db (Session): The SQLAlchemy session object.
+    - db (AsyncSession): The SQLAlchemy session object.
 
     Returns:
     - Image: The updated image object, or None if not found.
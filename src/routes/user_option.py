@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends, status, Security
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 import sys
 from pathlib import Path
@@ -20,7 +20,7 @@ security = HTTPBearer()
 
 
 @router.get("/username", response_model=UserResponse)
-async def get_user_profile(username: str, db: Session = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
+async def get_user_profile(username: str, db: AsyncSession = Depends(get_db), current_user: User = Depends(auth_service.get_current_user)):
     user = repository_users.get_user_by_username(username, db)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -35,4 +35,7 @@ class ImageResponse(ImageBase):
     #comments: Optional[List[CommentResponse]]
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class TransformResponse(BaseModel):
+    transformed_url: str
@@ -0,0 +1,13 @@
+from typing import Optional
+from pydantic import BaseModel
+
+
+class SearchResult(BaseModel):
+    kind: str
+    id: int
+    image_id: Optional[int]
+    text: str
+    rank: float
+
+    class Config:
+        from_attributes = True
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel, Field
 from datetime import datetime
 from pydantic import EmailStr
@@ -67,6 +69,24 @@ class TokenModel(BaseModel):
     token_type: str = "bearer"
     
     
+class LogoutModel(BaseModel):
+    """
+    Pydantic model for a Logout request.
+
+    - refresh_token: The refresh token of the device logging out, revoked along with the access token.
+    """
+    refresh_token: Optional[str] = None
+
+
+class TokenRevokeModel(BaseModel):
+    """
+    Pydantic model for a Token revocation request.
+
+    - token: The access or refresh token to revoke.
+    """
+    token: str
+
+
 class RequestEmail(BaseModel):
     """
     Pydantic model for an Email request.
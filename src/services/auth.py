@@ -8,20 +8,24 @@ authentication-related operations such as password hashing, token creation,
 token decoding, and user retrieval from the database.
 """
 
-import redis
-import pickle
+import secrets
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import Depends, HTTPException
-from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from jose import JWTError, jwt
+from sqlalchemy.ext.asyncio import AsyncSession
+from jose import ExpiredSignatureError, JWTError, jwt
 from starlette import status
 from  src.database.db import get_db
 from src.repository import users as repository_users
 from src.conf.config import settings
 from src.models.models import Role
+from src.services.passwords import password_hasher
+from src.services.refresh_tokens import Rotation, refresh_token_store
+from src.services.revocation import revocation_epochs, revocation_list
+from src.services.token_cache import verified_token_cache
+from src.services.user_snapshot import UserSnapshot, user_cache
 
 
 class Auth:
@@ -31,15 +35,20 @@ class Auth:
     This class provides methods for password hashing, token creation,
     token decoding, and user retrieval from the database.
     """
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    hasher = password_hasher
+    epochs = revocation_epochs
+    revocations = revocation_list
+    token_cache = verified_token_cache
+    refresh_tokens = refresh_token_store
+    stateless = settings.stateless_access_tokens
     SECRET_KEY = settings.secret_key
     ALGORITHM = settings.algorithm
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
-    r = redis.Redis(host=settings.redis_host, port=settings.redis_port, db=0, password=settings.redis_password)
+    cache = user_cache
 
-    def verify_password(self, plain_password, hashed_password):
+    async def verify_password(self, plain_password, hashed_password):
         """
-        Verify a plain password against a hashed password.
+        Verify a plain password against a hashed password in the password hashing pool.
 
         :param plain_password: The plain password to verify.
         :type plain_password: str
@@ -48,18 +57,34 @@ class Auth:
         :return: True if the passwords match, False otherwise.
         :rtype: bool
         """
-        return self.pwd_context.verify(plain_password, hashed_password)
+        return await self.hasher.verify(plain_password, hashed_password)
 
-    def get_password_hash(self, password: str):
+    async def get_password_hash(self, password: str):
         """
-        Hash a password.
+        Hash a password in the password hashing pool.
 
         :param password: The password to hash.
         :type password: str
         :return: The hashed password.
         :rtype: str
         """
-        return self.pwd_context.hash(password)
+        return await self.hasher.hash(password)
+
+    def access_token_data(self, user) -> dict:
+        """
+        The claims identifying a user in a new access token. In stateless mode they also carry
+        the user's id, username, role and confirmed flag, so requests can be authorized without a lookup.
+
+        :param user: The user the token is issued to.
+        :type user: User
+        :return: The data to pass to create_access_token.
+        :rtype: dict
+        """
+        data = {"sub": user.email}
+        if self.stateless:
+            data.update({"uid": user.id, "name": user.username, "role": Role(user.role or Role.user).value,
+                         "confirmed": bool(user.confirmed)})
+        return data
 
     async def create_access_token(self, data: dict, expires_delta: Optional[float] = None):
         """
@@ -76,8 +101,11 @@ class Auth:
         if expires_delta:
             expire = datetime.utcnow() + timedelta(seconds=expires_delta)
         else:
-            expire = datetime.utcnow() + timedelta(minutes=15)
-        to_encode.update({"iat": datetime.utcnow(), "exp": expire, "scope": "access_token"})
+            expire = datetime.utcnow() + timedelta(seconds=settings.access_token_ttl)
+        to_encode.setdefault("jti", secrets.token_hex(16))
+        # iat only has a one second resolution, too coarse to order the token against a role change
+        to_encode.update({"iat": datetime.utcnow(), "iat_ns": time.time_ns(), "exp": expire,
+                          "scope": "access_token"})
         encoded_access_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
         return encoded_access_token
 
@@ -97,40 +125,107 @@ class Auth:
         if expires_delta:
             expire = datetime.utcnow() + timedelta(seconds=expires_delta)
         else:
-            expire = datetime.utcnow() + timedelta(days=7)
+            expire = datetime.utcnow() + timedelta(seconds=settings.refresh_token_ttl)
         to_encode.update({"iat": datetime.utcnow(), "exp": expire, "scope": "refresh_token"})
         encoded_refresh_token = jwt.encode(to_encode, self.SECRET_KEY, algorithm=self.ALGORITHM)
         return encoded_refresh_token
 
-    async def decode_refresh_token(self, refresh_token: str):
+    def decode_refresh_claims(self, refresh_token: str) -> dict:
         """
         Decode a refresh token.
 
         :param refresh_token: The refresh token to decode.
         :type refresh_token: str
-        :return: The email contained in the refresh token.
-        :rtype: str
+        :return: The claims of the refresh token.
+        :rtype: dict
         :raises HTTPException: If the token is invalid or has an invalid scope.
         """
         try:
             payload = jwt.decode(refresh_token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            if payload['scope'] == 'refresh_token':
-                email = payload['sub']
-                return email
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid scope for token')
         except JWTError:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Could not validate credentials')
+        if payload['scope'] != 'refresh_token':
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='Invalid scope for token')
+        return payload
+
+    async def decode_refresh_token(self, refresh_token: str):
+        """
+        Decode a refresh token.
+
+        :param refresh_token: The refresh token to decode.
+        :type refresh_token: str
+        :return: The email contained in the refresh token.
+        :rtype: str
+        :raises HTTPException: If the token is invalid or has an invalid scope.
+        """
+        return self.decode_refresh_claims(refresh_token)['sub']
+
+    async def issue_refresh_token(self, user, db: AsyncSession) -> str:
+        """
+        Start a new token family for a login and return its first refresh token.
+
+        :param user: The user logging in.
+        :type user: User
+        :param db: The database session.
+        :type db: AsyncSession
+        :return: The encoded refresh token.
+        :rtype: str
+        """
+        family_id, jti = secrets.token_hex(16), secrets.token_hex(16)
+        await self.refresh_tokens.create(family_id, user.id, jti, db)
+        return await self.create_refresh_token(data={"sub": user.email, "fid": family_id, "jti": jti})
+
+    async def rotate_refresh_token(self, refresh_token: str, db: AsyncSession) -> tuple[str, str]:
+        """
+        Exchange a refresh token for the next one of its family. Each refresh token can be used once;
+        using it again revokes the family, logging the device out.
 
-    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+        :param refresh_token: The presented refresh token.
+        :type refresh_token: str
+        :param db: The database session.
+        :type db: AsyncSession
+        :return: The email of the user and the new refresh token.
+        :rtype: tuple[str, str]
+        :raises HTTPException: If the token is invalid, expired, revoked or reused.
         """
-        Retrieve the current user from the database using a JWT token.
+        payload = self.decode_refresh_claims(refresh_token)
+        family_id, jti = payload.get("fid"), payload.get("jti")
+        if not family_id or not jti:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+        new_jti = secrets.token_hex(16)
+        if await self.refresh_tokens.rotate(family_id, jti, new_jti, db) != Rotation.rotated:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+        email = payload["sub"]
+        return email, await self.create_refresh_token(data={"sub": email, "fid": family_id, "jti": new_jti})
+
+    def decode_access_token(self, token: str) -> dict:
+        """
+        Decode a token, verifying its signature only the first time it is seen.
+
+        :param token: The JWT token.
+        :type token: str
+        :return: The verified claims.
+        :rtype: dict
+        :raises JWTError: If the token is invalid or expired.
+        """
+        payload = self.token_cache.get(token)
+        if payload is None:
+            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            self.token_cache.set(token, payload)
+        return payload
+
+    async def get_current_user(self, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+        """
+        Retrieve the current user from the database using a JWT token. Revoked tokens are rejected.
+        In stateless mode, tokens carrying user claims are trusted unless a role change revoked them,
+        and the user is not looked up at all.
 
         :param token: The JWT token.
         :type token: str
         :param db: The database session.
-        :type db: Session
-        :return: The current user.
-        :rtype: UserDB
+        :type db: AsyncSession
+        :return: A snapshot of the current user, cached in memory and in Redis.
+        :rtype: UserSnapshot
         :raises HTTPException: If the token is invalid or has an invalid scope.
         """
         credentials_exception = HTTPException(
@@ -141,7 +236,7 @@ class Auth:
 
         try:
             # Decode JWT
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            payload = self.decode_access_token(token)
             if payload['scope'] == 'access_token':
                 email = payload["sub"]
                 if email is None:
@@ -150,17 +245,64 @@ class Auth:
                 raise credentials_exception
         except JWTError as e:
             raise credentials_exception
-        user = self.r.get(f"user:{email}")
-        if user is None:
-            user = await repository_users.get_user_by_email(email, db)
-            if user is None:
+        if await self.revocations.is_revoked(payload.get("jti")):
+            raise credentials_exception
+        if self.stateless and "uid" in payload:
+            issued_at = payload.get("iat_ns", payload["iat"] * 1_000_000_000)
+            if await self.epochs.is_revoked(payload["uid"], issued_at):
                 raise credentials_exception
-            self.r.set(f"user:{email}", pickle.dumps(user))
-            self.r.expire(f"user:{email}", 900)
-        else:
-            user = pickle.loads(user)
+            return UserSnapshot.from_claims(payload)
+        user = await self.load_user(email, db)
+        if user is None:
+            raise credentials_exception
+        return user
+
+    async def load_user(self, email: str, db: AsyncSession) -> Optional[UserSnapshot]:
+        """
+        Retrieve a snapshot of a user from the cache, or from the database on a miss.
+
+        :param email: The email of the user.
+        :type email: str
+        :param db: The database session.
+        :type db: AsyncSession
+        :return: A snapshot of the user, or None if the user does not exist.
+        :rtype: UserSnapshot | None
+        """
+        user = await self.cache.get(email)
+        if user is None:
+            db_user = await repository_users.get_user_by_email(email, db)
+            if db_user is None:
+                return None
+            user = UserSnapshot.from_user(db_user)
+            await self.cache.set(email, user)
         return user
     
+    async def revoke_token(self, token: str, user, db: AsyncSession) -> None:
+        """
+        Revoke an access token until it expires, or the token family of a refresh token.
+        Users can revoke their own tokens, admins anyone's.
+
+        :param token: The token to revoke.
+        :type token: str
+        :param user: The user revoking the token.
+        :type user: UserSnapshot
+        :param db: The database session.
+        :type db: AsyncSession
+        :raises HTTPException: If the token is invalid or belongs to another user.
+        """
+        try:
+            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+        except ExpiredSignatureError:
+            return
+        except JWTError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid token")
+        if payload.get("sub") != user.email and user.role != Role.admin:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Operation forbidden")
+        if payload.get("scope") == "access_token" and payload.get("jti"):
+            await self.revocations.revoke(payload["jti"], payload["exp"])
+        elif payload.get("scope") == "refresh_token" and payload.get("fid"):
+            await self.refresh_tokens.revoke(payload["fid"], db)
+
     def create_email_token(self, data: dict):
         """
         Create a new email token.
@@ -196,7 +338,7 @@ class Auth:
                                 detail="Invalid token for email verification")
 
 
-    async def change_user_role(self, admin_email: str, user_email: str, new_role: str, db: Session = Depends(get_db)):
+    async def change_user_role(self, admin_email: str, user_email: str, new_role: str, db: AsyncSession = Depends(get_db)):
         """
         The change_user_role function is used to change the role of a user.
             Only an admin can change the role of a user.
@@ -209,7 +351,7 @@ class Auth:
         :param admin_email: str: Identify the admin user
         :param user_email: str: Get the user's email from the request body
         :param new_role: str: Set the new role for the user
-        :param db: Session: Get the database session
+        :param db: AsyncSession: Get the database session
         :return: A dict with a message
         """
         admin = await repository_users.get_user_by_email(admin_email, db)
@@ -223,9 +365,6 @@ class Auth:
         user.role = new_role
         await repository_users.update_user_role(user.email, user.role, db)
 
-        self.r.set(f"user:{user.email}", pickle.dumps(user))
-        self.r.expire(f"user:{user.email}", 900)
-
         return {"message": "Role updated successfully"}
     
 auth_service = Auth()
\ No newline at end of file
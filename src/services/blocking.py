@@ -0,0 +1,190 @@
+#src.services.blocking.py
+
+"""
+Event Loop Blocking Monitor Module.
+
+A heartbeat task sleeps for a fixed interval and measures how late the loop wakes it
+up: that scheduler delay is the time other code held the loop. A watchdog thread
+checks the heartbeat; when it has been stalled for longer than the threshold, the
+loop thread is still inside the blocking call, so the thread captures its stack
+together with the task and the route it serves. The episode is logged and kept for
+GET /api/debug/blocking once the loop recovers and its full duration is known.
+
+The monitor is opt-in with the loop_monitor_enabled setting.
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.conf.config import settings
+from src.database.instrumentation import route_name
+from src.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+STACK_LIMIT = 40
+
+# The scope of the request each task is serving, recorded by RequestTaskMiddleware
+request_scopes: Dict[asyncio.Task, Scope] = {}
+
+event_loop_lag = metrics.histogram(
+    "event_loop_lag_seconds", "How late the event loop ran a timer, i.e. how long it was blocked",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+
+
+class LoopMonitor:
+    """
+    Event loop lag monitor capturing the stacks of blocking calls.
+    """
+
+    def __init__(self, threshold: float = settings.loop_block_threshold, max_events: int = 100,
+                 scopes: Dict[asyncio.Task, Scope] = request_scopes):
+        """
+        :param threshold: How long in seconds the loop may be blocked before the blocking call is captured.
+        :type threshold: float
+        :param max_events: How many blocking episodes are kept, the oldest being dropped first.
+        :type max_events: int
+        :param scopes: The request scopes by task, to name the route of a blocking task.
+        :type scopes: Dict[asyncio.Task, Scope]
+        """
+        self.threshold = threshold
+        self.interval = threshold / 2
+        self.events: Deque[dict] = deque(maxlen=max_events)
+        self.blocked = 0
+        self.max_lag = 0.0
+        self.scopes = scopes
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = 0.0
+        self._episode: Optional[dict] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        """
+        Start the heartbeat on the running loop and the watchdog thread.
+        """
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._thread.join(timeout=1)
+        self._thread = None
+
+    async def _heartbeat(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - expected, 0.0)
+            self._last_beat = time.monotonic()
+            event_loop_lag.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            episode, self._episode = self._episode, None
+            if episode is not None:
+                self.finish(episode, lag)
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval):
+            stalled = time.monotonic() - self._last_beat - self.interval
+            if stalled > self.threshold and self._episode is None:
+                self._episode = self.capture(stalled)
+
+    def capture(self, stalled: float) -> dict:
+        """
+        Describe what the loop thread is running, from the watchdog thread.
+
+        :param stalled: How long in seconds the loop has been blocked so far.
+        :type stalled: float
+        :return: The task, route and stack of the blocking call.
+        :rtype: dict
+        """
+        frame = sys._current_frames().get(self._loop_thread_id)
+        task = asyncio.current_task(self._loop)
+        scope = self.scopes.get(task)
+        return {
+            "detected_at": time.time(),
+            "stalled": stalled,
+            "task": task.get_name() if task is not None else None,
+            "route": route_name(scope) if scope is not None else None,
+            "stack": traceback.format_stack(frame, limit=STACK_LIMIT) if frame is not None else [],
+        }
+
+    def finish(self, episode: dict, duration: float) -> None:
+        episode["duration"] = duration
+        self.blocked += 1
+        self.events.append(episode)
+        logger.warning("Event loop blocked for %.3f s in %s (%s):\n%s", duration, episode["route"] or "no request",
+                       episode["task"], "".join(episode["stack"]))
+
+    def stats(self) -> dict:
+        """
+        Loop lag metrics.
+
+        :return: The number of blocking episodes and the largest lag seen, in seconds.
+        :rtype: dict
+        """
+        return {"blocked": self.blocked, "max_lag_seconds": self.max_lag}
+
+    def report(self) -> dict:
+        """
+        :return: The settings and metrics of the monitor, and the captured episodes, latest first.
+        :rtype: dict
+        """
+        return {"running": self.running, "threshold": self.threshold, **self.stats(),
+                "events": list(reversed(self.events))}
+
+
+class RequestTaskMiddleware:
+    """
+    ASGI middleware recording which request each task serves, so that the loop monitor and the
+    sampling profiler can tell the route of the code they catch running.
+    """
+
+    def __init__(self, app: ASGIApp, scopes: Dict[asyncio.Task, Scope] = request_scopes):
+        self.app = app
+        self.scopes = scopes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        task = asyncio.current_task()
+        self.scopes[task] = scope
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.scopes.pop(task, None)
+
+
+loop_monitor = LoopMonitor()
+metrics.add_stats("event_loop", loop_monitor.stats)
@@ -0,0 +1,425 @@
+#src.services.cache.py
+
+"""
+Cache Service Module.
+
+This module owns the application's single async Redis connection pool. The
+pooled client is shared by rate limiting, authentication and the QR code
+cache, and RedisCache wraps it with round-trip-friendly helpers: atomic
+set-with-TTL, MGET and pipelined bulk writes. Cache errors are logged and
+treated as misses, so a Redis outage slows requests down instead of failing them.
+
+TieredCache puts a per-worker LocalCache in front of Redis for hot entities,
+and InvalidationListener keeps the local tiers of all workers coherent through
+Redis pub/sub.
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, List, Mapping, Optional, Tuple
+
+import msgpack
+import redis.asyncio as redis
+from redis.asyncio.client import Pipeline
+from redis.exceptions import RedisError
+from sqlalchemy import inspect as sa_inspect
+
+from src.conf.config import settings
+from src.services.metrics import metrics, redis_command_duration
+
+logger = logging.getLogger(__name__)
+
+class TimedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        with redis_command_duration.time("PIPELINE"):
+            return await super().execute(raise_on_error)
+
+
+class TimedRedis(redis.Redis):
+    """
+    Redis client observing the latency of every command, and of every pipeline as one call.
+    """
+
+    async def execute_command(self, *args, **options):
+        with redis_command_duration.time(str(args[0])):
+            return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> Pipeline:
+        return TimedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+redis_pool = redis.ConnectionPool(host=settings.redis_host, port=settings.redis_port, db=0,
+                                  password=settings.redis_password, max_connections=settings.redis_max_connections,
+                                  socket_connect_timeout=1)
+redis_client = TimedRedis(connection_pool=redis_pool)
+
+
+class RedisCache:
+    """
+    Thin async cache over a Redis client.
+
+    Every method costs one network round trip, however many keys it touches.
+    """
+
+    def __init__(self, client: Optional[redis.Redis] = None):
+        """
+        :param client: The Redis client, or None to disable caching.
+        :type client: redis.Redis | None
+        """
+        self.client = client
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """
+        Read a value.
+
+        :param key: The cache key.
+        :type key: str
+        :return: The cached value, or None on a miss or a Redis error.
+        :rtype: bytes | None
+        """
+        if self.client is None:
+            return None
+        try:
+            return await self.client.get(key)
+        except RedisError as e:
+            logger.warning("Cache read of %s failed: %r", key, e)
+            return None
+
+    async def get_many(self, keys: Iterable[str]) -> List[Optional[bytes]]:
+        """
+        Read several values with one MGET.
+
+        :param keys: The cache keys.
+        :type keys: Iterable[str]
+        :return: The cached values in key order, None for misses.
+        :rtype: List[bytes | None]
+        """
+        keys = list(keys)
+        if self.client is None or not keys:
+            return [None] * len(keys)
+        try:
+            return await self.client.mget(keys)
+        except RedisError as e:
+            logger.warning("Cache read of %d keys failed: %r", len(keys), e)
+            return [None] * len(keys)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        """
+        Write a value and its expiry atomically with SET EX.
+
+        :param key: The cache key.
+        :type key: str
+        :param value: The value to store.
+        :type value: bytes
+        :param ttl: The time to live in seconds, or None to keep the value until it is evicted.
+        :type ttl: int | None
+        """
+        if self.client is None:
+            return
+        try:
+            await self.client.set(key, value, ex=ttl)
+        except RedisError as e:
+            logger.warning("Cache write of %s failed: %r", key, e)
+
+    async def set_many(self, items: Mapping[str, bytes], ttl: Optional[int] = None) -> None:
+        """
+        Write several values, each with its own expiry, in one pipelined round trip.
+
+        :param items: The values to store by key.
+        :type items: Mapping[str, bytes]
+        :param ttl: The time to live in seconds, or None to keep the values until they are evicted.
+        :type ttl: int | None
+        """
+        if self.client is None or not items:
+            return
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key, value in items.items():
+                    pipe.set(key, value, ex=ttl)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning("Cache write of %d keys failed: %r", len(items), e)
+
+    async def delete(self, *keys: str) -> None:
+        """
+        Remove values.
+
+        :param keys: The cache keys.
+        :type keys: str
+        """
+        if self.client is None or not keys:
+            return
+        try:
+            await self.client.delete(*keys)
+        except RedisError as e:
+            logger.warning("Cache delete of %d keys failed: %r", len(keys), e)
+
+
+cache = RedisCache(redis_client)
+
+
+async def close_redis() -> None:
+    """
+    Close the shared Redis client and disconnect every pooled connection.
+    """
+    await redis_client.aclose()
+    await redis_pool.disconnect()
+
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+class LocalCache:
+    """
+    Per-worker LRU with a time to live.
+
+    Values are shared between requests as they are, so they must be treated as immutable.
+    The TTL bounds staleness if an invalidation message is ever lost.
+    """
+
+    def __init__(self, max_entries: int = settings.local_cache_size, ttl: float = settings.local_cache_ttl):
+        """
+        :param max_entries: How many values the cache holds.
+        :type max_entries: int
+        :param ttl: How long in seconds a value is served before it is reloaded.
+        :type ttl: float
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> Any:
+        """
+        :param key: The cache key.
+        :type key: str
+        :return: The cached value, or None on a miss.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+local_cache = LocalCache()
+
+
+class TieredCache:
+    """
+    Two-tier cache for one kind of entity: the per-worker LocalCache in front of Redis.
+
+    Hits in the local tier cost no network hop at all. Invalidations delete the Redis copy
+    and are published on INVALIDATION_CHANNEL, so every worker drops its local copy.
+    """
+
+    def __init__(self, prefix: str, dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any],
+                 ttl: int = settings.entity_cache_ttl, local: LocalCache = local_cache,
+                 remote: Optional[RedisCache] = None):
+        """
+        :param prefix: The key prefix of the entity, including a schema version, e.g. image:v1:
+        :type prefix: str
+        :param dumps: Encodes a value for Redis.
+        :type dumps: Callable[[Any], bytes]
+        :param loads: Decodes a value from Redis, returning None for data it does not understand.
+        :type loads: Callable[[bytes], Any]
+        :param ttl: How long in seconds a value is kept in Redis.
+        :type ttl: int
+        :param local: The in-process tier.
+        :type local: LocalCache
+        :param remote: The Redis tier, the shared cache by default.
+        :type remote: RedisCache | None
+        """
+        self.prefix = prefix
+        self.dumps = dumps
+        self.loads = loads
+        self.ttl = ttl
+        self.local = local
+        self.remote = remote or cache
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+
+    def key(self, key: Any) -> str:
+        return f"{self.prefix}{key}"
+
+    def stats(self) -> dict:
+        """
+        Hit/miss metrics.
+
+        :return: The hits of each tier, the misses, and the hit ratio.
+        :rtype: dict
+        """
+        lookups = self.local_hits + self.remote_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "remote_hits": self.remote_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.local_hits + self.remote_hits) / lookups if lookups else 0.0,
+        }
+
+    async def get(self, key: Any) -> Any:
+        """
+        Read a value from the local tier, falling back to Redis.
+
+        :param key: The entity key, e.g. its ID.
+        :return: The cached value, or None on a miss.
+        """
+        full_key = self.key(key)
+        value = self.local.get(full_key)
+        if value is not None:
+            self.local_hits += 1
+            return value
+        data = await self.remote.get(full_key)
+        value = self.loads(data) if data is not None else None
+        if value is None:
+            self.misses += 1
+        else:
+            self.remote_hits += 1
+            self.local.set(full_key, value)
+        return value
+
+    async def set(self, key: Any, value: Any) -> None:
+        """
+        Store a freshly loaded value in both tiers.
+
+        :param key: The entity key.
+        :param value: The value.
+        """
+        full_key = self.key(key)
+        self.local.set(full_key, value)
+        await self.remote.set(full_key, self.dumps(value), ttl=self.ttl)
+
+    async def invalidate(self, *keys: Any) -> None:
+        """
+        Drop values from Redis and from the local tier of every worker. Call it after the change is committed.
+
+        :param keys: The entity keys.
+        """
+        full_keys = [self.key(key) for key in keys]
+        for full_key in full_keys:
+            self.local.pop(full_key)
+        await self.remote.delete(*full_keys)
+        await publish_invalidation(*full_keys)
+
+
+async def publish_invalidation(*keys: str) -> None:
+    """
+    Tell every worker to drop keys from its local tier, in one pipelined round trip.
+
+    :param keys: The full cache keys.
+    :type keys: str
+    """
+    if not keys:
+        return
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.publish(INVALIDATION_CHANNEL, key)
+            await pipe.execute()
+    except RedisError as e:
+        logger.warning("Cache invalidation of %d keys failed: %r", len(keys), e)
+
+
+class InvalidationListener:
+    """
+    Background task that applies invalidations published by other workers to the local tier.
+
+    The local tier is cleared whenever the subscription is (re)established, because messages
+    published while this worker was disconnected are lost. Other per-worker structures can
+    register handlers, which get every message key, and None when everything may be stale.
+    """
+
+    def __init__(self, client: redis.Redis = redis_client, local: LocalCache = local_cache,
+                 retry_delay: float = 1.0):
+        self.client = client
+        self.local = local
+        self.retry_delay = retry_delay
+        self.handlers: List[Callable[[Optional[str]], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def add_handler(self, handler: Callable[[Optional[str]], None]) -> None:
+        self.handlers.append(handler)
+
+    def _reset(self) -> None:
+        self.local.clear()
+        for handler in self.handlers:
+            handler(None)
+
+    def _apply(self, key: str) -> None:
+        self.local.pop(key)
+        for handler in self.handlers:
+            handler(key)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with self.client.pubsub() as pubsub:
+                    await pubsub.subscribe(INVALIDATION_CHANNEL)
+                    self._reset()
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            key = message["data"]
+                            self._apply(key.decode() if isinstance(key, bytes) else key)
+            except (RedisError, OSError) as e:
+                logger.warning("Cache invalidation listener disconnected: %r", e)
+                self._reset()
+                await asyncio.sleep(self.retry_delay)
+
+
+invalidation_listener = InvalidationListener()
+
+
+class ModelCodec:
+    """
+    Encodes the column values of an ORM entity as a versioned msgpack array.
+
+    Decoded entities are transient, not attached to any session, and meant for reading only.
+    Column values must be msgpack types.
+    """
+
+    def __init__(self, model: type, version: int = 1):
+        self.model = model
+        self.version = version
+        self.columns = [attr.key for attr in sa_inspect(model).column_attrs]
+
+    def dumps(self, entity: Any) -> bytes:
+        return msgpack.packb([self.version, *(getattr(entity, column) for column in self.columns)])
+
+    def loads(self, data: bytes) -> Any:
+        try:
+            version, *values = msgpack.unpackb(data)
+        except (msgpack.UnpackException, ValueError, TypeError):
+            return None
+        if version != self.version or len(values) != len(self.columns):
+            return None
+        return self.model(**dict(zip(self.columns, values)))
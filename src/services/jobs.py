@@ -0,0 +1,107 @@
+#src.services.jobs.py
+
+"""
+Job Worker Module.
+
+This module runs the background jobs queued in the jobs table: Cloudinary transforms,
+QR code generation and asset deletion. A worker process runs a pool of concurrent
+workers, each claiming one job at a time:
+
+    python -m src.services.jobs
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+from typing import Awaitable, Callable, Dict
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from src.conf.config import settings
+from src.database.db import AsyncSessionLocal
+from src.repository import images as repository_images
+from src.repository import jobs as repository_jobs
+from src.repository import transform_images as repository_transform
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[dict, AsyncSession], Awaitable[dict | None]]
+
+JOB_HANDLERS: Dict[str, JobHandler] = {
+    repository_transform.TRANSFORM_JOB: repository_transform.run_transform_job,
+    repository_images.DESTROY_ASSETS_JOB: repository_images.destroy_image_assets,
+}
+
+
+async def run_next_job(db: AsyncSession) -> bool:
+    """
+    Claim and run a single job.
+
+    :param db: The database session.
+    :type db: AsyncSession
+    :return: True if a job was run, False if the queue was empty.
+    :rtype: bool
+    """
+    job = await repository_jobs.claim_job(db)
+    if job is None:
+        return False
+    handler = JOB_HANDLERS.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"No handler for job kind '{job.kind}'")
+        result = await handler(job.payload, db)
+    except Exception as e:
+        logger.exception("Job %s (%s) failed on attempt %s", job.id, job.kind, job.attempts)
+        await db.rollback()
+        await db.refresh(job)
+        await repository_jobs.fail_job(job, repr(e), db)
+    else:
+        await repository_jobs.complete_job(job, result, db)
+    return True
+
+
+async def worker(stop: asyncio.Event,
+                 session_factory: async_sessionmaker = AsyncSessionLocal,
+                 poll_interval: float = settings.job_poll_interval) -> None:
+    """
+    Run jobs until stop is set, sleeping for poll_interval whenever the queue is empty.
+
+    :param stop: The event that asks the worker to finish.
+    :type stop: asyncio.Event
+    :param session_factory: The factory for database sessions.
+    :type session_factory: async_sessionmaker
+    :param poll_interval: The delay in seconds between polls of an empty queue.
+    :type poll_interval: float
+    """
+    while not stop.is_set():
+        async with session_factory() as db:
+            ran = await run_next_job(db)
+        if not ran:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def run_workers(concurrency: int = settings.job_worker_concurrency) -> None:
+    """
+    Run a pool of workers until the process receives SIGINT or SIGTERM.
+
+    :param concurrency: The number of jobs run at the same time.
+    :type concurrency: int
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    logger.info("Starting %s job workers", concurrency)
+    await asyncio.gather(*(worker(stop) for _ in range(concurrency)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the background job workers.")
+    parser.add_argument("--concurrency", type=int, default=settings.job_worker_concurrency)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_workers(args.concurrency))
@@ -0,0 +1,208 @@
+#src.services.metrics.py
+
+"""
+Metrics Module.
+
+Histograms and gauges in the Prometheus text format, served at /metrics by
+MetricsMiddleware. Recording a value is a dict lookup and a few integer additions,
+with no locks: every instrumented call runs on the worker's event loop thread. Values
+that already exist elsewhere, such as cache hit counts or connection pool usage, are
+not copied into metrics but read from their owners when /metrics is scraped.
+"""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.database.instrumentation import route_path
+
+METRICS_PATH = "/metrics"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Upper bounds in seconds, from a local Redis call to a slow Cloudinary upload
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+               for value in labels.values())
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + "}"
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Observed values counted in buckets per label combination, with their sum and count.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # Per label combination: the count of each bucket, of +Inf last, then the sum
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        counts = self._values.get(labels)
+        if counts is None:
+            counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """
+        Observe the duration of a block, whether it succeeds or raises.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, counts in self._values.items():
+            base = dict(zip(self.labelnames, labels))
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**base, "le": format_value(float(bound))}, cumulative
+            yield f"{self.name}_sum", base, counts[-1]
+            yield f"{self.name}_count", base, cumulative
+
+
+class Collector:
+    """
+    Gauges read from a callback at scrape time.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, collect: Callable[[], Iterable[Sample]]):
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+
+    def samples(self) -> Iterable[Sample]:
+        return self.collect()
+
+
+class MetricsRegistry:
+    """
+    The metrics of one worker, rendered in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self.metrics: List = []
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def collector(self, name: str, documentation: str, collect: Callable[[], Iterable[Sample]]) -> Collector:
+        return self.register(Collector(name, documentation, collect))
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_stats(self, prefix: str, stats: Callable[[], dict], **labels: str) -> None:
+        """
+        Expose the numeric values of a stats() method as gauges named <prefix>_<key>.
+
+        :param prefix: The metric name prefix, e.g. cache.
+        :type prefix: str
+        :param stats: The method returning the current values by key.
+        :type stats: Callable[[], dict]
+        :param labels: Labels identifying the source, e.g. cache="user".
+        """
+        def collect():
+            for key, value in stats().items():
+                if isinstance(value, (int, float)):
+                    yield f"{prefix}_{key}", labels, value
+
+        self.collector(prefix, f"{prefix} statistics", collect)
+
+    def render(self) -> str:
+        """
+        :return: Every metric in the Prometheus text format, version 0.0.4.
+        :rtype: str
+        """
+        # Samples of one family must be contiguous, and gauges of several collectors may share a name
+        families: Dict[str, List[str]] = {}
+        for metric in self.metrics:
+            for name, labels, value in metric.samples():
+                family = name if metric.kind == "gauge" else metric.name
+                lines = families.get(family)
+                if lines is None:
+                    lines = families[family] = [f"# HELP {family} {metric.documentation}",
+                                                f"# TYPE {family} {metric.kind}"]
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+        return "".join(line + "\n" for lines in families.values() for line in lines)
+
+
+metrics = MetricsRegistry()
+
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status"))
+db_pool_checkout_wait = metrics.histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a database connection from the pool")
+redis_command_duration = metrics.histogram(
+    "redis_command_duration_seconds", "Redis command latency, pipelines counted as one call", ("command",))
+cloudinary_request_duration = metrics.histogram(
+    "cloudinary_request_duration_seconds", "Cloudinary API call latency, retries included", ("operation",))
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request by route and status, and serving /metrics.
+    """
+
+    def __init__(self, app: ASGIApp, registry: Optional[MetricsRegistry] = None,
+                 histogram: Optional[Histogram] = None):
+        self.app = app
+        self.registry = registry or metrics
+        self.histogram = histogram or http_request_duration
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if scope["path"] == METRICS_PATH:
+            await self.serve(send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.histogram.observe(time.perf_counter() - started, scope["method"], route_path(scope),
+                                   str(status_code))
+
+    async def serve(self, send: Send) -> None:
+        body = self.registry.render().encode()
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", CONTENT_TYPE.encode()),
+                                (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,173 @@
+#src.services.passwords.py
+
+"""
+Password Hashing Service Module.
+
+This module contains the PasswordHasher class, which runs bcrypt off the event
+loop in a bounded thread pool (bcrypt releases the GIL while it hashes), so a
+burst of logins no longer freezes every other request. When the pool and its
+queue are full, new requests are rejected right away with 503 instead of
+piling up behind each other.
+"""
+
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+from starlette import status
+
+from src.conf.config import settings
+from src.services.metrics import metrics
+
+
+class PasswordHasher:
+    """
+    Bounded, non-blocking bcrypt hasher.
+
+    At most max_workers hashes run at once and at most max_queue more wait for a worker.
+    A hash holds its slot until its thread is done with it, even if the request awaiting it is cancelled.
+    Hashes made with a different cost than the configured one are reported by needs_rehash.
+    """
+
+    def __init__(self,
+                 rounds: int = settings.bcrypt_rounds,
+                 max_workers: int = settings.password_hash_workers,
+                 max_queue: int = settings.password_hash_queue,
+                 retry_after: int = 1):
+        """
+        :param rounds: The bcrypt cost factor of new hashes.
+        :type rounds: int
+        :param max_workers: How many hashes run at the same time.
+        :type max_workers: int
+        :param max_queue: How many hashes may wait for a worker before new ones are rejected.
+        :type max_queue: int
+        :param retry_after: The Retry-After value in seconds sent with 503 responses.
+        :type retry_after: int
+        """
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__default_rounds=rounds,
+                                    bcrypt__min_rounds=rounds, bcrypt__max_rounds=rounds)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def stats(self) -> dict:
+        """
+        Queue-depth metrics.
+
+        :return: Running and queued hashes, and the totals of completed, failed and rejected ones.
+        :rtype: dict
+        """
+        return {
+            "running": min(self.in_flight, self.max_workers),
+            "queued": max(self.in_flight - self.max_workers, 0),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+    async def _run(self, func, *args):
+        if self.in_flight >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Too many authentication requests, try again later",
+                                headers={"Retry-After": str(self.retry_after)})
+        loop = asyncio.get_running_loop()
+        future = self.executor.submit(func, *args)
+        self.in_flight += 1
+        # Added before wrap_future's callback, so the slot is released before the awaiting coroutine resumes
+        future.add_done_callback(lambda done: self._call_soon(loop, self._release, done))
+        return await asyncio.wrap_future(future, loop=loop)
+
+    @staticmethod
+    def _call_soon(loop: asyncio.AbstractEventLoop, callback, *args) -> None:
+        # Done callbacks run in the worker thread; the counters are only touched on the loop
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # The loop is closed
+
+    def _release(self, future: Future) -> None:
+        self.in_flight -= 1
+        if future.cancelled() or future.exception() is not None:
+            self.failed += 1
+        else:
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password with the configured cost.
+
+        :param password: The plain password.
+        :type password: str
+        :return: The bcrypt hash.
+        :rtype: str
+        :raises HTTPException: 503 if the hashing queue is full.
+        """
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """
+        Check a password against a hash.
+
+        :param password: The plain password.
+        :type password: str
+        :param hashed_password: The stored hash.
+        :type hashed_password: str
+        :return: True if the password matches.
+        :rtype: bool
+        :raises HTTPException: 503 if the hashing queue is full.
+        """
+        return await self._run(self.context.verify, password, hashed_password)
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """
+        :param hashed_password: The stored hash.
+        :type hashed_password: str
+        :return: True if the hash was made with another cost or scheme than the configured one.
+        :rtype: bool
+        """
+        return self.context.needs_update(hashed_password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Check a password and, if it matches a hash made with an outdated cost, hash it again.
+
+        :param password: The plain password.
+        :type password: str
+        :param hashed_password: The stored hash.
+        :type hashed_password: str
+        :return: Whether the password matches, and the new hash to store or None.
+        :rtype: Tuple[bool, str | None]
+        :raises HTTPException: 503 if the hashing queue is full.
+        """
+        if not await self.verify(password, hashed_password):
+            return False, None
+        if self.needs_rehash(hashed_password):
+            return True, await self.hash(password)
+        return True, None
+
+    def shutdown(self) -> None:
+        """
+        Stop the worker threads.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
+metrics.add_stats("password_hash", password_hasher.stats)
@@ -0,0 +1,135 @@
+#src.services.profiler.py
+
+"""
+Sampling Profiler Module.
+
+Profiles a running worker on demand, without restarting it: for a few seconds a thread
+reads the stack of the event loop thread every few milliseconds with
+sys._current_frames(), which costs the loop nothing but the GIL handoffs. Each sample
+is attributed to the route of the task the loop is running, so a profile can be limited
+to one endpoint. Samples are counted in the collapsed stack format of flamegraph.pl,
+speedscope and similar tools: one line per distinct stack, frames from the root down
+separated by semicolons, then the number of samples.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+from starlette import status
+from starlette.types import Scope
+
+from src.conf.config import settings
+from src.database.instrumentation import route_name, route_path
+from src.services.blocking import request_scopes
+
+
+def frame_name(frame) -> str:
+    code = frame.f_code
+    # co_qualname is new in Python 3.11
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse(frame, root: str) -> str:
+    """
+    :param frame: The innermost frame of a stack.
+    :param root: The name of the root frame, e.g. the route.
+    :type root: str
+    :return: The stack in the collapsed format, from the root down.
+    :rtype: str
+    """
+    names: List[str] = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    names.append(root)
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler of the event loop thread, and optionally of the other threads.
+    """
+
+    def __init__(self, interval: float = settings.profiler_interval,
+                 scopes: Dict[asyncio.Task, Scope] = request_scopes):
+        """
+        :param interval: The time in seconds between samples.
+        :type interval: float
+        :param scopes: The request scopes by task, to attribute samples to routes.
+        :type scopes: Dict[asyncio.Task, Scope]
+        """
+        self.interval = interval
+        self.scopes = scopes
+        self.running = False
+
+    async def profile(self, seconds: float, route: Optional[str] = None, all_threads: bool = False) -> Counter:
+        """
+        Sample the stacks of this worker for a while.
+
+        :param seconds: How long to sample.
+        :type seconds: float
+        :param route: Only keep samples of requests to this route, given as its path template,
+            e.g. /api/images/{image_id}; None keeps every sample, including those outside requests.
+        :type route: str | None
+        :param all_threads: Also sample the other threads, e.g. the thread pool running sync endpoints and
+            password hashes; their samples are not attributed to routes.
+        :type all_threads: bool
+        :return: The number of samples of each collapsed stack.
+        :rtype: Counter
+        :raises HTTPException: If a profile is already running in this worker.
+        """
+        if self.running:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="A profile is already running")
+        self.running = True
+        stacks: Counter = Counter()
+        stopped = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample, name="profiler",
+            args=(asyncio.get_running_loop(), threading.get_ident(), route, all_threads, stacks, stopped),
+            daemon=True)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stopped.set()
+            await asyncio.to_thread(sampler.join)
+            self.running = False
+        return stacks
+
+    def _sample(self, loop: asyncio.AbstractEventLoop, loop_thread_id: int, route: Optional[str],
+                all_threads: bool, stacks: Counter, stopped: threading.Event) -> None:
+        sampler_thread_id = threading.get_ident()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not stopped.wait(self.interval):
+            frames = sys._current_frames()
+            frame = frames.get(loop_thread_id)
+            scope = self.scopes.get(asyncio.current_task(loop))
+            if frame is not None and (route is None or (scope is not None and route_path(scope) == route)):
+                stacks[collapse(frame, route_name(scope) if scope is not None else "no request")] += 1
+            if not all_threads:
+                continue
+            for thread_id, frame in frames.items():
+                if thread_id in (loop_thread_id, sampler_thread_id):
+                    continue
+                if thread_id not in thread_names:
+                    thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stacks[collapse(frame, f"thread {thread_names.get(thread_id, thread_id)}")] += 1
+
+
+def render_collapsed(stacks: Counter) -> str:
+    """
+    :param stacks: The number of samples of each collapsed stack.
+    :type stacks: Counter
+    :return: The profile in the collapsed stack format, most sampled stacks first.
+    :rtype: str
+    """
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+sampling_profiler = SamplingProfiler()
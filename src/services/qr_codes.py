@@ -0,0 +1,162 @@
+#src.services.qr_codes.py
+
+"""
+QR Code Service Module.
+
+This module renders QR codes into memory buffers and caches them by a hash of
+their content: first in a per-worker LRU, then in Redis. QR codes are served
+straight from the cache, so they are never written to disk or uploaded to Cloudinary.
+"""
+
+import asyncio
+import hashlib
+import io
+import logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import qrcode
+import redis.asyncio as redis
+from qrcode.image.pure import PyPNGImage
+from qrcode.image.svg import SvgPathImage
+from redis.exceptions import RedisError
+
+from src.conf.config import settings
+from src.services.cache import redis_client
+from src.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+QR_MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def render_qr_code(data: str, fmt: str = "png") -> bytes:
+    """
+    Render a QR code into memory.
+
+    :param data: The data to encode, usually an image URL.
+    :type data: str
+    :param fmt: The output format, png or svg.
+    :type fmt: str
+    :return: The encoded image.
+    :rtype: bytes
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    buffer = io.BytesIO()
+    image_factory = SvgPathImage if fmt == "svg" else PyPNGImage
+    qr.make_image(image_factory=image_factory).save(buffer)
+    return buffer.getvalue()
+
+
+class QRCodeCache:
+    """
+    Content-addressed QR code cache.
+
+    Rendered codes are keyed by a SHA-256 of their format and data, kept in an
+    in-process LRU and shared between workers through Redis. Redis errors are
+    logged and treated as misses, so QR codes keep working without it.
+    """
+
+    def __init__(self, redis_client: Optional[redis.Redis] = None,
+                 max_entries: int = settings.qr_cache_size,
+                 ttl: int = settings.qr_cache_ttl):
+        """
+        :param redis_client: The Redis client for the shared tier, or None to use only the LRU.
+        :type redis_client: redis.Redis | None
+        :param max_entries: How many codes the in-process LRU holds.
+        :type max_entries: int
+        :param ttl: How long in seconds a code is kept in Redis.
+        :type ttl: int
+        """
+        self.redis = redis_client
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lru: OrderedDict[str, bytes] = OrderedDict()
+        self.local_hits = 0
+        self.remote_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(data: str, fmt: str) -> str:
+        """
+        The content address of a QR code, also used as its ETag.
+
+        :param data: The encoded data.
+        :type data: str
+        :param fmt: The output format.
+        :type fmt: str
+        :return: The hex SHA-256 digest.
+        :rtype: str
+        """
+        return hashlib.sha256(f"{fmt}:{data}".encode()).hexdigest()
+
+    def _remember(self, key: str, content: bytes) -> None:
+        self._lru[key] = content
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def get(self, data: str, fmt: str = "png") -> Tuple[str, bytes]:
+        """
+        Return a QR code from the cache, rendering and storing it on a miss.
+
+        :param data: The data to encode.
+        :type data: str
+        :param fmt: The output format, png or svg.
+        :type fmt: str
+        :return: The content address and the encoded image.
+        :rtype: Tuple[str, bytes]
+        """
+        key = self.key(data, fmt)
+        content = self._lru.get(key)
+        if content is not None:
+            self.local_hits += 1
+            self._lru.move_to_end(key)
+            return key, content
+
+        if self.redis is not None:
+            try:
+                content = await self.redis.get(f"qr:{key}")
+            except RedisError as e:
+                logger.warning("QR cache read failed: %r", e)
+
+        if content is None:
+            self.misses += 1
+            content = await asyncio.to_thread(render_qr_code, data, fmt)
+            if self.redis is not None:
+                try:
+                    await self.redis.set(f"qr:{key}", content, ex=self.ttl)
+                except RedisError as e:
+                    logger.warning("QR cache write failed: %r", e)
+        else:
+            self.remote_hits += 1
+
+        self._remember(key, content)
+        return key, content
+
+    def stats(self) -> dict:
+        """
+        Hit/miss metrics.
+
+        :return: The hits of the LRU and of Redis, the renders, and the hit ratio.
+        :rtype: dict
+        """
+        lookups = self.local_hits + self.remote_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "remote_hits": self.remote_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.local_hits + self.remote_hits) / lookups if lookups else 0.0,
+        }
+
+
+qr_code_cache = QRCodeCache(redis_client)
+metrics.add_stats("cache", qr_code_cache.stats, cache="qr_code")
@@ -0,0 +1,139 @@
+#src.services.refresh_tokens.py
+
+"""
+Refresh Token Store Module.
+
+Every login starts a token family: one per device, identified by the fid claim of
+its refresh tokens. The store only remembers the jti of the family's current token,
+under a Redis key that expires with it. Refreshing swaps that jti in a single atomic
+script call; presenting a token that was already rotated means it leaked, so the
+whole family is revoked.
+
+While Redis is unavailable, families are kept in the refresh_token_families table
+instead, and moved back to Redis the next time they are rotated.
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.conf.config import settings
+from src.repository import refresh_tokens as repository_refresh_tokens
+from src.repository.refresh_tokens import Rotation
+from src.services.cache import redis_client
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1]: the family key; ARGV: presented jti, new jti, ttl
+ROTATE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if not current then
+    return 0
+end
+if current == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    return 1
+end
+redis.call('DEL', KEYS[1])
+return -1
+"""
+
+
+class RefreshTokenStore:
+    """
+    Refresh token families in Redis, with a database fallback.
+    """
+    prefix = "auth:refresh:"
+
+    def __init__(self, client: redis.Redis = redis_client, ttl: int = settings.refresh_token_ttl):
+        """
+        :param client: The Redis client.
+        :type client: redis.Redis
+        :param ttl: How long in seconds a family lives after its last rotation.
+        :type ttl: int
+        """
+        self.client = client
+        self.ttl = ttl
+        self._rotate = client.register_script(ROTATE_SCRIPT)
+
+    def key(self, family_id: str) -> str:
+        return f"{self.prefix}{family_id}"
+
+    def _expires_at(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=self.ttl)
+
+    async def create(self, family_id: str, user_id: int, jti: str, db: AsyncSession) -> None:
+        """
+        Start a new family.
+
+        :param family_id: The ID of the family.
+        :type family_id: str
+        :param user_id: The ID of the user the family belongs to.
+        :type user_id: int
+        :param jti: The ID of the family's first refresh token.
+        :type jti: str
+        :param db: The database session, used if Redis is unavailable.
+        :type db: AsyncSession
+        """
+        try:
+            await self.client.set(self.key(family_id), jti, ex=self.ttl)
+        except RedisError as e:
+            logger.warning("Storing refresh token family in Redis failed, using the database: %r", e)
+            await repository_refresh_tokens.create_family(family_id, user_id, jti, self._expires_at(), db)
+
+    async def rotate(self, family_id: str, jti: str, new_jti: str, db: AsyncSession) -> Rotation:
+        """
+        Replace the current token of a family, if the presented token is the current one.
+
+        :param family_id: The ID of the family.
+        :type family_id: str
+        :param jti: The ID of the presented refresh token.
+        :type jti: str
+        :param new_jti: The ID of the refresh token replacing it.
+        :type new_jti: str
+        :param db: The database session, used for families stored while Redis was unavailable.
+        :type db: AsyncSession
+        :return: rotated on success, reused if the token was already rotated and the family is now revoked,
+            unknown if the family expired or was revoked.
+        :rtype: Rotation
+        """
+        key = self.key(family_id)
+        try:
+            result = Rotation(await self._rotate(keys=[key], args=[jti, new_jti, self.ttl]))
+        except RedisError as e:
+            logger.warning("Rotating refresh token family in Redis failed, using the database: %r", e)
+            return await repository_refresh_tokens.rotate_family(family_id, jti, new_jti, self._expires_at(), db)
+        if result != Rotation.unknown:
+            return result
+
+        # The family may have been started while Redis was down
+        result = await repository_refresh_tokens.rotate_family(family_id, jti, new_jti, self._expires_at(), db)
+        if result == Rotation.rotated:
+            try:
+                await self.client.set(key, new_jti, ex=self.ttl)
+            except RedisError:
+                pass
+            else:
+                await repository_refresh_tokens.delete_family(family_id, db)
+        return result
+
+    async def revoke(self, family_id: str, db: AsyncSession) -> None:
+        """
+        Revoke a family, e.g. when its device logs out.
+
+        :param family_id: The ID of the family.
+        :type family_id: str
+        :param db: The database session.
+        :type db: AsyncSession
+        """
+        try:
+            await self.client.delete(self.key(family_id))
+        except RedisError as e:
+            logger.warning("Revoking refresh token family in Redis failed: %r", e)
+        await repository_refresh_tokens.delete_family(family_id, db)
+
+
+refresh_token_store = RefreshTokenStore()
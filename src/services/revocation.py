@@ -0,0 +1,272 @@
+#src.services.revocation.py
+
+"""
+Token Revocation Module.
+
+Stateless access tokens carry the user's role, so a role change has to make the
+tokens issued before it stale. RevocationEpochs keeps one epoch per user: the
+time of the last change, in nanoseconds. Tokens issued up to their user's epoch are
+rejected. They are compared by their iat_ns claim: with the one second resolution of
+iat, a token issued earlier in the same second as the change would get through.
+Epochs are served from the per-worker local cache, so the check costs no network
+hop, and bumping an epoch is broadcast to every worker through cache invalidation.
+
+Single access tokens, e.g. on logout, are revoked by their jti. RevocationList
+keeps the revoked jtis in a Redis sorted set scored by token expiry, and every
+worker mirrors the set into a BloomFilter kept current through pub/sub. Checking
+a token is one in-memory lookup; Redis is only asked about possible matches.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import logging
+import math
+import time
+from typing import Optional
+
+import redis.asyncio as redis
+from fastapi import HTTPException
+from redis.exceptions import RedisError
+from starlette import status
+
+from src.conf.config import settings
+from src.services.cache import LocalCache, RedisCache, cache, local_cache, publish_invalidation, redis_client
+
+logger = logging.getLogger(__name__)
+
+
+class RevocationEpochs:
+    """
+    Per-user revocation epochs, stored in Redis and mirrored in the local cache.
+
+    An epoch only needs to outlive the tokens it revokes, so it expires from Redis after
+    the access token lifetime. If Redis is unavailable, epochs read as 0 and claims are trusted
+    until the tokens expire.
+    """
+    prefix = "auth:epoch:"
+
+    def __init__(self, local: LocalCache = local_cache, remote: RedisCache = cache,
+                 ttl: int = settings.access_token_ttl):
+        """
+        :param local: The in-process tier.
+        :type local: LocalCache
+        :param remote: The Redis tier.
+        :type remote: RedisCache
+        :param ttl: How long in seconds an epoch is kept, at least the lifetime of an access token.
+        :type ttl: int
+        """
+        self.local = local
+        self.remote = remote
+        self.ttl = ttl
+
+    def key(self, user_id: int) -> str:
+        return f"{self.prefix}{user_id}"
+
+    async def get(self, user_id: int) -> int:
+        """
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :return: The Unix time in nanoseconds up to which the user's access tokens are revoked, 0 if none are.
+        :rtype: int
+        """
+        key = self.key(user_id)
+        epoch = self.local.get(key)
+        if epoch is None:
+            data = await self.remote.get(key)
+            epoch = int(data) if data else 0
+            self.local.set(key, epoch)
+        return epoch
+
+    async def bump(self, user_id: int) -> int:
+        """
+        Revoke every access token issued to the user until now.
+
+        :param user_id: The ID of the user.
+        :type user_id: int
+        :return: The new epoch, in nanoseconds.
+        :rtype: int
+        """
+        key = self.key(user_id)
+        epoch = time.time_ns()
+        await self.remote.set(key, str(epoch).encode(), ttl=self.ttl)
+        self.local.set(key, epoch)
+        await publish_invalidation(key)
+        return epoch
+
+    async def is_revoked(self, user_id: int, issued_at: int) -> bool:
+        """
+        :param user_id: The ID of the user the token was issued to.
+        :type user_id: int
+        :param issued_at: The issue time of the token in nanoseconds, its iat_ns claim.
+        :type issued_at: int
+        :return: True if the token was issued up to the user's epoch.
+        :rtype: bool
+        """
+        return issued_at <= await self.get(user_id)
+
+
+revocation_epochs = RevocationEpochs()
+
+
+class BloomFilter:
+    """
+    Set membership with no false negatives and a bounded false positive rate.
+
+    Items cannot be removed; the filter is rebuilt instead.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        """
+        :param capacity: How many items the filter holds at the given error rate.
+        :type capacity: int
+        :param error_rate: The false positive rate once the filter holds capacity items.
+        :type error_rate: float
+        """
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+REVOCATION_CHANNEL = "auth:revoked"
+
+
+class RevocationList:
+    """
+    Revoked access token IDs, stored in Redis and mirrored in a per-worker Bloom filter.
+
+    A background task adds jtis published by other workers to the filter, and rebuilds it
+    from Redis on every (re)subscription and every rebuild_interval seconds, which drops
+    expired tokens. If Redis is unavailable, possible matches are trusted until the tokens expire.
+    """
+    key = "auth:revoked"
+
+    def __init__(self, client: redis.Redis = redis_client,
+                 capacity: int = settings.revocation_filter_capacity,
+                 error_rate: float = settings.revocation_filter_error_rate,
+                 rebuild_interval: float = settings.access_token_ttl, retry_delay: float = 1.0):
+        """
+        :param client: The Redis client.
+        :type client: redis.Redis
+        :param capacity: How many revoked tokens the filter is sized for.
+        :type capacity: int
+        :param error_rate: The false positive rate at capacity; each false positive costs one Redis lookup.
+        :type error_rate: float
+        :param rebuild_interval: How often in seconds the filter is rebuilt from Redis.
+        :type rebuild_interval: float
+        :param retry_delay: The delay in seconds before resubscribing after a disconnect.
+        :type retry_delay: float
+        """
+        self.client = client
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rebuild_interval = rebuild_interval
+        self.retry_delay = retry_delay
+        self.filter = BloomFilter(capacity, error_rate)
+        self._task: Optional[asyncio.Task] = None
+
+    async def revoke(self, jti: str, expires_at: int) -> None:
+        """
+        Revoke an access token until it expires.
+
+        :param jti: The ID of the token.
+        :type jti: str
+        :param expires_at: The exp claim of the token.
+        :type expires_at: int
+        :raises HTTPException: If the revocation could not be stored.
+        """
+        now = time.time()
+        if expires_at <= now:
+            return
+        self.filter.add(jti)
+        try:
+            async with self.client.pipeline(transaction=True) as pipe:
+                pipe.zremrangebyscore(self.key, "-inf", now)
+                pipe.zadd(self.key, {jti: expires_at})
+                pipe.publish(REVOCATION_CHANNEL, jti)
+                await pipe.execute()
+        except RedisError as e:
+            logger.error("Revoking token %s failed: %r", jti, e)
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                                detail="Token revocation is unavailable")
+
+    async def is_revoked(self, jti: Optional[str]) -> bool:
+        """
+        :param jti: The ID of the token, None for tokens issued without one.
+        :type jti: str | None
+        :return: True if the token was revoked.
+        :rtype: bool
+        """
+        if jti is None or jti not in self.filter:
+            return False
+        try:
+            expires_at = await self.client.zscore(self.key, jti)
+        except RedisError as e:
+            logger.warning("Revocation lookup of %s failed: %r", jti, e)
+            return False
+        return expires_at is not None and expires_at > time.time()
+
+    async def rebuild(self) -> None:
+        """
+        Replace the filter with one holding the unexpired revocations stored in Redis.
+        """
+        now = time.time()
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.zremrangebyscore(self.key, "-inf", now)
+            pipe.zrange(self.key, 0, -1)
+            _, members = await pipe.execute()
+        bloom = BloomFilter(max(self.capacity, len(members)), self.error_rate)
+        for member in members:
+            bloom.add(member.decode() if isinstance(member, bytes) else member)
+        self.filter = bloom
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with self.client.pubsub() as pubsub:
+                    # Subscribe before rebuilding, so revocations made meanwhile are queued, not lost
+                    await pubsub.subscribe(REVOCATION_CHANNEL)
+                    await self.rebuild()
+                    rebuilt_at = time.monotonic()
+                    while True:
+                        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                        if message is not None and message["type"] == "message":
+                            jti = message["data"]
+                            self.filter.add(jti.decode() if isinstance(jti, bytes) else jti)
+                        if time.monotonic() - rebuilt_at >= self.rebuild_interval:
+                            await self.rebuild()
+                            rebuilt_at = time.monotonic()
+            except (RedisError, OSError) as e:
+                logger.warning("Revocation listener disconnected: %r", e)
+                await asyncio.sleep(self.retry_delay)
+
+
+revocation_list = RevocationList()
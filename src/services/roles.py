@@ -10,7 +10,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
 
 from src.models.models import Role, User
-from src.services.auth import Auth
+from src.services.auth import auth_service
 
 
 class RoleAccess:
@@ -25,21 +25,21 @@ class RoleAccess:
         """
         self.allowed_roles = allowed_roles
 
-    async def __call__(self, request: Request, user: User = Depends(Auth.get_current_user)):
+    async def __call__(self, request: Request, user: User = Depends(auth_service.get_current_user)):
         """
         The __call__ function is the function that will be called when a user tries to access an endpoint.
         It takes in two arguments: request and user. The request argument is the Request object, which contains all of 
         the information about the HTTP request (headers, body, etc.). The user argument is a User object that we get from 
-        calling Auth.get_current_user(). This function returns nothing.
+        calling auth_service.get_current_user(), so with stateless access tokens the check runs from the token claims.
         
         :param self: Refer to the current instance of a class
         :param request: Request: Access the request object
         :param user: User: Get the user object from the request
         :return: The user object
         """
-        print(user.role, self.allowed_roles)
         if user.role not in self.allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="FORBIDDEN"
-            )
\ No newline at end of file
+            )
+        return user
\ No newline at end of file
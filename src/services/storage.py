@@ -0,0 +1,251 @@
+#src.services.storage.py
+
+"""
+Storage Service Module.
+
+This module contains the StorageClient class, a non-blocking client for the
+Cloudinary Upload and Admin APIs. Requests go through one pooled keep-alive
+httpx.AsyncClient, so uploads and deletions never block the event loop.
+"""
+
+import asyncio
+import re
+from typing import Iterable, List, Optional
+
+import httpx
+from cloudinary import utils as cloudinary_utils
+from fastapi import HTTPException
+from starlette import status
+
+from src.conf.config import settings
+from src.services.metrics import cloudinary_request_duration
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+BULK_DESTROY_LIMIT = 100
+DELIVERY_URL_PATTERN = re.compile(r"/upload/(?:v(?P<version>\d+)/)?(?P<public_id>.+?)(?:\.(?P<format>[^./]+))?$")
+
+
+def parse_delivery_url(url: str) -> dict | None:
+    """
+    Split a Cloudinary delivery URL into its public ID, version and format.
+
+    :param url: The delivery URL, e.g. https://res.cloudinary.com/demo/image/upload/v1/Images/user/id.png
+    :type url: str
+    :return: The public_id, version and format parts, or None if the URL is not a Cloudinary upload.
+    :rtype: dict | None
+    """
+    match = DELIVERY_URL_PATTERN.search(url)
+    return match.groupdict() if match else None
+
+
+def public_id_from_url(url: str) -> str | None:
+    """
+    Extract the public ID, including its folders, from a Cloudinary delivery URL.
+
+    :param url: The delivery URL, e.g. https://res.cloudinary.com/demo/image/upload/v1/Images/user/id.png
+    :type url: str
+    :return: The public ID, e.g. Images/user/id, or None if the URL is not a Cloudinary upload.
+    :rtype: str | None
+    """
+    parts = parse_delivery_url(url)
+    return parts["public_id"] if parts else None
+
+
+class StorageClient:
+    """
+    Async Cloudinary client.
+
+    This class provides coroutines to upload, destroy and bulk-destroy assets.
+    Every request has a timeout and is retried with exponential backoff on
+    transport errors and retryable HTTP statuses.
+    """
+
+    def __init__(self,
+                 cloud_name: str = settings.cloudinary_name,
+                 api_key: str = settings.cloudinary_api_key,
+                 api_secret: str = settings.cloudinary_api_secret,
+                 upload_prefix: str = settings.cloudinary_upload_prefix,
+                 timeout: float = settings.cloudinary_timeout,
+                 max_retries: int = settings.cloudinary_max_retries,
+                 backoff: float = 0.2,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        :param cloud_name: The name of the Cloudinary account.
+        :type cloud_name: str
+        :param api_key: The API key for Cloudinary.
+        :type api_key: str
+        :param api_secret: The API secret for Cloudinary.
+        :type api_secret: str
+        :param upload_prefix: The base URL of the Cloudinary API.
+        :type upload_prefix: str
+        :param timeout: The timeout in seconds for a single request.
+        :type timeout: float
+        :param max_retries: How many times a failed request is retried.
+        :type max_retries: int
+        :param backoff: The delay in seconds before the first retry, doubled on every attempt.
+        :type backoff: float
+        :param transport: An optional httpx transport, used to talk to a fake server in tests.
+        :type transport: httpx.AsyncBaseTransport | None
+        """
+        self.cloud_name = cloud_name
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.upload_prefix = upload_prefix
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        The shared HTTP client, created on first use.
+
+        :return: The pooled keep-alive HTTP client.
+        :rtype: httpx.AsyncClient
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30),
+                transport=self.transport,
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """
+        Close the HTTP client and release its pooled connections.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _options(self) -> dict:
+        return {
+            "cloud_name": self.cloud_name,
+            "api_key": self.api_key,
+            "api_secret": self.api_secret,
+            "upload_prefix": self.upload_prefix,
+        }
+
+    def _signed_form(self, params: dict) -> dict:
+        """
+        Sign Upload API parameters and encode them the way the Cloudinary SDK does.
+
+        :param params: The request parameters.
+        :type params: dict
+        :return: The signed form fields.
+        :rtype: dict
+        """
+        params = cloudinary_utils.sign_request(params, self._options())
+        form = {}
+        for key, value in params.items():
+            if isinstance(value, list):
+                form[f"{key}[]"] = value
+            elif value:
+                form[key] = value
+        return form
+
+    async def _request(self, method: str, url: str, **kwargs) -> dict:
+        """
+        Send a request, retrying transport errors and retryable statuses.
+
+        :param method: The HTTP method.
+        :type method: str
+        :param url: The request URL.
+        :type url: str
+        :return: The decoded JSON response.
+        :rtype: dict
+        :raises HTTPException: If the request keeps failing or Cloudinary returns an error.
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                error = repr(e)
+            else:
+                if response.status_code not in RETRY_STATUS_CODES:
+                    break
+                error = f"HTTP {response.status_code}"
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+        else:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY,
+                                detail=f"Cloudinary request failed: {error}")
+
+        try:
+            result = response.json()
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY,
+                                detail=f"Invalid Cloudinary response ({response.status_code})")
+        if "error" in result:
+            raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=result["error"]["message"])
+        return result
+
+    async def upload(self, file: bytes | str, **options) -> dict:
+        """
+        Upload an asset.
+
+        :param file: The file content, or a remote URL for Cloudinary to fetch.
+        :type file: bytes | str
+        :param options: Upload API options such as public_id, overwrite, invalidate or transformation.
+        :return: The Cloudinary upload result, including url and secure_url.
+        :rtype: dict
+        """
+        form = self._signed_form(cloudinary_utils.build_upload_params(**options))
+        files = None
+        if isinstance(file, str):
+            form["file"] = file
+        else:
+            files = {"file": (options.get("filename", "file"), file)}
+        url = cloudinary_utils.cloudinary_api_url("upload", **self._options())
+        with cloudinary_request_duration.time("upload"):
+            return await self._request("POST", url, data=form, files=files)
+
+    async def destroy(self, public_id: str, **options) -> dict:
+        """
+        Delete a single asset.
+
+        :param public_id: The public ID of the asset.
+        :type public_id: str
+        :param options: Destroy options such as invalidate or type.
+        :return: The Cloudinary destroy result.
+        :rtype: dict
+        """
+        params = {
+            "timestamp": cloudinary_utils.now(),
+            "type": options.get("type"),
+            "invalidate": options.get("invalidate"),
+            "public_id": public_id,
+        }
+        url = cloudinary_utils.cloudinary_api_url("destroy", **self._options())
+        with cloudinary_request_duration.time("destroy"):
+            return await self._request("POST", url, data=self._signed_form(params))
+
+    async def destroy_many(self, public_ids: Iterable[str]) -> dict:
+        """
+        Delete several assets with the Admin API, up to 100 public IDs per request.
+
+        :param public_ids: The public IDs of the assets.
+        :type public_ids: Iterable[str]
+        :return: The merged mapping of public ID to deletion status.
+        :rtype: dict
+        """
+        public_ids: List[str] = list(public_ids)
+        if not public_ids:
+            return {"deleted": {}}
+        url = cloudinary_utils.base_api_url(["resources", "image", "upload"], **self._options())
+        chunks = [public_ids[i:i + BULK_DESTROY_LIMIT] for i in range(0, len(public_ids), BULK_DESTROY_LIMIT)]
+        with cloudinary_request_duration.time("destroy_many"):
+            results = await asyncio.gather(*(
+                self._request("DELETE", url, params={"public_ids[]": chunk}, auth=(self.api_key, self.api_secret))
+                for chunk in chunks
+            ))
+        deleted = {}
+        for result in results:
+            deleted.update(result.get("deleted", {}))
+        return {"deleted": deleted}
+
+
+storage_client = StorageClient()
@@ -0,0 +1,97 @@
+#src.services.token_cache.py
+
+"""
+Verified Token Cache Module.
+
+Clients send the same access token many times during its lifetime. This module
+contains the VerifiedTokenCache class, which remembers the claims of tokens whose
+signature was already verified, keyed by a SHA-256 of the token, until the token
+expires. Repeat requests skip signature verification and claim parsing.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from src.conf.config import settings
+from src.services.metrics import metrics
+
+
+class VerifiedTokenCache:
+    """
+    Bounded per-worker LRU of verified token claims.
+
+    Entries are dropped once their exp claim passes, so the cache never accepts an expired
+    token. It replaces only the signature check: revocation checks still run on every request.
+    """
+
+    def __init__(self, max_entries: int = settings.token_cache_size):
+        """
+        :param max_entries: How many tokens the cache holds.
+        :type max_entries: int
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[bytes, Tuple[float, dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """
+        :param token: The encoded token.
+        :type token: str
+        :return: The verified claims, or None if the token is not cached or has expired.
+        :rtype: dict | None
+        """
+        key = self.key(token)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= time.time():
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, token: str, claims: dict) -> None:
+        """
+        Remember the claims of a verified token. Tokens without an exp claim are not cached.
+
+        :param token: The encoded token.
+        :type token: str
+        :param claims: The verified claims.
+        :type claims: dict
+        """
+        expires_at = claims.get("exp")
+        if not isinstance(expires_at, (int, float)):
+            return
+        key = self.key(token)
+        self._entries[key] = (expires_at, claims)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """
+        Hit/miss metrics.
+
+        :return: The number of hits, misses and cached tokens, and the hit ratio.
+        :rtype: dict
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+verified_token_cache = VerifiedTokenCache()
+metrics.add_stats("cache", verified_token_cache.stats, cache="verified_token")
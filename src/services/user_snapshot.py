@@ -0,0 +1,108 @@
+#src.services.user_snapshot.py
+
+"""
+User Snapshot Module.
+
+This module contains the UserSnapshot class, the immutable view of a user that
+authentication caches in Redis and hands to route handlers. It holds only the
+fields handlers need, never the password hash, and is encoded as a versioned
+msgpack array, so it is cheap to decode and safe to share between workers
+running different code versions. Snapshots are cached in both tiers of user_cache.
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+import msgpack
+
+from src.models.models import Role, User
+from src.services.cache import TieredCache
+from src.services.metrics import metrics
+
+SNAPSHOT_VERSION = 1
+CACHE_PREFIX = f"user:v{SNAPSHOT_VERSION}:"
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """
+    Immutable, slotted snapshot of an authenticated user.
+    """
+    id: int
+    email: str
+    username: Optional[str]
+    role: Role
+    confirmed: bool
+    avatar: Optional[str]
+
+    @staticmethod
+    def key(email: str) -> str:
+        """
+        The Redis key of a user's snapshot. It includes the schema version, so workers running
+        different versions keep separate entries instead of evicting each other's.
+
+        :param email: The email of the user.
+        :type email: str
+        :return: The Redis key.
+        :rtype: str
+        """
+        return f"{CACHE_PREFIX}{email}"
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        """
+        Take a snapshot of a user loaded from the database.
+
+        :param user: The user.
+        :type user: User
+        :return: The snapshot.
+        :rtype: UserSnapshot
+        """
+        return cls(id=user.id, email=user.email, username=user.username, role=Role(user.role or Role.user),
+                   confirmed=bool(user.confirmed), avatar=user.avatar)
+
+    @classmethod
+    def from_claims(cls, claims: dict) -> "UserSnapshot":
+        """
+        Build a snapshot from the claims of a stateless access token. Tokens do not carry the avatar.
+
+        :param claims: The decoded token claims.
+        :type claims: dict
+        :return: The snapshot.
+        :rtype: UserSnapshot
+        """
+        return cls(id=claims["uid"], email=claims["sub"], username=claims.get("name"), role=Role(claims["role"]),
+                   confirmed=claims["confirmed"], avatar=None)
+
+    def dumps(self) -> bytes:
+        """
+        Encode the snapshot.
+
+        :return: The msgpack array [version, id, email, username, role, confirmed, avatar].
+        :rtype: bytes
+        """
+        return msgpack.packb((SNAPSHOT_VERSION, self.id, self.email, self.username,
+                              self.role.value, self.confirmed, self.avatar))
+
+    @classmethod
+    def loads(cls, data: bytes) -> Optional["UserSnapshot"]:
+        """
+        Decode a snapshot created by dumps.
+
+        :param data: The encoded snapshot.
+        :type data: bytes
+        :return: The snapshot, or None if the data is malformed or has another schema version.
+        :rtype: UserSnapshot | None
+        """
+        try:
+            version, *fields = msgpack.unpackb(data)
+            if version != SNAPSHOT_VERSION:
+                return None
+            id, email, username, role, confirmed, avatar = fields
+            return cls(id=id, email=email, username=username, role=Role(role), confirmed=confirmed, avatar=avatar)
+        except (msgpack.UnpackException, ValueError, TypeError):
+            return None
+
+
+user_cache = TieredCache(CACHE_PREFIX, UserSnapshot.dumps, UserSnapshot.loads, ttl=900)
+metrics.add_stats("cache", user_cache.stats, cache="user")
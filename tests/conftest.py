@@ -1,12 +1,18 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
 from main import app
 from src.models.models import Base
-from src.database.db import get_db
+from src.database.db import get_db, async_database_url
+from src.database.instrumentation import sql_instrumentation
 from src.services.auth import auth_service
+from src.repository.search_index import search_index
+from src.repository.tag_dictionary import tag_dictionary
+from src.services.cache import local_cache
 
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -16,6 +22,13 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
+# TestClient runs every request on a fresh event loop, so pooled aiosqlite connections can't be reused
+async_engine = create_async_engine(async_database_url(SQLALCHEMY_DATABASE_URL), poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+# Requests repeating a statement, e.g. a lazy load per row, fail the tests instead of logging a warning
+sql_instrumentation.attach(async_engine)
+sql_instrumentation.strict = True
+
 
 @pytest.fixture(scope="module", autouse=True)
 def session():
@@ -23,6 +36,10 @@ def session():
 
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    # IDs are reused after the tables are recreated, so entities cached by other modules are stale
+    local_cache.clear()
+    tag_dictionary.clear()
+    search_index.clear()
 
     db = TestingSessionLocal()
     try:
@@ -35,11 +52,9 @@ def session():
 def client(session):
     # Dependency override
 
-    def override_get_db():
-        try:
-            yield session
-        finally:
-            session.close()
+    async def override_get_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
 
     app.dependency_overrides[get_db] = override_get_db
 
@@ -0,0 +1,114 @@
+"""
+Fake Cloudinary server.
+
+An in-memory implementation of the Cloudinary endpoints used by StorageClient
+(upload, destroy and Admin API bulk delete), so the client can be tested and
+benchmarked offline. It checks request signatures and can inject latency and
+transient failures.
+
+Run it standalone and point the application at it with CLOUDINARY_UPLOAD_PREFIX:
+
+    uvicorn tests.fake_cloudinary:app --port 9000
+"""
+
+import asyncio
+import base64
+import itertools
+
+import uvicorn
+from cloudinary.utils import api_sign_request
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+class FakeCloudinary:
+    def __init__(self, api_key: str = "test", api_secret: str = "secret", latency: float = 0.0):
+        """
+        :param api_key: The API key the server accepts.
+        :type api_key: str
+        :param api_secret: The API secret used to check signatures.
+        :type api_secret: str
+        :param latency: The delay in seconds added to every response.
+        :type latency: float
+        """
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.latency = latency
+        self.fail_next = 0
+        self.requests = 0
+        self.resources: dict[str, dict] = {}
+        self._versions = itertools.count(1)
+        self.app = FastAPI()
+        self.app.add_api_route("/v1_1/{cloud_name}/image/upload", self.upload, methods=["POST"])
+        self.app.add_api_route("/v1_1/{cloud_name}/image/destroy", self.destroy, methods=["POST"])
+        self.app.add_api_route("/v1_1/{cloud_name}/resources/image/upload", self.delete_resources, methods=["DELETE"])
+
+    async def _before(self) -> JSONResponse | None:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail_next:
+            self.fail_next -= 1
+            return JSONResponse({"error": {"message": "Service unavailable"}}, status_code=503)
+        return None
+
+    def _check_signature(self, form: dict) -> bool:
+        params = {k: v for k, v in form.items() if k not in ("file", "api_key", "signature")}
+        return (form.get("api_key") == self.api_key
+                and form.get("signature") == api_sign_request(params, self.api_secret))
+
+    def _check_basic_auth(self, request: Request) -> bool:
+        expected = base64.b64encode(f"{self.api_key}:{self.api_secret}".encode()).decode()
+        return request.headers.get("authorization") == f"Basic {expected}"
+
+    async def upload(self, cloud_name: str, request: Request):
+        failure = await self._before()
+        if failure:
+            return failure
+        form = await request.form()
+        fields = {k: v for k, v in form.items()}
+        if not self._check_signature(fields):
+            return JSONResponse({"error": {"message": "Invalid Signature"}}, status_code=401)
+        file = fields.get("file")
+        size = len(await file.read()) if hasattr(file, "read") else 0
+        public_id = fields.get("public_id") or f"fake_{len(self.resources) + 1}"
+        version = next(self._versions)
+        path = f"res.cloudinary.com/{cloud_name}/image/upload/v{version}/{public_id}.png"
+        resource = {
+            "public_id": public_id,
+            "version": version,
+            "bytes": size,
+            "transformation": fields.get("transformation"),
+            "url": f"http://{path}",
+            "secure_url": f"https://{path}",
+        }
+        self.resources[public_id] = resource
+        return resource
+
+    async def destroy(self, cloud_name: str, request: Request):
+        failure = await self._before()
+        if failure:
+            return failure
+        fields = {k: v for k, v in (await request.form()).items()}
+        if not self._check_signature(fields):
+            return JSONResponse({"error": {"message": "Invalid Signature"}}, status_code=401)
+        found = self.resources.pop(fields.get("public_id"), None)
+        return {"result": "ok" if found else "not found"}
+
+    async def delete_resources(self, cloud_name: str, request: Request):
+        failure = await self._before()
+        if failure:
+            return failure
+        if not self._check_basic_auth(request):
+            return JSONResponse({"error": {"message": "Invalid credentials"}}, status_code=401)
+        public_ids = request.query_params.getlist("public_ids[]")
+        deleted = {pid: "deleted" if self.resources.pop(pid, None) else "not_found" for pid in public_ids}
+        return {"deleted": deleted}
+
+
+fake_cloudinary = FakeCloudinary()
+app = fake_cloudinary.app
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=9000)
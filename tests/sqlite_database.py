@@ -0,0 +1,36 @@
+"""A test case running against a fresh in-memory SQLite database and recording the statements it executes."""
+
+import unittest
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.models.models import Base
+
+
+class SQLiteTestCase(unittest.IsolatedAsyncioTestCase):
+    """
+    Creates every table, runs seed, then records the statements of the test in self.statements.
+    """
+
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+        await self.seed()
+        self.statements = []
+        event.listen(self.engine.sync_engine, "before_cursor_execute", self.record)
+
+    async def asyncTearDown(self):
+        event.remove(self.engine.sync_engine, "before_cursor_execute", self.record)
+        await self.engine.dispose()
+
+    async def seed(self):
+        """
+        Fill the database before statements are recorded.
+        """
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
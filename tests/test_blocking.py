@@ -0,0 +1,65 @@
+import asyncio
+import time
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.services.blocking import LoopMonitor, RequestTaskMiddleware
+
+
+def block(seconds):
+    time.sleep(seconds)
+
+
+class TestLoopMonitor(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.monitor = LoopMonitor(threshold=0.05)
+        self.monitor.start()
+        await asyncio.sleep(0.1)
+
+    async def asyncTearDown(self):
+        await self.monitor.stop()
+
+    async def test_captures_blocking_call(self):
+        block(0.3)
+        await asyncio.sleep(0.1)
+
+        report = self.monitor.report()
+        self.assertEqual(report["blocked"], 1)
+        event = report["events"][0]
+        self.assertGreaterEqual(event["duration"], 0.2)
+        self.assertIsNone(event["route"])
+        self.assertIn("block", event["stack"][-1])
+        self.assertIn("time.sleep(seconds)", "".join(event["stack"]))
+
+    async def test_ignores_short_pauses(self):
+        for _ in range(5):
+            block(0.01)
+            await asyncio.sleep(0.03)
+
+        self.assertEqual(self.monitor.stats()["blocked"], 0)
+
+
+class TestBlockingMonitorMiddleware(unittest.TestCase):
+    def test_names_route_of_blocking_call(self):
+        scopes = {}
+        monitor = LoopMonitor(threshold=0.05, scopes=scopes)
+        app = FastAPI()
+        app.add_middleware(RequestTaskMiddleware, scopes=scopes)
+
+        @app.get("/slow/{item_id}")
+        async def slow(item_id: int):
+            monitor.start()
+            await asyncio.sleep(0.1)
+            block(0.3)
+            await asyncio.sleep(0.1)
+            await monitor.stop()
+            return {"id": item_id}
+
+        with TestClient(app) as client:
+            self.assertEqual(client.get("/slow/1").status_code, 200)
+
+        self.assertEqual(monitor.events[0]["route"], "GET /slow/{item_id}")
+        self.assertIn("slow", "".join(monitor.events[0]["stack"]))
+        self.assertEqual(scopes, {})
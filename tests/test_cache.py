@@ -0,0 +1,212 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from redis.exceptions import ConnectionError
+
+from src.models.models import Image
+from src.services.cache import (RedisCache, LocalCache, TieredCache, ModelCodec, InvalidationListener,
+                                INVALIDATION_CHANNEL)
+
+
+class TestRedisCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.client = AsyncMock()
+        self.pipe = MagicMock()
+        self.pipe.__aenter__.return_value = self.pipe
+        self.pipe.execute = AsyncMock()
+        self.client.pipeline = MagicMock(return_value=self.pipe)
+        self.cache = RedisCache(self.client)
+
+    async def test_set_writes_value_and_ttl_at_once(self):
+        await self.cache.set("key", b"value", ttl=60)
+
+        self.client.set.assert_awaited_once_with("key", b"value", ex=60)
+        self.client.expire.assert_not_called()
+
+    async def test_get_many_uses_one_mget(self):
+        self.client.mget.return_value = [b"a", None]
+
+        self.assertEqual(await self.cache.get_many(["a", "b"]), [b"a", None])
+        self.client.mget.assert_awaited_once_with(["a", "b"])
+
+    async def test_set_many_is_pipelined(self):
+        await self.cache.set_many({"a": b"1", "b": b"2"}, ttl=30)
+
+        self.client.pipeline.assert_called_once_with(transaction=False)
+        self.assertEqual(self.pipe.set.call_count, 2)
+        self.pipe.set.assert_any_call("a", b"1", ex=30)
+        self.pipe.execute.assert_awaited_once()
+
+    async def test_empty_batches_skip_redis(self):
+        self.assertEqual(await self.cache.get_many([]), [])
+        await self.cache.set_many({})
+        await self.cache.delete()
+
+        self.client.mget.assert_not_called()
+        self.client.pipeline.assert_not_called()
+        self.client.delete.assert_not_called()
+
+    async def test_errors_are_misses(self):
+        self.client.get.side_effect = ConnectionError("down")
+        self.client.mget.side_effect = ConnectionError("down")
+        self.client.set.side_effect = ConnectionError("down")
+        self.pipe.execute.side_effect = ConnectionError("down")
+
+        self.assertIsNone(await self.cache.get("a"))
+        self.assertEqual(await self.cache.get_many(["a", "b"]), [None, None])
+        await self.cache.set("a", b"1")
+        await self.cache.set_many({"a": b"1"})
+
+    async def test_disabled_cache(self):
+        cache = RedisCache(None)
+
+        self.assertIsNone(await cache.get("a"))
+        await cache.set("a", b"1")
+
+
+class TestLocalCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = LocalCache(max_entries=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+
+    def test_ttl(self):
+        cache = LocalCache(ttl=10)
+        with patch("src.services.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("src.services.cache.time.monotonic", return_value=109.0):
+            self.assertEqual(cache.get("a"), 1)
+        with patch("src.services.cache.time.monotonic", return_value=111.0):
+            self.assertIsNone(cache.get("a"))
+
+
+class TestTieredCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.local = LocalCache()
+        self.remote = AsyncMock(spec=RedisCache)
+        self.cache = TieredCache("thing:v1:", str.encode, bytes.decode, ttl=60, local=self.local, remote=self.remote)
+
+    async def test_local_hit_skips_redis(self):
+        self.local.set("thing:v1:1", "value")
+
+        self.assertEqual(await self.cache.get(1), "value")
+        self.remote.get.assert_not_awaited()
+
+    async def test_redis_hit_fills_local_tier(self):
+        self.remote.get.return_value = b"value"
+
+        self.assertEqual(await self.cache.get(1), "value")
+        self.assertEqual(self.local.get("thing:v1:1"), "value")
+
+    async def test_set_writes_both_tiers(self):
+        await self.cache.set(1, "value")
+
+        self.assertEqual(self.local.get("thing:v1:1"), "value")
+        self.remote.set.assert_awaited_once_with("thing:v1:1", b"value", ttl=60)
+
+    async def test_invalidate_drops_both_tiers_and_notifies_workers(self):
+        self.local.set("thing:v1:1", "value")
+        with patch("src.services.cache.publish_invalidation", new_callable=AsyncMock) as publish:
+            await self.cache.invalidate(1)
+
+        self.assertIsNone(self.local.get("thing:v1:1"))
+        self.remote.delete.assert_awaited_once_with("thing:v1:1")
+        publish.assert_awaited_once_with("thing:v1:1")
+
+
+class TestModelCodec(unittest.TestCase):
+    def test_round_trip(self):
+        codec = ModelCodec(Image)
+        image = Image(id=3, image="https://example.com/a.png", edited_image=None, user_id=1)
+
+        decoded = codec.loads(codec.dumps(image))
+
+        self.assertIsInstance(decoded, Image)
+        self.assertEqual((decoded.id, decoded.image, decoded.user_id), (3, "https://example.com/a.png", 1))
+
+    def test_other_version_is_a_miss(self):
+        image = Image(id=3, image="x")
+
+        self.assertIsNone(ModelCodec(Image, version=2).loads(ModelCodec(Image).dumps(image)))
+        self.assertIsNone(ModelCodec(Image).loads(b"garbage"))
+
+
+class FakePubSub:
+    def __init__(self):
+        self.messages = asyncio.Queue()
+        self.channels = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def subscribe(self, channel):
+        self.channels.append(channel)
+
+    async def listen(self):
+        while True:
+            yield await self.messages.get()
+
+
+class TestInvalidationListener(unittest.IsolatedAsyncioTestCase):
+    async def test_drops_published_keys(self):
+        local = LocalCache()
+        local.set("missed-while-disconnected", 1)
+        pubsub = FakePubSub()
+        client = MagicMock()
+        client.pubsub.return_value = pubsub
+        listener = InvalidationListener(client, local)
+
+        listener.start()
+        await asyncio.sleep(0)
+        self.assertEqual(pubsub.channels, [INVALIDATION_CHANNEL])
+        self.assertIsNone(local.get("missed-while-disconnected"))
+
+        local.set("image:v1:1", "image")
+        local.set("image:v1:2", "other")
+        await pubsub.messages.put({"type": "message", "data": b"image:v1:1"})
+        await asyncio.sleep(0)
+        await listener.stop()
+
+        self.assertIsNone(local.get("image:v1:1"))
+        self.assertEqual(local.get("image:v1:2"), "other")
+
+    async def test_handlers(self):
+        pubsub = FakePubSub()
+        client = MagicMock()
+        client.pubsub.return_value = pubsub
+        listener = InvalidationListener(client, LocalCache())
+        keys = []
+        listener.add_handler(keys.append)
+
+        listener.start()
+        await asyncio.sleep(0)
+        await pubsub.messages.put({"type": "message", "data": b"tagdict:+1:cat"})
+        await asyncio.sleep(0)
+        await listener.stop()
+
+        self.assertEqual(keys, [None, "tagdict:+1:cat"])
+
+    async def test_reconnects_after_errors(self):
+        client = MagicMock()
+        client.pubsub.side_effect = [ConnectionError("down"), FakePubSub()]
+        listener = InvalidationListener(client, LocalCache(), retry_delay=0)
+
+        listener.start()
+        for _ in range(5):
+            await asyncio.sleep(0)
+        await listener.stop()
+
+        self.assertEqual(client.pubsub.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,7 @@ import unittest
 import sys
 sys.path.insert(0, '../src')
 from unittest.mock import MagicMock
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.models.models import Comment
 from src.schemas.comments import CommentBase
 from src.repository.comments import (get_comments, 
@@ -14,23 +14,25 @@ from src.repository.comments import (get_comments,
 class TestComments(unittest.IsolatedAsyncioTestCase):
     
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = MagicMock(spec=AsyncSession)
+        self.session.execute.return_value = MagicMock()
 
     async def test_get_comments(self):
         image_id = 1
         expected_comments = [Comment(id=1, comment='Comment', image_id=image_id, user_id=1)]
 
-        self.session.query().filter().all.return_value = expected_comments
+        self.session.execute.return_value.scalars().all.return_value = expected_comments
 
-        result = await get_comments(image_id, self.session)
+        result, next_cursor = await get_comments(image_id, None, 10, self.session)
 
         self.assertEqual(result, expected_comments)
+        self.assertIsNone(next_cursor)
 
     async def test_get_comment(self):
         image_id = 1
         expected_comment = Comment(id=1, comment='Comment', image_id=image_id, user_id=1)
 
-        self.session.query().filter().first.return_value = expected_comment
+        self.session.execute.return_value.scalars().first.return_value = expected_comment
 
         result = await get_comment(image_id, self.session)
 
@@ -54,7 +56,7 @@ class TestComments(unittest.IsolatedAsyncioTestCase):
         body = CommentBase(comment='New comment')
         existing_comment = Comment(id=comment_id, comment='Comment', user_id=user_id, image_id=1)
 
-        self.session.query().filter().first.return_value = existing_comment
+        self.session.execute.return_value.scalars().first.return_value = existing_comment
 
         result = await update_comment(comment_id=comment_id, body=body, db=self.session, user_id=user_id)
 
@@ -64,7 +66,7 @@ class TestComments(unittest.IsolatedAsyncioTestCase):
         comment_id = 1
         existing_comment = Comment(id=comment_id, comment='Comment', user_id=1, image_id=1)
 
-        self.session.query().filter().first.return_value = existing_comment
+        self.session.execute.return_value.scalars().first.return_value = existing_comment
 
         result = await delete_comment(comment_id=comment_id, db=self.session)
 
@@ -66,4 +66,53 @@ def test_login_wrong_email(client, user):
     )
     assert response.status_code == 401, response.text
     data = response.json()
-    assert data["detail"] == "Invalid email"
\ No newline at end of file
+    assert data["detail"] == "Invalid email"
+
+def test_refresh_token_rotation(client, user):
+    response = client.post(
+        "/api/auth/login",
+        data={"username": user.get('email'), "password": user.get('password')},
+    )
+    first = response.json()["refresh_token"]
+
+    response = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {first}"})
+    assert response.status_code == 200, response.text
+    second = response.json()["refresh_token"]
+    assert second != first
+
+    reused = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {first}"})
+    assert reused.status_code == 401, reused.text
+    revoked = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {second}"})
+    assert revoked.status_code == 401, revoked.text
+
+
+def test_login_does_not_write_users_table(client, session, user):
+    response = client.post(
+        "/api/auth/login",
+        data={"username": user.get('email'), "password": user.get('password')},
+    )
+    assert response.status_code == 200, response.text
+    current_user: User = session.query(User).filter(User.email == user.get('email')).first()
+    session.refresh(current_user)
+    assert current_user.refresh_token is None
+
+
+def test_logout(client, user, monkeypatch):
+    from src.services.auth import auth_service
+    from src.services.revocation import RevocationList
+    from tests.fake_redis import FakeRedis
+
+    monkeypatch.setattr(auth_service, "revocations", RevocationList(FakeRedis(), capacity=100, error_rate=0.01))
+    tokens = client.post(
+        "/api/auth/login",
+        data={"username": user.get('email'), "password": user.get('password')},
+    ).json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.get("/api/auth/me/", headers=headers).status_code == 200
+
+    response = client.post("/api/auth/logout", headers=headers, json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200, response.text
+
+    assert client.get("/api/auth/me/", headers=headers).status_code == 401
+    refreshed = client.get("/api/auth/refresh_token", headers={"Authorization": f"Bearer {tokens['refresh_token']}"})
+    assert refreshed.status_code == 401
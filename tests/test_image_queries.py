@@ -0,0 +1,69 @@
+import unittest
+
+from src.models.models import Comment, Image, Role, Tag, User
+from src.repository.images import get_all_images, get_images_by_user
+from src.schemas.images import ImageResponse
+from tests.sqlite_database import SQLiteTestCase
+
+
+class TestImageListQueryCount(SQLiteTestCase):
+    async def seed(self):
+        async with self.session_factory() as db:
+            self.user = User(username="owner", email="owner@example.com", password="x", role=Role.user)
+            db.add(self.user)
+            for i in range(50):
+                image = Image(image=f"https://example.com/{i}.png", user=self.user,
+                              tags=[Tag(name=f"tag-{i}-a"), Tag(name=f"tag-{i}-b")])
+                image.comments = [Comment(comment="nice", user=self.user)]
+                db.add(image)
+            await db.commit()
+
+    async def _queries_for_page(self, limit: int) -> int:
+        self.statements.clear()
+        async with self.session_factory() as db:
+            images, _ = await get_all_images(None, limit, db)
+            [ImageResponse.model_validate(image) for image in images]
+        self.assertEqual(len(images), limit)
+        return len(self.statements)
+
+    async def test_query_count_does_not_depend_on_page_size(self):
+        small = await self._queries_for_page(2)
+        large = await self._queries_for_page(50)
+
+        self.assertEqual(small, large)
+        self.assertEqual(large, 2)
+
+    async def test_user_is_not_joined(self):
+        await self._queries_for_page(10)
+
+        self.assertNotIn("JOIN users", self.statements[0])
+
+    async def test_images_by_user_query_count(self):
+        self.statements.clear()
+        async with self.session_factory() as db:
+            images, _ = await get_images_by_user(self.user.id, None, 100, db)
+            [ImageResponse.model_validate(image) for image in images]
+
+        self.assertEqual(len(images), 50)
+        self.assertEqual(len(self.statements), 3)
+
+    async def test_keyset_pages_cover_every_image_once(self):
+        seen, cursor, page_queries = [], None, set()
+        while True:
+            self.statements.clear()
+            async with self.session_factory() as db:
+                images, cursor = await get_all_images(cursor, 7, db)
+            page_queries.add(len(self.statements))
+            seen.extend(image.id for image in images)
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(len(seen), 50)
+        self.assertEqual(len(set(seen)), 50)
+        self.assertEqual(page_queries, {2})
+        self.assertIn("WHERE images.id > ?", self.statements[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from src.models.models import Image, Tag, User
+from src.repository.images import search_images_by_tags
+from src.repository.tag_dictionary import TagDictionary
+from tests.sqlite_database import SQLiteTestCase
+
+
+class TestSearchImagesByTags(SQLiteTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        patcher = patch("src.repository.images.tag_dictionary", TagDictionary())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def seed(self):
+        async with self.session_factory() as db:
+            cat, dog, sea = Tag(name="cat"), Tag(name="dog"), Tag(name="sea")
+            db.add(Tag(name="unused"))
+            # Image i has cat if i % 2 == 0, dog if i % 3 == 0, sea if i == 1
+            for i in range(30):
+                tags = [tag for tag, has in ((cat, i % 2 == 0), (dog, i % 3 == 0), (sea, i == 1)) if has]
+                db.add(Image(image=f"https://example.com/{i}.png", tags=tags))
+            await db.commit()
+
+    async def search(self, names, match_all, cursor=None, limit=100):
+        async with self.session_factory() as db:
+            return await search_images_by_tags(names, match_all, cursor, limit, db)
+
+    @staticmethod
+    def numbers(images):
+        return [int(image.image.rsplit("/", 1)[1].split(".")[0]) for image in images]
+
+    async def test_all(self):
+        images, cursor = await self.search(["cat", "dog"], True)
+
+        self.assertEqual(self.numbers(images), [0, 6, 12, 18, 24])
+        self.assertIsNone(cursor)
+
+    async def test_any(self):
+        images, _ = await self.search(["sea", "dog"], False)
+
+        self.assertEqual(self.numbers(images), [0, 1, 3, 6, 9, 12, 15, 18, 21, 24, 27])
+
+    async def test_unknown_tags(self):
+        self.assertEqual(await self.search(["cat", "missing"], True), ([], None))
+        images, _ = await self.search(["sea", "missing"], False)
+        self.assertEqual(self.numbers(images), [1])
+        self.assertEqual(await self.search(["unused"], False), ([], None))
+
+    async def test_pages(self):
+        for match_all in (True, False):
+            seen, cursor = [], None
+            while True:
+                images, cursor = await self.search(["cat", "dog"], match_all, cursor, limit=4)
+                seen.extend(self.numbers(images))
+                if cursor is None:
+                    break
+            matches = all if match_all else any
+            self.assertEqual(seen, [i for i in range(30) if matches((i % 2 == 0, i % 3 == 0))])
+
+    async def test_query_count(self):
+        async with self.session_factory() as db:
+            await search_images_by_tags(["cat"], True, None, 100, db)
+            self.statements.clear()
+            await search_images_by_tags(["cat", "dog", "sea"], False, None, 100, db)
+
+        # Matching IDs, the images, then their tags
+        self.assertEqual(len(self.statements), 3)
+        self.assertNotIn("FROM tags", self.statements[0])
+
+    async def test_tag_index_is_used(self):
+        async with self.engine.connect() as conn:
+            plan = (await conn.execute(text(
+                "EXPLAIN QUERY PLAN SELECT image_id FROM image_m2m_tag WHERE tag_id = 1 AND image_id > 0 "
+                "ORDER BY image_id LIMIT 10"))).all()
+
+        self.assertIn("ix_image_m2m_tag_tag_id_image_id", " ".join(str(row) for row in plan))
+
+    async def test_tag_limits(self):
+        for names in ([], [" "], [f"t{i}" for i in range(11)]):
+            with self.assertRaises(HTTPException) as ctx:
+                await self.search(names, True)
+            self.assertEqual(ctx.exception.status_code, 400)
+
+
+def test_search_images_endpoint(client, session):
+    owner = User(username="owner", email="owner@example.com", password="x")
+    session.add(Image(image="https://example.com/beach.png", user=owner,
+                      tags=[Tag(name="beach"), Tag(name="summer")]))
+    session.add(Image(image="https://example.com/snow.png", user=owner, tags=[Tag(name="winter")]))
+    session.commit()
+
+    response = client.get("/api/images/search", params={"tags": "beach,winter", "mode": "any"})
+    assert response.status_code == 200, response.text
+    assert [item["image"] for item in response.json()["items"]] == ["https://example.com/beach.png",
+                                                                    "https://example.com/snow.png"]
+
+    response = client.get("/api/images/search", params={"tags": "beach, summer"})
+    assert [item["image"] for item in response.json()["items"]] == ["https://example.com/beach.png"]
+
+    assert client.get("/api/images/search", params={"tags": "beach", "mode": "some"}).status_code == 422
+
+
+if __name__ == '__main__':
+    unittest.main()
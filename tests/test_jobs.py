@@ -0,0 +1,158 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, patch
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.conf.config import settings
+from src.models.models import Base, Image, Job, JobStatus, User, Role
+from src.repository.jobs import enqueue_job, claim_job, get_job
+from src.repository.transform_images import enqueue_transform, run_transform_job
+from src.services import jobs as jobs_service
+
+
+class TestJobQueue(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.db = self.session_factory()
+        self.user = User(username="worker", email="worker@example.com", password="x", role=Role.user)
+        self.db.add(self.user)
+        await self.db.commit()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+    async def test_run_next_job_empty_queue(self):
+        self.assertFalse(await jobs_service.run_next_job(self.db))
+
+    async def test_job_succeeds(self):
+        handler = AsyncMock(return_value={"transformed_url": "https://example.com/qr.png"})
+        job = await enqueue_job("test", {"image_id": 1}, self.user.id, self.db)
+
+        with patch.dict(jobs_service.JOB_HANDLERS, {"test": handler}):
+            self.assertTrue(await jobs_service.run_next_job(self.db))
+
+        await self.db.refresh(job)
+        handler.assert_awaited_once()
+        self.assertEqual(handler.await_args.args[0], {"image_id": 1})
+        self.assertEqual(job.status, JobStatus.succeeded)
+        self.assertEqual(job.result, {"transformed_url": "https://example.com/qr.png"})
+        self.assertEqual(job.attempts, 1)
+
+    async def test_failed_job_is_retried_with_backoff(self):
+        handler = AsyncMock(side_effect=RuntimeError("cloudinary down"))
+        job = await enqueue_job("test", {}, self.user.id, self.db)
+
+        with patch.dict(jobs_service.JOB_HANDLERS, {"test": handler}):
+            await jobs_service.run_next_job(self.db)
+
+        await self.db.refresh(job)
+        self.assertEqual(job.status, JobStatus.queued)
+        self.assertIn("cloudinary down", job.error)
+        self.assertGreater(job.run_at, datetime.utcnow())
+        self.assertIsNone(await claim_job(self.db))
+
+    async def test_job_fails_after_max_attempts(self):
+        handler = AsyncMock(side_effect=RuntimeError("boom"))
+        job = await enqueue_job("test", {}, self.user.id, self.db)
+
+        with patch.dict(jobs_service.JOB_HANDLERS, {"test": handler}):
+            for _ in range(settings.job_max_attempts):
+                job.run_at = datetime.utcnow() - timedelta(seconds=1)
+                await self.db.commit()
+                await jobs_service.run_next_job(self.db)
+
+        await self.db.refresh(job)
+        self.assertEqual(job.status, JobStatus.failed)
+        self.assertEqual(job.attempts, settings.job_max_attempts)
+
+    async def test_unknown_job_kind_fails(self):
+        job = await enqueue_job("unknown", {}, self.user.id, self.db)
+
+        await jobs_service.run_next_job(self.db)
+
+        await self.db.refresh(job)
+        self.assertIn("No handler", job.error)
+
+    async def test_expired_lease_is_reclaimed(self):
+        job = await enqueue_job("test", {}, self.user.id, self.db)
+        claimed = await claim_job(self.db)
+        self.assertEqual(claimed.id, job.id)
+        self.assertIsNone(await claim_job(self.db))
+
+        job.locked_until = datetime.utcnow() - timedelta(seconds=1)
+        await self.db.commit()
+
+        reclaimed = await claim_job(self.db)
+        self.assertEqual(reclaimed.id, job.id)
+        self.assertEqual(reclaimed.attempts, 2)
+
+    async def test_expired_lease_after_max_attempts_fails(self):
+        poison = await enqueue_job("test", {}, self.user.id, self.db)
+        poison.run_at = datetime.utcnow() - timedelta(minutes=1)
+        await self.db.commit()
+        fresh = await enqueue_job("test", {}, self.user.id, self.db)
+        for _ in range(settings.job_max_attempts):
+            self.assertEqual((await claim_job(self.db)).id, poison.id)
+            # The worker died, e.g. out of memory, and the lease ran out
+            poison.locked_until = datetime.utcnow() - timedelta(seconds=1)
+            await self.db.commit()
+
+        self.assertEqual((await claim_job(self.db)).id, fresh.id)
+        await self.db.refresh(poison)
+        self.assertEqual(poison.status, JobStatus.failed)
+        self.assertEqual(poison.attempts, settings.job_max_attempts)
+        self.assertIn("Lease expired", poison.error)
+        self.assertIsNone(await claim_job(self.db))
+
+    async def test_transform_retries_overwrite_one_asset(self):
+        image = Image(image="https://res.cloudinary.com/demo/image/upload/v1/original.jpg", user_id=self.user.id)
+        self.db.add(image)
+        await self.db.commit()
+        job = await enqueue_transform(image.id, self.db, self.user, width=100)
+        upload = AsyncMock(return_value={"url": "http://example.com/t.jpg", "secure_url": "https://example.com/t.jpg"})
+
+        with patch("src.repository.transform_images.storage_client.upload", upload), \
+                patch("src.repository.transform_images.make_qr_code", AsyncMock(return_value="/qr")), \
+                patch("src.repository.transform_images.image_cache.invalidate", AsyncMock()):
+            # The first attempt uploaded, then its worker died before completing the job
+            await run_transform_job(job.payload, self.db)
+            await run_transform_job(job.payload, self.db)
+
+        public_ids = [call.kwargs["public_id"] for call in upload.await_args_list]
+        self.assertEqual(public_ids, [f"Images/worker/{job.id}"] * 2)
+        self.assertTrue(all(call.kwargs["overwrite"] for call in upload.await_args_list))
+
+    async def test_get_job_only_for_owner_or_admin(self):
+        job = await enqueue_job("test", {}, self.user.id, self.db)
+        other = User(id=999, username="other", email="other@example.com", role=Role.user)
+        admin = User(id=1000, username="admin", email="admin@example.com", role=Role.admin)
+
+        self.assertEqual((await get_job(job.id, self.user, self.db)).id, job.id)
+        self.assertIsNone(await get_job(job.id, other, self.db))
+        self.assertEqual((await get_job(job.id, admin, self.db)).id, job.id)
+
+    async def test_worker_drains_queue_and_stops(self):
+        handler = AsyncMock(return_value=None)
+        for i in range(3):
+            await enqueue_job("test", {"n": i}, self.user.id, self.db)
+        stop = asyncio.Event()
+
+        with patch.dict(jobs_service.JOB_HANDLERS, {"test": handler}):
+            task = asyncio.create_task(jobs_service.worker(stop, self.session_factory, poll_interval=0.01))
+            while handler.await_count < 3:
+                await asyncio.sleep(0.01)
+            stop.set()
+            await task
+
+        self.assertEqual(handler.await_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
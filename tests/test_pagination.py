@@ -0,0 +1,42 @@
+import unittest
+
+from fastapi import HTTPException
+
+from src.models.models import Image, User
+from src.repository.pagination import encode_cursor, decode_cursor
+
+
+class TestCursor(unittest.TestCase):
+    def test_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(42)), 42)
+
+    def test_cursor_is_url_safe(self):
+        self.assertRegex(encode_cursor(10 ** 12), r"^[A-Za-z0-9_-]+$")
+
+    def test_invalid_cursor(self):
+        for cursor in ("not-a-cursor", encode_cursor("42"), "e30"):
+            with self.assertRaises(HTTPException) as ctx:
+                decode_cursor(cursor)
+            self.assertEqual(ctx.exception.status_code, 400)
+
+
+def test_get_images_pages(client, session):
+    owner = User(username="pager", email="pager@example.com", password="x")
+    session.add(owner)
+    session.flush()
+    for i in range(3):
+        session.add(Image(image=f"https://example.com/page-{i}.png", user_id=owner.id))
+    session.commit()
+
+    first = client.get("/api/images", params={"limit": 2})
+    assert first.status_code == 200, first.text
+    assert len(first.json()["items"]) == 2
+    cursor = first.json()["next_cursor"]
+    assert cursor
+
+    rest = client.get("/api/images", params={"limit": 100, "cursor": cursor}).json()
+    ids = [image["id"] for image in first.json()["items"] + rest["items"]]
+    assert ids == sorted(set(ids))
+    assert rest["next_cursor"] is None
+
+    assert client.get("/api/images", params={"cursor": "bogus"}).status_code == 400
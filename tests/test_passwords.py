@@ -0,0 +1,108 @@
+import asyncio
+import threading
+import unittest
+
+from fastapi import HTTPException
+
+from src.services.passwords import PasswordHasher
+
+
+class TestPasswordHasher(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.hasher = PasswordHasher(rounds=4, max_workers=2, max_queue=1)
+
+    def tearDown(self):
+        self.hasher.shutdown()
+
+    async def test_hash_and_verify(self):
+        hashed = await self.hasher.hash("secret")
+
+        self.assertTrue(hashed.startswith("$2b$04$"))
+        self.assertTrue(await self.hasher.verify("secret", hashed))
+        self.assertFalse(await self.hasher.verify("wrong", hashed))
+        self.assertEqual(self.hasher.stats()["completed"], 3)
+
+    async def test_rehash_when_cost_changes(self):
+        hashed = await self.hasher.hash("secret")
+        stronger = PasswordHasher(rounds=5)
+
+        valid, new_hash = await stronger.verify_and_update("secret", hashed)
+        stronger.shutdown()
+
+        self.assertTrue(valid)
+        self.assertTrue(new_hash.startswith("$2b$05$"))
+        self.assertFalse(stronger.needs_rehash(new_hash))
+
+    async def test_no_rehash_for_current_cost_or_wrong_password(self):
+        hashed = await self.hasher.hash("secret")
+
+        self.assertEqual(await self.hasher.verify_and_update("secret", hashed), (True, None))
+        self.assertEqual(await self.hasher.verify_and_update("wrong", hashed), (False, None))
+
+    async def test_rejects_when_saturated(self):
+        release = threading.Event()
+        self.hasher.context.hash = lambda password: release.wait(5) and "hashed"
+        running = [asyncio.create_task(self.hasher.hash("x")) for _ in range(3)]
+        await asyncio.sleep(0.05)
+
+        self.assertEqual(self.hasher.stats()["running"], 2)
+        self.assertEqual(self.hasher.stats()["queued"], 1)
+        with self.assertRaises(HTTPException) as ctx:
+            await self.hasher.hash("x")
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertIn("Retry-After", ctx.exception.headers)
+        self.assertEqual(self.hasher.stats()["rejected"], 1)
+
+        release.set()
+        self.assertEqual(await asyncio.gather(*running), ["hashed"] * 3)
+        self.assertEqual(self.hasher.stats()["running"], 0)
+
+    async def test_failures_are_not_completions(self):
+        self.hasher.context.hash = lambda password: 1 / 0
+
+        with self.assertRaises(ZeroDivisionError):
+            await self.hasher.hash("x")
+
+        self.assertEqual(self.hasher.stats()["failed"], 1)
+        self.assertEqual(self.hasher.stats()["completed"], 0)
+        self.assertEqual(self.hasher.stats()["running"], 0)
+
+    async def test_cancelled_request_keeps_its_slot_until_the_hash_ends(self):
+        release, started = threading.Event(), threading.Event()
+        self.hasher.context.hash = lambda password: started.set() or release.wait(5) and "hashed"
+        request = asyncio.create_task(self.hasher.hash("x"))
+        await asyncio.to_thread(started.wait, 5)
+
+        request.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await request
+        self.assertEqual(self.hasher.stats()["running"], 1)
+
+        release.set()
+        for _ in range(100):
+            if self.hasher.stats()["running"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(self.hasher.stats()["running"], 0)
+        self.assertEqual(self.hasher.stats()["completed"], 1)
+
+    async def test_event_loop_stays_responsive(self):
+        hasher = PasswordHasher(rounds=10, max_workers=2)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.001)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await hasher.hash("secret")
+        task.cancel()
+        hasher.shutdown()
+
+        self.assertGreater(ticks, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import asyncio
+import sys
+import time
+import unittest
+from collections import Counter
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+
+from src.services.profiler import SamplingProfiler, collapse, frame_name, render_collapsed
+
+
+def spin(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+async def busy(seconds):
+    # Holds the loop most of the time, like a CPU-bound handler
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        spin(0.01)
+        await asyncio.sleep(0)
+
+
+class TestCollapse(unittest.TestCase):
+    def test_collapse(self):
+        def inner():
+            return collapse(sys._getframe(), "GET /items")
+
+        stack = inner()
+
+        frames = stack.split(";")
+        self.assertEqual(frames[0], "GET /items")
+        self.assertTrue(frames[-1].startswith("TestCollapse.test_collapse.<locals>.inner (test_profiler.py:"))
+        self.assertTrue(frames[-2].startswith("TestCollapse.test_collapse (test_profiler.py:"))
+
+    def test_frame_name_without_qualname(self):
+        # Code objects of Python 3.10 have no co_qualname
+        code = SimpleNamespace(co_name="inner", co_filename="/app/src/module.py", co_firstlineno=12)
+
+        self.assertEqual(frame_name(SimpleNamespace(f_code=code)), "inner (module.py:12)")
+
+    def test_render_collapsed(self):
+        self.assertEqual(render_collapsed(Counter({"a;b": 1, "a;c": 3})), "a;c 3\na;b 1\n")
+
+
+class TestSamplingProfiler(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.scopes = {}
+        self.profiler = SamplingProfiler(interval=0.002, scopes=self.scopes)
+
+    def serve(self, path, seconds):
+        task = asyncio.create_task(busy(seconds))
+        self.scopes[task] = {"method": "GET", "route": SimpleNamespace(path=path)}
+        return task
+
+    async def test_samples_are_attributed_to_routes(self):
+        tasks = [self.serve("/images", 0.3), self.serve("/tags", 0.3)]
+
+        stacks = await self.profiler.profile(0.2)
+        await asyncio.gather(*tasks)
+
+        roots = Counter()
+        for stack, count in stacks.items():
+            roots[stack.split(";", 1)[0]] += count
+        self.assertGreater(roots["GET /images"], 5)
+        self.assertGreater(roots["GET /tags"], 5)
+        self.assertTrue(any("spin (test_profiler.py:" in stack for stack in stacks))
+
+    async def test_route_filter(self):
+        tasks = [self.serve("/images", 0.3), self.serve("/tags", 0.3)]
+
+        stacks = await self.profiler.profile(0.2, route="/tags")
+        await asyncio.gather(*tasks)
+
+        self.assertTrue(stacks)
+        self.assertTrue(all(stack.startswith("GET /tags;") for stack in stacks))
+
+    async def test_all_threads(self):
+        thread = asyncio.create_task(asyncio.to_thread(spin, 0.3))
+
+        stacks = await self.profiler.profile(0.2, all_threads=True)
+        await thread
+
+        self.assertTrue(any(stack.startswith("thread ") and "spin (" in stack for stack in stacks))
+
+    async def test_one_profile_at_a_time(self):
+        running = asyncio.create_task(self.profiler.profile(0.1))
+        await asyncio.sleep(0)
+
+        with self.assertRaises(HTTPException) as error:
+            await self.profiler.profile(0.1)
+        self.assertEqual(error.exception.status_code, 409)
+        await running
+        self.assertFalse(self.profiler.running)
@@ -0,0 +1,101 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from redis.exceptions import ConnectionError
+
+from src.models.models import Image
+from src.services.qr_codes import QRCodeCache, render_qr_code, qr_code_cache
+
+URL = "https://res.cloudinary.com/demo/image/upload/v1/Images/user/edited.png"
+
+
+class TestRenderQRCode(unittest.TestCase):
+    def test_png(self):
+        self.assertTrue(render_qr_code(URL, "png").startswith(b"\x89PNG"))
+
+    def test_svg(self):
+        self.assertIn(b"<svg", render_qr_code(URL, "svg"))
+
+
+class TestQRCodeCache(unittest.IsolatedAsyncioTestCase):
+    async def test_key_depends_on_content_and_format(self):
+        self.assertEqual(QRCodeCache.key(URL, "png"), QRCodeCache.key(URL, "png"))
+        self.assertNotEqual(QRCodeCache.key(URL, "png"), QRCodeCache.key(URL, "svg"))
+        self.assertNotEqual(QRCodeCache.key(URL, "png"), QRCodeCache.key(URL + "?v=2", "png"))
+
+    async def test_renders_once_then_serves_from_memory(self):
+        cache = QRCodeCache()
+        with patch("src.services.qr_codes.render_qr_code", return_value=b"png") as render:
+            first = await cache.get(URL)
+            second = await cache.get(URL)
+
+        self.assertEqual(first, second)
+        render.assert_called_once_with(URL, "png")
+
+    async def test_lru_eviction(self):
+        cache = QRCodeCache(max_entries=2)
+        await cache.get("a")
+        await cache.get("b")
+        await cache.get("a")
+        await cache.get("c")
+
+        self.assertIn(cache.key("a", "png"), cache._lru)
+        self.assertNotIn(cache.key("b", "png"), cache._lru)
+        self.assertEqual(len(cache._lru), 2)
+
+    async def test_redis_hit_skips_rendering(self):
+        redis = AsyncMock()
+        redis.get.return_value = b"from-redis"
+        cache = QRCodeCache(redis)
+        with patch("src.services.qr_codes.render_qr_code") as render:
+            key, content = await cache.get(URL)
+
+        self.assertEqual(content, b"from-redis")
+        redis.get.assert_awaited_once_with(f"qr:{key}")
+        render.assert_not_called()
+
+    async def test_miss_is_written_to_redis(self):
+        redis = AsyncMock()
+        redis.get.return_value = None
+        cache = QRCodeCache(redis, ttl=60)
+
+        key, content = await cache.get(URL)
+
+        redis.set.assert_awaited_once_with(f"qr:{key}", content, ex=60)
+
+    async def test_redis_errors_fall_back_to_rendering(self):
+        redis = AsyncMock()
+        redis.get.side_effect = ConnectionError("down")
+        redis.set.side_effect = ConnectionError("down")
+        cache = QRCodeCache(redis)
+
+        _, content = await cache.get(URL)
+
+        self.assertTrue(content.startswith(b"\x89PNG"))
+
+
+def test_get_qr_code_endpoint(client, session, monkeypatch):
+    monkeypatch.setattr(qr_code_cache, "redis", None)
+    image = Image(image="https://example.com/original.png", edited_image=URL)
+    session.add(image)
+    session.commit()
+
+    response = client.get(f"/api/images/{image.id}/qr")
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "image/png"
+    assert response.content.startswith(b"\x89PNG")
+
+    cached = client.get(f"/api/images/{image.id}/qr", headers={"If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+
+    svg = client.get(f"/api/images/{image.id}/qr", params={"format": "svg"})
+    assert svg.headers["content-type"] == "image/svg+xml"
+
+
+def test_get_qr_code_not_transformed(client, session):
+    image = Image(image="https://example.com/original.png")
+    session.add(image)
+    session.commit()
+
+    response = client.get(f"/api/images/{image.id}/qr")
+    assert response.status_code == 404, response.text
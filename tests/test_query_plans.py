@@ -0,0 +1,229 @@
+"""
+Query plan regression suite.
+
+Every repository function runs against a seeded SQLite database while its statements
+are recorded; each SELECT, UPDATE and DELETE is then run through EXPLAIN QUERY PLAN and
+the test fails if the plan scans a large table instead of searching an index. Scans
+that are expected are listed in ALLOWED_SCANS, with the reason.
+"""
+
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from src.models.models import (Comment, Image, Job, JobStatus, RefreshTokenFamily, Role, Tag, User,
+                               image_m2m_tag)
+from src.repository import comments as repository_comments
+from src.repository import images as repository_images
+from src.repository import jobs as repository_jobs
+from src.repository import refresh_tokens as repository_refresh_tokens
+from src.repository import search as repository_search
+from src.repository import tags as repository_tags
+from src.repository import transform_images as repository_transform_images
+from src.repository import users as repository_users
+from src.repository.pagination import encode_cursor
+from src.repository.search_index import search_index
+from src.repository.tag_dictionary import tag_dictionary
+from src.schemas.comments import CommentBase
+from src.schemas.images import ImageUpdateSchema
+from src.schemas.user import UserModel
+from src.services.cache import local_cache
+from tests.sqlite_database import SQLiteTestCase
+
+USERS = 200
+IMAGES = 5000
+COMMENTS = 10000
+TAGS = 300
+JOBS = 2000
+FAMILIES = 1000
+
+LARGE_TABLES = {"users", "images", "comments", "tags", "image_m2m_tag", "jobs", "refresh_token_families"}
+
+# Tables a function may scan on purpose, with the reason
+ALLOWED_SCANS = {
+    "get_all_images (first page)": {"images": "the first page reads the first rows in primary key order and stops at the limit"},
+    "get_tags (first page)": {"tags": "the first page reads the first rows in primary key order and stops at the limit"},
+    "tag_dictionary.load": {"tags": "the dictionary loads every tag once per worker"},
+    "search_index.load": {"images": "the fallback index loads every document once per worker",
+                          "comments": "the fallback index loads every document once per worker"},
+    "create_user": {"users": "the EXISTS probe for the first user stops at the first row"},
+}
+
+SCAN_PATTERN = re.compile(r"^SCAN (\w+)")
+
+
+def scanned_table(detail: str):
+    match = SCAN_PATTERN.match(detail)
+    if match is None:
+        return None
+    # Aliased tables, e.g. images_1 in the selectinload queries
+    return re.sub(r"_\d+$", "", match.group(1))
+
+
+class TestQueryPlans(SQLiteTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        local_cache.clear()
+        tag_dictionary.clear()
+        search_index.clear()
+        self.addCleanup(local_cache.clear)
+        self.addCleanup(tag_dictionary.clear)
+        self.addCleanup(search_index.clear)
+
+    async def seed(self):
+        async with self.engine.begin() as conn:
+            await self.insert_rows(conn)
+            await conn.execute(text("ANALYZE"))
+
+    @staticmethod
+    async def insert_rows(conn):
+        now = datetime.utcnow()
+        await conn.execute(insert(User), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "password": "x",
+             "role": Role.admin if i == 1 else Role.user, "confirmed": True}
+            for i in range(1, USERS + 1)])
+        await conn.execute(insert(Tag), [{"id": i, "name": f"tag{i}"} for i in range(1, TAGS + 1)])
+        await conn.execute(insert(Image), [
+            {"id": i, "image": f"https://example.com/{i}.png", "description": f"image number {i}",
+             "user_id": i % USERS + 1}
+            for i in range(1, IMAGES + 1)])
+        await conn.execute(insert(image_m2m_tag), [
+            {"image_id": i, "tag_id": (i + offset) % TAGS + 1}
+            for i in range(1, IMAGES + 1) for offset in (0, 7)])
+        await conn.execute(insert(Comment), [
+            {"id": i, "comment": f"comment number {i}", "image_id": i % IMAGES + 1, "user_id": i % USERS + 1}
+            for i in range(1, COMMENTS + 1)])
+        await conn.execute(insert(Job), [
+            {"id": f"job{i}", "kind": "transform", "payload": {}, "attempts": 1,
+             "status": JobStatus.queued if i % 100 == 0 else JobStatus.succeeded,
+             "run_at": now - timedelta(minutes=i), "user_id": i % USERS + 1}
+            for i in range(1, JOBS + 1)])
+        await conn.execute(insert(RefreshTokenFamily), [
+            {"id": f"family{i}", "user_id": i % USERS + 1, "current_jti": f"jti{i}",
+             "expires_at": now + timedelta(days=1)}
+            for i in range(1, FAMILIES + 1)])
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE"):
+            self.statements.append((statement, parameters))
+
+    async def plans(self, call):
+        """
+        Run a repository call and explain the statements it executed.
+
+        :param call: A function taking the session and returning the awaitable to run.
+        :return: The statements and the details of their plans.
+        """
+        self.statements = []
+        async with self.session_factory() as db:
+            await call(db)
+        statements = self.statements
+        self.statements = []
+        plans = []
+        async with self.engine.connect() as conn:
+            for statement, parameters in statements:
+                rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+                plans.append((statement, [row[-1] for row in rows]))
+        self.statements = []
+        return plans
+
+    async def assertIndexed(self, name, call):
+        plans = await self.plans(call)
+        self.assertTrue(plans, f"{name} executed no statements to explain")
+        allowed = ALLOWED_SCANS.get(name, {})
+        for statement, details in plans:
+            for detail in details:
+                table = scanned_table(detail)
+                if table in LARGE_TABLES and table not in allowed:
+                    self.fail(f"{name} scans {table}:\n{statement}\n" + "\n".join(details))
+        return plans
+
+    async def user(self, db, user_id):
+        return await db.get(User, user_id)
+
+    async def test_images(self):
+        def as_user(call):
+            async def run(db):
+                return await call(db, await self.user(db, 2))
+            return run
+
+        await self.assertIndexed("get_all_images (first page)", lambda db: repository_images.get_all_images(None, 20, db))
+        await self.assertIndexed("get_all_images", lambda db: repository_images.get_all_images(
+            encode_cursor(2500), 20, db))
+        await self.assertIndexed("get_images_by_user", lambda db: repository_images.get_images_by_user(
+            2, None, 20, db))
+        await self.assertIndexed("get_images_by_user", lambda db: repository_images.get_images_by_user(
+            2, encode_cursor(1001), 20, db))
+        await self.assertIndexed("get_images_by_id", as_user(
+            lambda db, user: repository_images.get_images_by_id(201, user, db)))
+        await self.assertIndexed("get_image", lambda db: repository_images.get_image(42, db))
+        # The dictionary load is covered by test_tags
+        async with self.session_factory() as db:
+            await tag_dictionary.load(db)
+        await self.assertIndexed("update_image", as_user(lambda db, user: repository_images.update_image(
+            1, ImageUpdateSchema(description="updated", qr_code="", edited_image="", tags=["tag1", "fresh"]), user, db)))
+        await self.assertIndexed("remove_image", as_user(
+            lambda db, user: repository_images.remove_image(401, user, db)))
+        await self.assertIndexed("remove_image", lambda db: repository_images.remove_image(
+            402, User(id=1, role=Role.admin), db))
+
+    async def test_search_images_by_tags(self):
+        async with self.session_factory() as db:
+            await tag_dictionary.load(db)
+        for match_all in (True, False):
+            await self.assertIndexed("search_images_by_tags", lambda db: repository_images.search_images_by_tags(
+                ["tag1", "tag8"], match_all, None, 20, db))
+            await self.assertIndexed("search_images_by_tags", lambda db: repository_images.search_images_by_tags(
+                ["tag1", "tag8"], match_all, encode_cursor(2000), 20, db))
+
+    async def test_comments(self):
+        await self.assertIndexed("get_comments", lambda db: repository_comments.get_comments(7, None, 20, db))
+        await self.assertIndexed("get_comments", lambda db: repository_comments.get_comments(
+            7, encode_cursor(7), 20, db))
+        await self.assertIndexed("get_comment", lambda db: repository_comments.get_comment(7, db))
+        await self.assertIndexed("update_comment", lambda db: repository_comments.update_comment(
+            6, CommentBase(comment="edited"), db, 7))
+        await self.assertIndexed("delete_comment", lambda db: repository_comments.delete_comment(6, db))
+
+    async def test_tags(self):
+        await self.assertIndexed("tag_dictionary.load", tag_dictionary.load)
+        await self.assertIndexed("get_tags (first page)", lambda db: repository_tags.get_tags(None, 20, db, None))
+        await self.assertIndexed("get_tags", lambda db: repository_tags.get_tags(encode_cursor(150), 20, db, None))
+        await self.assertIndexed("get_tag", lambda db: repository_tags.get_tag(5, db, None))
+        await self.assertIndexed("upsert_tags", lambda db: repository_tags.upsert_tags(["tag3", "tag4", "new"], db))
+        await self.assertIndexed("remove_tag", lambda db: repository_tags.remove_tag(9, db, None))
+
+    async def test_users(self):
+        await self.assertIndexed("get_user_by_email", lambda db: repository_users.get_user_by_email(
+            "user5@example.com", db))
+        await self.assertIndexed("create_user", lambda db: repository_users.create_user(
+            UserModel(username="newcomer", email="newcomer@example.com", password="secret"), db))
+        await self.assertIndexed("confirmed_email", lambda db: repository_users.confirmed_email(
+            "user5@example.com", db))
+        await self.assertIndexed("update_avatar", lambda db: repository_users.update_avatar(
+            "user5@example.com", "https://example.com/avatar.png", db))
+        await self.assertIndexed("update_user_role", lambda db: repository_users.update_user_role(
+            "user5@example.com", Role.moderator, db))
+
+    async def test_jobs(self):
+        await self.assertIndexed("get_job", lambda db: repository_jobs.get_job("job100", User(id=1, role=Role.admin), db))
+        plans = await self.assertIndexed("claim_job", repository_jobs.claim_job)
+        self.assertIn("ix_jobs_status_run_at", "\n".join(plans[0][1]))
+
+    async def test_refresh_tokens(self):
+        expires_at = datetime.utcnow() + timedelta(days=1)
+        await self.assertIndexed("rotate_family", lambda db: repository_refresh_tokens.rotate_family(
+            "family1", "jti1", "jti1b", expires_at, db))
+        await self.assertIndexed("rotate_family", lambda db: repository_refresh_tokens.rotate_family(
+            "family2", "stale", "jti2b", expires_at, db))
+        await self.assertIndexed("delete_family", lambda db: repository_refresh_tokens.delete_family("family3", db))
+
+    async def test_transform_images(self):
+        await self.assertIndexed("transform_images.update_image", lambda db: repository_transform_images.update_image(
+            3, "https://example.com/edited.png", db, 4))
+
+    async def test_search(self):
+        await self.assertIndexed("search_index.load", search_index.load)
+        # Served from the loaded index
+        self.assertEqual(await self.plans(lambda db: repository_search.search("number", None, 20, db)), [])
@@ -0,0 +1,137 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+from redis.exceptions import ConnectionError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.models.models import Base, RefreshTokenFamily, User
+from src.repository.refresh_tokens import Rotation, create_family, rotate_family
+from src.services.refresh_tokens import RefreshTokenStore
+
+
+class FakeRedis:
+    """Just enough of a Redis client to run the rotation script's logic."""
+
+    def __init__(self):
+        self.data = {}
+
+    def register_script(self, script):
+        async def rotate(keys, args):
+            current = self.data.get(keys[0])
+            if current is None:
+                return 0
+            if current == args[0]:
+                self.data[keys[0]] = args[1]
+                return 1
+            del self.data[keys[0]]
+            return -1
+        return rotate
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def delete(self, key):
+        self.data.pop(key, None)
+
+
+def broken_redis():
+    client = MagicMock()
+    client.register_script.return_value = AsyncMock(side_effect=ConnectionError("down"))
+    client.set = AsyncMock(side_effect=ConnectionError("down"))
+    client.delete = AsyncMock(side_effect=ConnectionError("down"))
+    return client
+
+
+class DatabaseTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.db = async_sessionmaker(self.engine, expire_on_commit=False)()
+        self.user = User(username="owner", email="owner@example.com", password="x")
+        self.db.add(self.user)
+        await self.db.commit()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+
+class TestRefreshTokenRepository(DatabaseTestCase):
+    def expires(self, seconds=60):
+        return datetime.utcnow() + timedelta(seconds=seconds)
+
+    async def test_rotate(self):
+        await create_family("fam", self.user.id, "a", self.expires(), self.db)
+
+        self.assertEqual(await rotate_family("fam", "a", "b", self.expires(), self.db), Rotation.rotated)
+        self.assertEqual((await self.db.get(RefreshTokenFamily, "fam")).current_jti, "b")
+
+    async def test_reuse_revokes_family(self):
+        await create_family("fam", self.user.id, "a", self.expires(), self.db)
+        await rotate_family("fam", "a", "b", self.expires(), self.db)
+
+        self.assertEqual(await rotate_family("fam", "a", "c", self.expires(), self.db), Rotation.reused)
+        self.assertEqual(await rotate_family("fam", "b", "c", self.expires(), self.db), Rotation.unknown)
+
+    async def test_expired_family_is_unknown(self):
+        await create_family("fam", self.user.id, "a", self.expires(-1), self.db)
+
+        self.assertEqual(await rotate_family("fam", "a", "b", self.expires(), self.db), Rotation.unknown)
+        self.assertIsNone(await self.db.get(RefreshTokenFamily, "fam"))
+
+
+class TestRefreshTokenStore(DatabaseTestCase):
+    async def test_rotation_in_redis_does_not_touch_the_database(self):
+        redis = FakeRedis()
+        store = RefreshTokenStore(redis, ttl=60)
+        self.db.execute = AsyncMock()
+
+        await store.create("fam", self.user.id, "a", self.db)
+        result = await store.rotate("fam", "a", "b", self.db)
+
+        self.assertEqual(result, Rotation.rotated)
+        self.assertEqual(redis.data, {"auth:refresh:fam": "b"})
+        self.db.execute.assert_not_awaited()
+
+    async def test_reuse_in_redis_revokes_family(self):
+        redis = FakeRedis()
+        store = RefreshTokenStore(redis, ttl=60)
+        await store.create("fam", self.user.id, "a", self.db)
+        await store.rotate("fam", "a", "b", self.db)
+
+        self.assertEqual(await store.rotate("fam", "a", "c", self.db), Rotation.reused)
+        self.assertEqual(await store.rotate("fam", "b", "c", self.db), Rotation.unknown)
+
+    async def test_falls_back_to_database(self):
+        store = RefreshTokenStore(broken_redis(), ttl=60)
+
+        await store.create("fam", self.user.id, "a", self.db)
+
+        self.assertIsNotNone(await self.db.get(RefreshTokenFamily, "fam"))
+        self.assertEqual(await store.rotate("fam", "a", "b", self.db), Rotation.rotated)
+        self.assertEqual(await store.rotate("fam", "a", "c", self.db), Rotation.reused)
+
+    async def test_family_moves_back_to_redis(self):
+        await RefreshTokenStore(broken_redis(), ttl=60).create("fam", self.user.id, "a", self.db)
+        redis = FakeRedis()
+        store = RefreshTokenStore(redis, ttl=60)
+
+        self.assertEqual(await store.rotate("fam", "a", "b", self.db), Rotation.rotated)
+        self.assertEqual(redis.data, {"auth:refresh:fam": "b"})
+        self.assertIsNone(await self.db.get(RefreshTokenFamily, "fam"))
+
+    async def test_revoke(self):
+        redis = FakeRedis()
+        store = RefreshTokenStore(redis, ttl=60)
+        await store.create("fam", self.user.id, "a", self.db)
+
+        await store.revoke("fam", self.db)
+
+        self.assertEqual(await store.rotate("fam", "a", "b", self.db), Rotation.unknown)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import HTTPException
+from redis.exceptions import ConnectionError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.models import Role
+from src.services.auth import auth_service
+from src.services.revocation import REVOCATION_CHANNEL, BloomFilter, RevocationList
+from src.services.user_snapshot import UserSnapshot
+from tests.fake_redis import FakeRedis
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        items = [f"jti-{i}" for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+
+        self.assertTrue(all(item in bloom for item in items))
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f"jti-{i}")
+
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class TestRevocationList(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.revocations = RevocationList(self.redis, capacity=100, error_rate=0.01)
+
+    async def test_unknown_tokens_are_checked_in_memory(self):
+        self.redis.zscore = AsyncMock()
+
+        self.assertFalse(await self.revocations.is_revoked("jti"))
+        self.assertFalse(await self.revocations.is_revoked(None))
+        self.redis.zscore.assert_not_awaited()
+
+    async def test_revoke(self):
+        await self.revocations.revoke("jti", int(time.time()) + 60)
+
+        self.assertTrue(await self.revocations.is_revoked("jti"))
+        self.assertEqual(self.redis.published, [(REVOCATION_CHANNEL, "jti")])
+
+    async def test_expired_tokens_are_not_stored(self):
+        await self.revocations.revoke("jti", int(time.time()) - 1)
+
+        self.assertEqual(self.redis.zsets, {})
+
+    async def test_false_positive_is_confirmed_in_redis(self):
+        self.revocations.filter.add("jti")
+
+        self.assertFalse(await self.revocations.is_revoked("jti"))
+
+    async def test_rebuild_loads_revocations_of_other_workers(self):
+        await RevocationList(self.redis, capacity=100, error_rate=0.01).revoke("jti", int(time.time()) + 60)
+        self.assertNotIn("jti", self.revocations.filter)
+
+        await self.revocations.rebuild()
+
+        self.assertIn("jti", self.revocations.filter)
+        self.assertTrue(await self.revocations.is_revoked("jti"))
+
+    async def test_rebuild_drops_expired_revocations(self):
+        self.redis.zsets[RevocationList.key] = {"old": time.time() - 1, "new": time.time() + 60}
+
+        await self.revocations.rebuild()
+
+        self.assertEqual(list(self.redis.zsets[RevocationList.key]), ["new"])
+
+    async def test_redis_errors(self):
+        client = MagicMock()
+        client.pipeline.side_effect = ConnectionError("down")
+        client.zscore = AsyncMock(side_effect=ConnectionError("down"))
+        revocations = RevocationList(client, capacity=100, error_rate=0.01)
+
+        with self.assertRaises(HTTPException) as ctx:
+            await revocations.revoke("jti", int(time.time()) + 60)
+        self.assertEqual(ctx.exception.status_code, 503)
+        self.assertFalse(await revocations.is_revoked("jti"))
+
+
+class TestRevokeToken(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.revocations = RevocationList(FakeRedis(), capacity=100, error_rate=0.01)
+        patcher = patch.object(auth_service, "revocations", self.revocations)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.db = MagicMock(spec=AsyncSession)
+        self.user = UserSnapshot(id=1, email="alice@example.com", username="alice", role=Role.user,
+                                 confirmed=True, avatar=None)
+
+    async def test_revoked_access_token_is_rejected(self):
+        token = await auth_service.create_access_token(data={"sub": self.user.email})
+        cache = AsyncMock()
+        cache.get.return_value = self.user
+        with patch.object(auth_service, "cache", cache):
+            self.assertEqual(await auth_service.get_current_user(token, self.db), self.user)
+            await auth_service.revoke_token(token, self.user, self.db)
+
+            with self.assertRaises(HTTPException) as ctx:
+                await auth_service.get_current_user(token, self.db)
+
+        self.assertEqual(ctx.exception.status_code, 401)
+
+    async def test_cannot_revoke_other_users_tokens(self):
+        token = await auth_service.create_access_token(data={"sub": "bob@example.com"})
+
+        with self.assertRaises(HTTPException) as ctx:
+            await auth_service.revoke_token(token, self.user, self.db)
+
+        self.assertEqual(ctx.exception.status_code, 403)
+
+    async def test_admin_can_revoke_any_token(self):
+        token = await auth_service.create_access_token(data={"sub": "bob@example.com"})
+        admin = UserSnapshot(id=2, email="admin@example.com", username="admin", role=Role.admin,
+                             confirmed=True, avatar=None)
+
+        await auth_service.revoke_token(token, admin, self.db)
+
+        self.assertTrue(await self.revocations.is_revoked(auth_service.decode_access_token(token)["jti"]))
+
+    async def test_refresh_token_revokes_family(self):
+        store = AsyncMock()
+        token = await auth_service.create_refresh_token(data={"sub": self.user.email, "fid": "fam", "jti": "a"})
+        with patch.object(auth_service, "refresh_tokens", store):
+            await auth_service.revoke_token(token, self.user, self.db)
+
+        store.revoke.assert_awaited_once_with("fam", self.db)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import unittest
+from unittest.mock import patch
+
+from sqlalchemy.dialects import postgresql
+
+from src.models.models import Comment, Image, User
+from src.repository.search import postgres_search_query, search
+from src.repository.search_index import InvertedIndex, tokenize
+from tests.sqlite_database import SQLiteTestCase
+
+
+class TestInvertedIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = InvertedIndex()
+        self.index.add("image", 1, 1, "Sunset over the sea")
+        self.index.add("image", 2, 2, "Sea, sea and more sea!")
+        self.index.add("comment", 1, 1, "What a sunset")
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Sea, SEA and Öl!"), ["sea", "sea", "and", "öl"])
+        self.assertEqual(tokenize(None), [])
+
+    def test_matches_every_word(self):
+        self.assertEqual([(hit.kind, hit.id) for hit in self.index.search("sunset sea")], [("image", 1)])
+        self.assertEqual(self.index.search("sunset moon"), [])
+        self.assertEqual(self.index.search("!!"), [])
+
+    def test_ranks_by_term_frequency(self):
+        self.assertEqual([(hit.kind, hit.id) for hit in self.index.search("SEA")], [("image", 2), ("image", 1)])
+
+    def test_replace_and_remove(self):
+        self.index.add("image", 1, 1, "A mountain")
+        self.index.remove("comment", 1)
+
+        self.assertEqual(self.index.search("sunset"), [])
+        self.assertEqual([hit.id for hit in self.index.search("mountain")], [1])
+        self.assertNotIn("sunset", self.index.postings)
+
+    def test_remove_image_comments(self):
+        self.index.add("comment", 2, 2, "Nice sea")
+        self.index.remove_image_comments(1)
+
+        self.assertEqual([(hit.kind, hit.id) for hit in self.index.search("sunset")], [("image", 1)])
+        self.assertEqual([(hit.kind, hit.id) for hit in self.index.search("nice")], [("comment", 2)])
+
+
+class TestSearch(SQLiteTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.index = InvertedIndex()
+        for target in ("src.repository.search.search_index", "src.repository.search_index.search_index"):
+            patcher = patch(target, self.index)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def seed(self):
+        async with self.session_factory() as db:
+            user = User(username="owner", email="owner@example.com", password="x")
+            image = Image(image="https://example.com/1.png", description="Sunset over the sea", user=user)
+            image.comments = [Comment(comment="Lovely sunset", user=user)]
+            db.add(image)
+            await db.commit()
+
+    async def test_searches_descriptions_and_comments(self):
+        async with self.session_factory() as db:
+            hits, cursor = await search("sunset", None, 10, db)
+
+        self.assertEqual({(hit.kind, hit.id, hit.image_id) for hit in hits}, {("image", 1, 1), ("comment", 1, 1)})
+        self.assertIsNone(cursor)
+
+    async def test_index_follows_commits(self):
+        async with self.session_factory() as db:
+            await search("sunset", None, 10, db)
+            image = await db.get(Image, 1)
+            image.description = "Mountain lake"
+            db.add(Image(image="https://example.com/2.png", description="Another sunset"))
+            await db.commit()
+            comment = await db.get(Comment, 1)
+            await db.delete(comment)
+            await db.commit()
+
+            hits, _ = await search("sunset", None, 10, db)
+            self.assertEqual([(hit.kind, hit.id) for hit in hits], [("image", 2)])
+            self.assertEqual([hit.id for hit in (await search("lake", None, 10, db))[0]], [1])
+
+    async def test_comments_of_deleted_image_are_not_found(self):
+        async with self.session_factory() as db:
+            await search("sunset", None, 10, db)
+            await db.delete(await db.get(Image, 1))
+            await db.commit()
+
+            self.assertEqual(await search("lovely", None, 10, db), ([], None))
+            self.assertEqual(await search("sunset", None, 10, db), ([], None))
+
+    async def test_rolled_back_writes_are_not_indexed(self):
+        async with self.session_factory() as db:
+            await search("sunset", None, 10, db)
+            db.add(Image(image="https://example.com/2.png", description="Glacier"))
+            await db.flush()
+            await db.rollback()
+
+            self.assertEqual(await search("glacier", None, 10, db), ([], None))
+
+    async def test_pages(self):
+        async with self.session_factory() as db:
+            for i in range(7):
+                db.add(Comment(comment="sunset " * (i % 3 + 1), image_id=1))
+            await db.commit()
+            everything, _ = await search("sunset", None, 100, db)
+
+            seen, cursor = [], None
+            while True:
+                hits, cursor = await search("sunset", cursor, 3, db)
+                seen.extend(hits)
+                if cursor is None:
+                    break
+
+        self.assertEqual(len(everything), 9)
+        self.assertEqual(seen, everything)
+        self.assertEqual([hit.rank for hit in seen], sorted((hit.rank for hit in seen), reverse=True))
+
+
+class TestPostgresSearchQuery(unittest.TestCase):
+    def test_uses_search_vectors(self):
+        sql = str(postgres_search_query("sunset sea", {"rank": 0.5, "kind": "image", "id": 3}, 11)
+                  .compile(dialect=postgresql.dialect()))
+
+        self.assertIn("images.search_vector @@ plainto_tsquery", sql)
+        self.assertIn("comments.search_vector @@ plainto_tsquery", sql)
+        self.assertIn("ORDER BY anon_1.rank DESC, anon_1.kind, anon_1.id", sql)
+
+
+def test_search_endpoint(client, session):
+    owner = User(username="searcher", email="searcher@example.com", password="x")
+    session.add(Image(image="https://example.com/beach.png", description="Golden beach", user=owner))
+    session.commit()
+
+    response = client.get("/api/search/", params={"q": "golden"})
+    assert response.status_code == 200, response.text
+    items = response.json()["items"]
+    assert [(item["kind"], item["text"]) for item in items] == [("image", "Golden beach")]
+
+    assert client.get("/api/search/", params={"q": "golden", "cursor": "bad"}).status_code == 400
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+from sqlalchemy import insert
+
+from src.models.models import Role, User
+from src.repository.users import create_user, is_first_user
+from src.schemas.user import UserModel
+from tests.sqlite_database import SQLiteTestCase
+
+
+class TestCreateUser(SQLiteTestCase):
+    async def signup(self, name):
+        async with self.session_factory() as db:
+            return await create_user(UserModel(username=name, email=f"{name}@example.com", password="secret"), db)
+
+    async def test_first_user_is_admin(self):
+        async with self.session_factory() as db:
+            self.assertTrue(await is_first_user(db))
+
+        first = await self.signup("first")
+        second = await self.signup("second")
+
+        self.assertEqual(first.role, Role.admin)
+        self.assertEqual(second.role, Role.user)
+        async with self.session_factory() as db:
+            self.assertFalse(await is_first_user(db))
+
+    async def test_statements_do_not_depend_on_user_count(self):
+        await self.signup("first")
+        self.statements = []
+        await self.signup("second")
+        few, self.statements = self.statements, []
+
+        async with self.engine.begin() as conn:
+            await conn.execute(insert(User), [{"email": f"user{i}@example.com", "password": "x"} for i in range(1000)])
+        self.statements = []
+        await self.signup("third")
+
+        self.assertEqual(self.statements, few)
+        self.assertIn("EXISTS", few[0])
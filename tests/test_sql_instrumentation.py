@@ -0,0 +1,94 @@
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from src.database.instrumentation import (QueryTimingMiddleware, RepeatedStatementError, SQLInstrumentation,
+                                          route_name)
+from src.models.models import Base, Image
+
+
+class TestSQLInstrumentation(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with self.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        self.session_factory = async_sessionmaker(self.engine, expire_on_commit=False)
+        self.instrumentation = SQLInstrumentation(threshold=3, strict=False)
+        self.instrumentation.attach(self.engine)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+
+    async def load_images(self, db, count):
+        # One query per image, the shape of a lazy load in a loop
+        for image_id in range(count):
+            await db.execute(select(Image).where(Image.id == image_id))
+
+    async def test_counts_tracked_statements(self):
+        async with self.session_factory() as db:
+            await db.execute(text("SELECT 1"))
+            with self.instrumentation.track() as stats:
+                await db.execute(text("SELECT 2"))
+                await self.load_images(db, 2)
+            await db.execute(text("SELECT 3"))
+
+        self.assertEqual(stats.statements, 3)
+        self.assertEqual(sorted(stats.shapes.values()), [1, 2])
+        self.assertGreater(stats.duration, 0)
+        self.assertRegex(stats.server_timing(), r'^db;dur=\d+\.\d\d;desc="3 queries"$')
+
+    async def test_warns_on_repeated_statements(self):
+        async with self.session_factory() as db:
+            with self.instrumentation.track() as stats, self.assertLogs("src.database.instrumentation") as logs:
+                await self.load_images(db, 5)
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("repeated more than 3 times", logs.output[0])
+        self.assertEqual(list(stats.repeated(3).values()), [5])
+
+    async def test_strict_raises_on_repeated_statements(self):
+        self.instrumentation.strict = True
+        async with self.session_factory() as db:
+            await self.load_images(db, 5)
+            with self.instrumentation.track():
+                await self.load_images(db, 3)
+                with self.assertRaises(RepeatedStatementError):
+                    await self.load_images(db, 1)
+
+
+class TestQueryTimingMiddleware(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+        self.instrumentation = SQLInstrumentation(threshold=3, strict=False)
+        self.instrumentation.attach(engine)
+        app = FastAPI()
+        app.add_middleware(QueryTimingMiddleware, instrumentation=self.instrumentation)
+
+        @app.get("/items/{item_id}")
+        def read_item(item_id: int):
+            with engine.connect() as conn:
+                for _ in range(item_id):
+                    conn.execute(text("SELECT 1"))
+            return {"id": item_id}
+
+        self.client = TestClient(app)
+
+    def test_server_timing_and_route_totals(self):
+        response = self.client.get("/items/2")
+        self.client.get("/items/5")
+        self.client.get("/missing")
+
+        self.assertRegex(response.headers["Server-Timing"], r'^db;dur=\d+\.\d\d;desc="2 queries"$')
+        stats = self.instrumentation.stats()
+        self.assertEqual(stats["GET /items/{item_id}"]["requests"], 2)
+        self.assertEqual(stats["GET /items/{item_id}"]["statements"], 7)
+        self.assertEqual(stats["GET /items/{item_id}"]["max_statements"], 5)
+        self.assertEqual(stats["GET /items/{item_id}"]["repeated_requests"], 1)
+        self.assertEqual(stats["unmatched"]["statements"], 0)
+
+    def test_route_name(self):
+        self.assertEqual(route_name({"method": "GET"}), "unmatched")
@@ -0,0 +1,131 @@
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.models import Role, User
+from src.services.auth import auth_service
+from src.services.cache import LocalCache, RedisCache
+from src.services.revocation import RevocationEpochs
+from src.services.roles import RoleAccess
+from src.services.user_snapshot import UserSnapshot
+
+
+class TestRevocationEpochs(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.remote = AsyncMock(spec=RedisCache)
+        self.remote.get.return_value = None
+        self.epochs = RevocationEpochs(LocalCache(), self.remote, ttl=900)
+
+    async def test_no_epoch_is_cached_locally(self):
+        self.assertEqual(await self.epochs.get(1), 0)
+        self.assertEqual(await self.epochs.get(1), 0)
+
+        self.remote.get.assert_awaited_once_with("auth:epoch:1")
+
+    async def test_bump_revokes_older_tokens(self):
+        issued_at = time.time_ns() - 10 * 1_000_000_000
+        with patch("src.services.revocation.publish_invalidation", new_callable=AsyncMock) as publish:
+            epoch = await self.epochs.bump(1)
+
+        self.assertTrue(await self.epochs.is_revoked(1, issued_at))
+        self.assertTrue(await self.epochs.is_revoked(1, epoch))
+        self.assertFalse(await self.epochs.is_revoked(1, epoch + 1))
+        self.assertFalse(await self.epochs.is_revoked(2, issued_at))
+        self.remote.set.assert_awaited_once_with("auth:epoch:1", str(epoch).encode(), ttl=900)
+        publish.assert_awaited_once_with("auth:epoch:1")
+
+
+class TestRoleChangeRevocation(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.user = User(id=5, username="alice", email="alice@example.com", role=Role.moderator, confirmed=True)
+        self.db = MagicMock(spec=AsyncSession)
+        remote = AsyncMock(spec=RedisCache)
+        remote.get.return_value = None
+        for patcher in (patch.object(auth_service, "stateless", True),
+                        patch.object(auth_service, "epochs", RevocationEpochs(LocalCache(), remote, ttl=900)),
+                        patch("src.services.revocation.publish_invalidation", new_callable=AsyncMock)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    async def test_token_issued_in_the_same_second_as_a_role_change_is_rejected(self):
+        token = await auth_service.create_access_token(auth_service.access_token_data(self.user))
+        issued_at = auth_service.decode_access_token(token)["iat_ns"]
+        # A nanosecond later, within the second its iat claim is rounded to
+        with patch("src.services.revocation.time.time_ns", return_value=issued_at + 1):
+            await auth_service.epochs.bump(5)
+
+        with self.assertRaises(HTTPException) as ctx:
+            await auth_service.get_current_user(token, self.db)
+        self.assertEqual(ctx.exception.status_code, 401)
+
+    async def test_token_issued_after_a_role_change_is_accepted(self):
+        await auth_service.epochs.bump(5)
+        token = await auth_service.create_access_token(auth_service.access_token_data(self.user))
+
+        self.assertEqual((await auth_service.get_current_user(token, self.db)).id, 5)
+
+
+class TestStatelessAccessTokens(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.user = User(id=5, username="alice", email="alice@example.com", role=Role.moderator, confirmed=True)
+        self.db = MagicMock(spec=AsyncSession)
+        patcher = patch.object(auth_service, "stateless", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.epochs = AsyncMock()
+        self.epochs.is_revoked.return_value = False
+        patcher = patch.object(auth_service, "epochs", self.epochs)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_claims_are_embedded(self):
+        data = auth_service.access_token_data(self.user)
+
+        self.assertEqual(data, {"sub": "alice@example.com", "uid": 5, "name": "alice", "role": "moderator",
+                                "confirmed": True})
+
+    async def test_user_comes_from_claims_without_lookup(self):
+        token = await auth_service.create_access_token(auth_service.access_token_data(self.user))
+        with patch.object(auth_service, "cache", AsyncMock()) as cache_mock:
+            user = await auth_service.get_current_user(token, self.db)
+
+        self.assertEqual(user, UserSnapshot(id=5, email="alice@example.com", username="alice",
+                                            role=Role.moderator, confirmed=True, avatar=None))
+        cache_mock.get.assert_not_awaited()
+        self.db.execute.assert_not_called()
+
+    async def test_revoked_token_is_rejected(self):
+        token = await auth_service.create_access_token(auth_service.access_token_data(self.user))
+        self.epochs.is_revoked.return_value = True
+
+        with self.assertRaises(HTTPException) as ctx:
+            await auth_service.get_current_user(token, self.db)
+
+        self.assertEqual(ctx.exception.status_code, 401)
+        self.assertEqual(self.epochs.is_revoked.await_args.args[0], 5)
+
+    async def test_token_without_claims_is_looked_up(self):
+        token = await auth_service.create_access_token({"sub": "alice@example.com"})
+        snapshot = UserSnapshot.from_user(self.user)
+        with patch.object(auth_service, "cache", AsyncMock()) as cache_mock:
+            cache_mock.get.return_value = snapshot
+            user = await auth_service.get_current_user(token, self.db)
+
+        self.assertEqual(user, snapshot)
+        self.epochs.is_revoked.assert_not_awaited()
+
+    async def test_role_access_uses_claims(self):
+        token = await auth_service.create_access_token(auth_service.access_token_data(self.user))
+        user = await auth_service.get_current_user(token, self.db)
+
+        self.assertEqual(await RoleAccess([Role.admin, Role.moderator])(MagicMock(), user), user)
+        with self.assertRaises(HTTPException) as ctx:
+            await RoleAccess([Role.admin])(MagicMock(), user)
+        self.assertEqual(ctx.exception.status_code, 403)
+
+
+if __name__ == '__main__':
+    unittest.main()
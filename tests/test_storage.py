@@ -0,0 +1,97 @@
+import unittest
+
+import httpx
+from fastapi import HTTPException
+
+from src.services.storage import StorageClient, public_id_from_url
+from tests.fake_cloudinary import FakeCloudinary
+
+
+class TestStorageClient(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.server = FakeCloudinary(api_key="key", api_secret="secret")
+        self.client = StorageClient(cloud_name="demo", api_key="key", api_secret="secret",
+                                    upload_prefix="http://fake", backoff=0,
+                                    transport=httpx.ASGITransport(app=self.server.app))
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_upload_bytes(self):
+        result = await self.client.upload(b"image-bytes", public_id="folder/image", overwrite=True)
+
+        self.assertEqual(result["public_id"], "folder/image")
+        self.assertTrue(result["secure_url"].endswith("/folder/image.png"))
+        self.assertEqual(self.server.resources["folder/image"]["bytes"], len(b"image-bytes"))
+
+    async def test_upload_remote_url_with_transformation(self):
+        result = await self.client.upload("https://example.com/a.png", public_id="edited",
+                                          transformation=[{"width": 100, "crop": "fill"}])
+
+        self.assertEqual(self.server.resources["edited"]["transformation"], "c_fill,w_100")
+        self.assertIn("url", result)
+
+    async def test_destroy(self):
+        await self.client.upload(b"x", public_id="to_delete")
+
+        result = await self.client.destroy("to_delete", invalidate=True)
+
+        self.assertEqual(result["result"], "ok")
+        self.assertNotIn("to_delete", self.server.resources)
+
+    async def test_destroy_many(self):
+        for public_id in ("a", "b"):
+            await self.client.upload(b"x", public_id=public_id)
+
+        result = await self.client.destroy_many(["a", "b", "missing"])
+
+        self.assertEqual(result["deleted"], {"a": "deleted", "b": "deleted", "missing": "not_found"})
+        self.assertEqual(self.server.resources, {})
+
+    async def test_destroy_many_empty(self):
+        result = await self.client.destroy_many([])
+
+        self.assertEqual(result, {"deleted": {}})
+        self.assertEqual(self.server.requests, 0)
+
+    async def test_retries_transient_failures(self):
+        self.server.fail_next = 2
+
+        result = await self.client.upload(b"x", public_id="retry")
+
+        self.assertEqual(result["public_id"], "retry")
+        self.assertEqual(self.server.requests, 3)
+
+    async def test_gives_up_after_max_retries(self):
+        self.server.fail_next = self.client.max_retries + 1
+
+        with self.assertRaises(HTTPException) as ctx:
+            await self.client.upload(b"x", public_id="retry")
+
+        self.assertEqual(ctx.exception.status_code, 502)
+
+    async def test_invalid_signature(self):
+        client = StorageClient(cloud_name="demo", api_key="key", api_secret="wrong", upload_prefix="http://fake",
+                               transport=httpx.ASGITransport(app=self.server.app))
+
+        with self.assertRaises(HTTPException) as ctx:
+            await client.upload(b"x", public_id="nope")
+        await client.close()
+
+        self.assertEqual(ctx.exception.detail, "Invalid Signature")
+
+
+class TestPublicIdFromUrl(unittest.TestCase):
+    def test_keeps_folders(self):
+        url = "https://res.cloudinary.com/demo/image/upload/v3/Qr_Code/bob/qr_code_1.png"
+        self.assertEqual(public_id_from_url(url), "Qr_Code/bob/qr_code_1")
+
+    def test_without_version(self):
+        self.assertEqual(public_id_from_url("http://res.cloudinary.com/demo/image/upload/abc.jpg"), "abc")
+
+    def test_not_a_cloudinary_upload(self):
+        self.assertIsNone(public_id_from_url("/api/images/1/qr"))
+
+
+if __name__ == '__main__':
+    unittest.main()
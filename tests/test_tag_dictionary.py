@@ -0,0 +1,146 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy.orm import selectinload
+from sqlalchemy import delete, select
+
+from src.models.models import Image, Role, Tag, User
+from src.repository.images import create_image, update_image
+from src.repository.tag_dictionary import TagDictionary
+from src.repository.tags import resolve_tags, suggest_tags
+from tests.sqlite_database import SQLiteTestCase
+
+
+class TestTagDictionary(unittest.TestCase):
+    def setUp(self):
+        self.tags = TagDictionary()
+        for tag_id, name in enumerate(["sunset", "Sunrise", "sun", "sea", "sky", "summer"], start=1):
+            self.tags.add(name, tag_id)
+
+    def test_suggest_ignores_case_and_is_sorted(self):
+        names = [tag["name"] for tag in self.tags.suggest("SU", 10)]
+
+        self.assertEqual(names, ["summer", "sun", "Sunrise", "sunset"])
+
+    def test_suggest_limit_and_no_match(self):
+        self.assertEqual(len(self.tags.suggest("s", 2)), 2)
+        self.assertEqual(self.tags.suggest("x", 10), [])
+
+    def test_discard(self):
+        self.tags.discard("sun")
+        self.tags.discard("missing")
+
+        self.assertIsNone(self.tags.get("sun"))
+        self.assertEqual([tag["name"] for tag in self.tags.suggest("sun", 10)], ["Sunrise", "sunset"])
+
+    def test_handles_events_of_other_workers(self):
+        self.tags.loaded = True
+        self.tags.handle("tagdict:+7:beach:sand")
+        self.tags.handle("tagdict:-3:sun")
+        self.tags.handle("image:v1:1")
+
+        self.assertEqual(self.tags.get("beach:sand"), 7)
+        self.assertIsNone(self.tags.get("sun"))
+        self.assertTrue(self.tags.loaded)
+
+        self.tags.handle(None)
+        self.assertFalse(self.tags.loaded)
+
+
+class TestResolveTags(SQLiteTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        self.tags = TagDictionary()
+        patcher = patch("src.repository.tags.tag_dictionary", self.tags)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def seed(self):
+        async with self.session_factory() as db:
+            db.add_all([Tag(name="cat"), Tag(name="dog")])
+            await db.commit()
+        async with self.engine.connect() as conn:
+            # StaticPool keeps this one connection, so foreign keys stay enforced like on PostgreSQL
+            await conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+
+    async def test_known_tags_cost_no_queries(self):
+        async with self.session_factory() as db:
+            await self.tags.load(db)
+            self.statements.clear()
+            tags = await resolve_tags(["dog", "cat"], db)
+            db.add(Image(image="https://example.com/1.png", tags=tags))
+            await db.commit()
+
+        self.assertEqual([(tag.id, tag.name) for tag in tags], [(2, "dog"), (1, "cat")])
+        self.assertEqual(len(self.statements), 2)
+        self.assertTrue(self.statements[0].startswith("INSERT INTO images"))
+
+    async def test_unknown_tags_are_created_and_remembered(self):
+        with patch("src.repository.tag_dictionary.publish_invalidation", new_callable=AsyncMock) as publish:
+            async with self.session_factory() as db:
+                tags = await resolve_tags(["cat", "bird"], db)
+                await db.commit()
+                await self.tags.remember(tags)
+
+        self.assertEqual(self.tags.get("bird"), tags[1].id)
+        publish.assert_awaited_once_with(f"tagdict:+{tags[1].id}:bird")
+
+    async def test_tags_already_in_session(self):
+        async with self.session_factory() as db:
+            image = Image(image="https://example.com/1.png", tags=[await db.get(Tag, 1)])
+            db.add(image)
+            await db.commit()
+            image = await db.scalar(select(Image).options(selectinload(Image.tags)))
+
+            image.tags = await resolve_tags(["cat", "dog"], db)
+            await db.commit()
+
+        self.assertEqual(sorted(tag.name for tag in image.tags), ["cat", "dog"])
+
+    async def delete_cat_unnoticed(self, db):
+        await self.tags.load(db)
+        # Deleted by another process, or its event was lost while Redis was down
+        await db.execute(delete(Tag).where(Tag.name == "cat"))
+        await db.commit()
+
+    async def test_upload_with_a_tag_deleted_behind_the_dictionary(self):
+        upload = MagicMock()
+        upload.read = AsyncMock(return_value=b"image")
+        user = User(username="owner", email="owner@example.com", password="x", role=Role.user)
+        with patch("src.repository.images.storage_client.upload", new_callable=AsyncMock,
+                   return_value={"url": "https://example.com/image.png"}), \
+                patch("src.repository.tag_dictionary.publish_invalidation", new_callable=AsyncMock):
+            async with self.session_factory() as db:
+                db.add(user)
+                await self.delete_cat_unnoticed(db)
+                image = await create_image(upload, "description", user, "cat, dog", db)
+
+        tags = {tag.name: tag.id for tag in image.tags}
+        self.assertEqual(sorted(tags), ["cat", "dog"])
+        self.assertNotEqual(tags["cat"], 1)
+        self.assertEqual(self.tags.get("cat"), tags["cat"])
+
+    async def test_update_with_a_tag_deleted_behind_the_dictionary(self):
+        admin = User(id=1, username="admin", email="admin@example.com", role=Role.admin)
+        body = MagicMock(tags=["cat"], qr_code="/qr", description="updated", edited_image="https://example.com/e.png")
+        with patch("src.repository.images.image_cache.invalidate", new_callable=AsyncMock), \
+                patch("src.repository.tag_dictionary.publish_invalidation", new_callable=AsyncMock):
+            async with self.session_factory() as db:
+                db.add(Image(image="https://example.com/1.png"))
+                await db.commit()
+                await self.delete_cat_unnoticed(db)
+                image = await update_image(1, body, admin, db)
+
+        self.assertEqual([tag.name for tag in image.tags], ["cat"])
+        self.assertEqual(image.description, "updated")
+
+    async def test_suggest_loads_once(self):
+        async with self.session_factory() as db:
+            self.assertEqual(await suggest_tags("c", 10, db), [{"id": 1, "name": "cat"}])
+            await suggest_tags("d", 10, db)
+
+        self.assertEqual(len(self.statements), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy import event, func, select
+
+from src.models.models import Image, Role, Tag, User
+from src.repository.images import create_image
+from src.repository.tag_dictionary import TagDictionary
+from src.repository.tags import upsert_tags
+from tests.sqlite_database import SQLiteTestCase
+
+
+class TestUpsertTags(SQLiteTestCase):
+    async def seed(self):
+        async with self.session_factory() as db:
+            db.add_all([Tag(name="cat"), Tag(name="dog")])
+            self.user = User(username="owner", email="owner@example.com", password="x", role=Role.user)
+            db.add(self.user)
+            await db.commit()
+
+    async def test_new_and_existing_tags_in_two_statements(self):
+        async with self.session_factory() as db:
+            tags = await upsert_tags(["sun", "cat", "sea", "dog", "sky"], db)
+            await db.commit()
+
+        self.assertEqual([tag.name for tag in tags], ["sun", "cat", "sea", "dog", "sky"])
+        self.assertTrue(all(tag.id for tag in tags))
+        self.assertEqual(len(self.statements), 2)
+        self.assertIn("ON CONFLICT", self.statements[0])
+        self.assertIn("RETURNING", self.statements[0])
+        self.assertIn(" IN ", self.statements[1])
+
+    async def test_only_new_tags_need_one_statement(self):
+        async with self.session_factory() as db:
+            await upsert_tags(["sun", "sea"], db)
+
+        self.assertEqual(len(self.statements), 1)
+
+    async def test_duplicates_and_blanks_are_ignored(self):
+        async with self.session_factory() as db:
+            tags = await upsert_tags(["cat", " cat ", "", "sun", "sun"], db)
+            await db.commit()
+            count = await db.scalar(select(func.count()).select_from(Tag))
+
+        self.assertEqual([tag.name for tag in tags], ["cat", "sun"])
+        self.assertEqual(count, 3)
+
+    async def test_empty(self):
+        async with self.session_factory() as db:
+            self.assertEqual(await upsert_tags([], db), [])
+
+        self.assertEqual(self.statements, [])
+
+    async def test_create_image_is_one_transaction(self):
+        upload = MagicMock()
+        upload.read = AsyncMock(return_value=b"image")
+        commits = []
+        event.listen(self.engine.sync_engine, "commit", lambda conn: commits.append(conn))
+        with patch("src.repository.images.storage_client.upload", new_callable=AsyncMock,
+                   return_value={"url": "https://example.com/image.png"}), \
+                patch("src.repository.tags.tag_dictionary", TagDictionary()), \
+                patch("src.repository.images.tag_dictionary", TagDictionary()):
+            async with self.session_factory() as db:
+                image = await create_image(upload, "description", self.user, "cat, sun, sea", db)
+
+        self.assertEqual(len(commits), 1)
+        self.assertEqual(sorted(tag.name for tag in image.tags), ["cat", "sea", "sun"])
+        async with self.session_factory() as db:
+            self.assertEqual(await db.scalar(select(func.count()).select_from(Image)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi import HTTPException
+from jose import jwt
+
+from src.services.auth import auth_service
+from src.services.token_cache import VerifiedTokenCache
+
+
+class TestVerifiedTokenCache(unittest.TestCase):
+    def test_hit_and_miss_metrics(self):
+        cache = VerifiedTokenCache()
+        claims = {"sub": "a@example.com", "exp": time.time() + 60}
+
+        self.assertIsNone(cache.get("token"))
+        cache.set("token", claims)
+
+        self.assertIs(cache.get("token"), claims)
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "size": 1, "hit_ratio": 0.5})
+
+    def test_expired_tokens_are_dropped(self):
+        cache = VerifiedTokenCache()
+        cache.set("token", {"exp": time.time() - 1})
+
+        self.assertIsNone(cache.get("token"))
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_tokens_without_exp_are_not_cached(self):
+        cache = VerifiedTokenCache()
+        cache.set("token", {"sub": "a@example.com"})
+
+        self.assertEqual(cache.stats()["size"], 0)
+
+    def test_bounded(self):
+        cache = VerifiedTokenCache(max_entries=2)
+        for token in ("a", "b", "c"):
+            cache.set(token, {"exp": time.time() + 60})
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["size"], 2)
+
+    def test_keyed_by_hash(self):
+        cache = VerifiedTokenCache()
+        cache.set("secret-token", {"exp": time.time() + 60})
+
+        self.assertNotIn("secret-token".encode(), b"".join(cache._entries))
+
+
+class TestDecodeAccessToken(unittest.IsolatedAsyncioTestCase):
+    async def test_signature_checked_once(self):
+        token = await auth_service.create_access_token({"sub": "a@example.com"})
+        with patch.object(auth_service, "token_cache", VerifiedTokenCache()), \
+                patch("src.services.auth.jwt.decode", wraps=jwt.decode) as decode:
+            first = auth_service.decode_access_token(token)
+            second = auth_service.decode_access_token(token)
+
+        self.assertEqual(first, second)
+        decode.assert_called_once()
+
+    async def test_invalid_tokens_are_not_cached(self):
+        token = await auth_service.create_access_token({"sub": "a@example.com"})
+        cache = VerifiedTokenCache()
+        with patch.object(auth_service, "token_cache", cache):
+            with self.assertRaises(HTTPException):
+                await auth_service.get_current_user(token + "x", None)
+
+        self.assertEqual(cache.stats()["size"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
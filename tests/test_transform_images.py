@@ -0,0 +1,117 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.models import Image
+from src.repository import transform_images
+from src.repository.entity_cache import image_cache
+from src.repository.transform_images import TransformURLCache, canonical_transformation, transformed_image_url
+from src.services.cache import InvalidationListener, LocalCache
+
+ORIGINAL = "https://res.cloudinary.com/demo/image/upload/v1712/Images/bob/original.jpg"
+
+
+class TestCanonicalTransformation(unittest.TestCase):
+    def test_drops_unset_values_and_sorts(self):
+        spec = canonical_transformation({"width": 100, "crop": "fill", "height": None, "effect": ""})
+        self.assertEqual(spec, (("crop", "fill"), ("width", 100)))
+
+    def test_equivalent_requests_match(self):
+        self.assertEqual(canonical_transformation({"crop": " Fill ", "width": 100}),
+                         canonical_transformation({"width": 100, "crop": "fill"}))
+
+
+class TestTransformURLCache(unittest.TestCase):
+    def test_lru_eviction_and_invalidation(self):
+        cache = TransformURLCache(max_entries=2)
+        cache.set(1, (), "a")
+        cache.set(2, (), "b")
+        cache.get(1, ())
+        cache.set(3, (), "c")
+
+        self.assertIsNone(cache.get(2, ()))
+        cache.invalidate(1)
+        self.assertIsNone(cache.get(1, ()))
+        self.assertEqual(cache.get(3, ()), "c")
+
+    def test_image_invalidations_reach_other_workers(self):
+        deleting, other = TransformURLCache(), TransformURLCache()
+        listener = InvalidationListener(MagicMock(), LocalCache())
+        listener.add_handler(other.handle)
+        for cache in (deleting, other):
+            cache.set(1, (("width", 100),), "a")
+            cache.set(2, (("width", 100),), "b")
+
+        # remove_image drops the URLs here, and its image cache invalidation is published to the other workers
+        deleting.invalidate(1)
+        listener._apply(image_cache.key(1))
+
+        self.assertIsNone(other.get(1, (("width", 100),)))
+        self.assertEqual(other.get(2, (("width", 100),)), "b")
+        listener._reset()
+        self.assertIsNone(other.get(2, (("width", 100),)))
+
+
+class TestTransformedImageUrl(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.cache = TransformURLCache()
+        self._original_cache = transform_images.transform_url_cache
+        transform_images.transform_url_cache = self.cache
+        self.session = MagicMock(spec=AsyncSession)
+        self.session.get = AsyncMock(return_value=Image(id=1, image=ORIGINAL))
+        self.image_cache_get = patch.object(image_cache, "get", AsyncMock(return_value=None)).start()
+        patch.object(image_cache, "set", AsyncMock()).start()
+
+    def tearDown(self):
+        patch.stopall()
+        transform_images.transform_url_cache = self._original_cache
+
+    async def test_derives_url_from_original(self):
+        url = await transformed_image_url(1, self.session, width=100, crop="fill")
+
+        self.assertIn("/image/upload/c_fill,w_100/v1712/Images/bob/original.jpg", url)
+        self.assertTrue(url.startswith("https://"))
+
+    async def test_deterministic_and_cached(self):
+        first = await transformed_image_url(1, self.session, width=100, crop="fill")
+        second = await transformed_image_url(1, self.session, crop="FILL", width=100)
+
+        self.assertEqual(first, second)
+        self.session.get.assert_awaited_once_with(Image, 1)
+
+    async def test_reads_image_through_image_cache(self):
+        self.image_cache_get.return_value = Image(id=1, image=ORIGINAL)
+
+        url = await transformed_image_url(1, self.session, width=100)
+
+        self.assertIn("/image/upload/w_100/v1712/Images/bob/original.jpg", url)
+        self.image_cache_get.assert_awaited_once_with(1)
+        self.session.get.assert_not_awaited()
+
+    async def test_different_params_give_different_urls(self):
+        first = await transformed_image_url(1, self.session, width=100)
+        second = await transformed_image_url(1, self.session, width=200)
+
+        self.assertNotEqual(first, second)
+
+    async def test_image_not_found(self):
+        self.session.get.return_value = None
+
+        with self.assertRaises(HTTPException) as ctx:
+            await transformed_image_url(1, self.session, width=100)
+
+        self.assertEqual(ctx.exception.status_code, 404)
+
+    async def test_image_not_in_cloudinary(self):
+        self.session.get.return_value = Image(id=1, image="https://example.com/original.png")
+
+        with self.assertRaises(HTTPException) as ctx:
+            await transformed_image_url(1, self.session, width=100)
+
+        self.assertEqual(ctx.exception.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,7 @@
 import unittest
 import sys
 from unittest.mock import MagicMock
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from src.models.models import Image, User, Role
 from src.schemas.images import ImageBase
 from src.repository.images import (get_all_images,
@@ -12,19 +12,20 @@ from src.repository.images import (get_all_images,
 
 class TestComments(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
-        self.session = MagicMock(spec=Session)
+        self.session = MagicMock(spec=AsyncSession)
+        self.session.execute.return_value = MagicMock()
         self.user = User(id=1, username="testuser", email="testuser@example.com", role = Role.admin)
 
     async def test_get_images_by_id_found(self):
         image_id = 1
         expected_images = [Image(id=1, image='Comment', user_id=1)]
-        self.session.query().filter().all.return_value = expected_images
+        self.session.execute.return_value.scalars().all.return_value = expected_images
         result = await get_images_by_id(image_id, self.user, self.session)
         self.assertEqual(result, expected_images)
 
     async def test_get_images_by_id_not_found(self):
         image_id = 1
-        self.session.query().filter().all.return_value = None
+        self.session.execute.return_value.scalars().all.return_value = None
         result = await get_images_by_id(image_id, self.user, self.session)
         self.assertIsNone(result)
 
@@ -32,15 +33,17 @@ class TestComments(unittest.IsolatedAsyncioTestCase):
     async def test_get_images_by_user_found(self):
         user_id = 1
         expected_images = [Image(id=1, image='Comment', user_id=1)]
-        self.session.query().filter().all.return_value = expected_images
-        result = await get_images_by_user(user_id, self.session)
+        self.session.execute.return_value.scalars().all.return_value = expected_images
+        result, next_cursor = await get_images_by_user(user_id, None, 10, self.session)
         self.assertEqual(result, expected_images)
+        self.assertIsNone(next_cursor)
 
     async def test_get_images_by_user_not_found(self):
         user_id = 1
-        self.session.query().filter().all.return_value = None
-        result = await get_images_by_user(user_id, self.session)
-        self.assertIsNone(result)
+        self.session.execute.return_value.scalars().all.return_value = []
+        result, next_cursor = await get_images_by_user(user_id, None, 10, self.session)
+        self.assertEqual(result, [])
+        self.assertIsNone(next_cursor)
 
     """async def test_create_image(self):
 
@@ -57,6 +60,6 @@ class TestComments(unittest.IsolatedAsyncioTestCase):
 
     async def test_remove_image_found(self):
         image = Image()
-        self.session.query().filter().all.return_value = image
+        self.session.execute.return_value.scalars().all.return_value = image
         result = await remove_image(image_id=1, user=self.user, db=self.session)
         self.assertEqual(result, image)"""
\ No newline at end of file
@@ -0,0 +1,78 @@
+import pickle
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import msgpack
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.models import Role, User
+from src.services.auth import auth_service
+from src.services.user_snapshot import SNAPSHOT_VERSION, UserSnapshot
+
+
+def make_user() -> User:
+    return User(id=7, username="bob", email="bob@example.com", password="$2b$12$secret-hash",
+                role=Role.moderator, confirmed=True, avatar="https://example.com/bob.png")
+
+
+class TestUserSnapshot(unittest.TestCase):
+    def test_round_trip(self):
+        snapshot = UserSnapshot.from_user(make_user())
+
+        self.assertEqual(UserSnapshot.loads(snapshot.dumps()), snapshot)
+        self.assertIs(UserSnapshot.loads(snapshot.dumps()).role, Role.moderator)
+
+    def test_does_not_carry_password(self):
+        data = UserSnapshot.from_user(make_user()).dumps()
+
+        self.assertNotIn(b"secret-hash", data)
+        self.assertFalse(hasattr(UserSnapshot.from_user(make_user()), "password"))
+
+    def test_immutable_and_slotted(self):
+        snapshot = UserSnapshot.from_user(make_user())
+
+        with self.assertRaises(AttributeError):
+            snapshot.role = Role.admin
+        self.assertFalse(hasattr(snapshot, "__dict__"))
+
+    def test_other_version_is_a_miss(self):
+        data = msgpack.packb((SNAPSHOT_VERSION + 1, 7, "bob@example.com", "bob", "user", True, None))
+
+        self.assertIsNone(UserSnapshot.loads(data))
+
+    def test_malformed_data_is_a_miss(self):
+        self.assertIsNone(UserSnapshot.loads(b"\x80\x04garbage"))
+        self.assertIsNone(UserSnapshot.loads(pickle.dumps({"id": 7})))
+
+    def test_key_is_versioned(self):
+        self.assertEqual(UserSnapshot.key("bob@example.com"), f"user:v{SNAPSHOT_VERSION}:bob@example.com")
+
+
+class TestGetCurrentUser(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.token = await auth_service.create_access_token(data={"sub": "bob@example.com"})
+        self.db = MagicMock(spec=AsyncSession)
+
+    async def test_cache_hit_skips_database(self):
+        snapshot = UserSnapshot.from_user(make_user())
+        with patch.object(auth_service, "cache", AsyncMock()) as cache_mock, \
+                patch("src.services.auth.repository_users.get_user_by_email", new_callable=AsyncMock) as get_user:
+            cache_mock.get.return_value = snapshot
+            user = await auth_service.get_current_user(self.token, self.db)
+
+        self.assertEqual(user, snapshot)
+        get_user.assert_not_awaited()
+
+    async def test_cache_miss_stores_snapshot(self):
+        with patch.object(auth_service, "cache", AsyncMock()) as cache_mock, \
+                patch("src.services.auth.repository_users.get_user_by_email", new_callable=AsyncMock) as get_user:
+            cache_mock.get.return_value = None
+            get_user.return_value = make_user()
+            user = await auth_service.get_current_user(self.token, self.db)
+
+        self.assertIsInstance(user, UserSnapshot)
+        cache_mock.set.assert_awaited_once_with("bob@example.com", user)
+
+
+if __name__ == '__main__':
+    unittest.main()